@@ -0,0 +1,286 @@
+import argparse
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import audit_snapshot
+import authorization_v2
+import bulk_executor
+import get_amr
+import metrics
+import mx_client
+import mx_logging
+import reconcile
+
+"""
+Description:
+This Python script exports the agent monitoring rules (AMRs) of an MX to an archive file, and imports an archive into
+another MX, for DR and staging copies.
+
+get_amr.get_agent_monitoring_rule() fetches one rule by name; copying hundreds of rules that way, one after the other,
+takes hours.  export_rules() lists the rules with one GET on /conf/agentsMonitoringRules and fetches them --concurrency
+at a time.  The archive is a single NDJSON file, gzip compressed when its name ends with .gz: a header line, then one
+line per rule, sorted by name so two archives diff cleanly:
+    {"format": "amr-archive", "version": 1, "mx": "10.0.0.1:8083", "exported_at": 1760745600.0}
+    {"name": "JT Test", "rule": {...}}
+import_rules() pushes an archive to an MX, --concurrency rules at a time: each rule is read from the target first, and
+is created (POST) when the target does not have it, updated (PUT) when it differs, and skipped when it is identical,
+so re-running an import only sends what changed.  --dry-run reads the target and prints what would be sent.
+
+Usage:
+$ python amr_archive.py export --host 10.0.0.1 --port 8083 --output amrs.ndjson.gz
+$ python amr_archive.py import --host 10.0.0.2 --port 8083 --input amrs.ndjson.gz [--dry-run]
+
+Developer note: This is code from my personal lab for my professional development. This should be considered example
+code only.
+
+Revision History:
+-----------------
+2026-10-18:
+    Initial creation of the script.
+2026-10-18:
+    iter_rules() bounds the rules fetched ahead of the caller.
+2026-10-18:
+    A failed export removes its temporary file.
+"""
+
+logger = logging.getLogger(__name__)
+
+# Global variables
+BASIC_AUTHORIZATION = get_amr.BASIC_AUTHORIZATION
+ARCHIVE_FORMAT = "amr-archive"
+ARCHIVE_VERSION = 1
+RULES_PATH = "/conf/agentsMonitoringRules"
+
+
+def _open(path: str, mode: str) -> IO[str]:
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def list_rules(host: str, port: str) -> List[str]:
+    """
+    The names of the agent monitoring rules of an MX.
+
+    :param host: The MX host
+    :param port: The MX port
+    :return: The rule names, sorted
+    :raises RuntimeError: If the MX does not return the list
+    """
+    items = reconcile.get_collection(host, port, RULES_PATH) or []
+    return sorted({item.get("name") if isinstance(item, dict) else item for item in items} - {None})
+
+
+def fetch_rule(host: str, port: str, name: str, headers: Dict[str, str]) -> Tuple[Optional[int], Optional[Dict]]:
+    """
+    Reads one rule from the MX, bypassing config_cache so an export is never stale.
+
+    :return: (status code, the rule or None)
+    """
+    response = mx_client.get(get_amr.rule_url(name, host, port), headers=headers)
+    if response.status_code != 200:
+        return response.status_code, None
+    return response.status_code, response.json()
+
+
+def iter_rules(host: str, port: str, headers: Dict[str, str], names: Optional[Sequence[str]] = None,
+               concurrency: int = bulk_executor.DEFAULT_CONCURRENCY) -> Iterator[Tuple[str, Any, Optional[Dict]]]:
+    """
+    Fetches the rules of an MX concurrently, and yields them in name order as soon as the ones before them are in.  At
+    most concurrency * bulk_executor.QUEUE_DEPTH_PER_WORKER rules are fetched ahead of the one the caller waits for.
+
+    :param host: The MX host
+    :param port: The MX port
+    :param headers: The headers of the API calls
+    :param names: The rules to fetch (default: every rule of the MX)
+    :param concurrency: The maximum number of GETs in flight at once
+    :return: An iterator of (name, status code or error, the rule or None if it could not be read)
+    """
+    names = sorted(names) if names else list_rules(host, port)
+    mx_client.ensure_pool_size(concurrency)
+
+    def fetch(name):
+        try:
+            return (name,) + fetch_rule(host, port, name, headers)
+        except Exception as e:
+            return name, f"{type(e).__name__}: {e}", None
+
+    concurrency = max(1, int(concurrency))
+    window = concurrency * bulk_executor.QUEUE_DEPTH_PER_WORKER
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="amr-fetch") as executor:
+        pending: deque = deque()
+        for name in names:
+            if len(pending) >= window:
+                yield pending.popleft().result()
+            pending.append(executor.submit(fetch, name))
+        while pending:
+            yield pending.popleft().result()
+
+
+def export_rules(host: str, port: str, output: IO[str], headers: Dict[str, str],
+                 names: Optional[Sequence[str]] = None,
+                 concurrency: int = bulk_executor.DEFAULT_CONCURRENCY) -> Tuple[int, List[Tuple[str, Any]]]:
+    """
+    Writes the rules of an MX to an archive stream, in name order.
+
+    :param host: The MX host
+    :param port: The MX port
+    :param output: The text stream the archive is written to
+    :param headers: The headers of the API calls
+    :param names: The rules to export (default: every rule of the MX)
+    :param concurrency: The maximum number of GETs in flight at once
+    :return: (number of rules written, [(name, status code or error) of every rule that could not be read])
+    """
+    output.write(json.dumps({"format": ARCHIVE_FORMAT, "version": ARCHIVE_VERSION, "mx": f"{host}:{port}",
+                             "exported_at": round(time.time(), 3)}) + "\n")
+    written = 0
+    failed: List[Tuple[str, Any]] = []
+    for name, status, rule in iter_rules(host, port, headers, names, concurrency):
+        if rule is None:
+            logger.error("Failed to retrieve AMR: %s (%s)", name, status, extra={"rule_name": name})
+            failed.append((name, status))
+            continue
+        output.write(json.dumps({"name": name, "rule": rule}, ensure_ascii=False) + "\n")
+        written += 1
+    return written, failed
+
+
+def read_archive(path: str) -> Tuple[Dict[str, Any], Iterator[Dict[str, Any]]]:
+    """
+    Opens an archive.
+
+    :param path: The archive file
+    :return: (the header, an iterator of {"name", "rule"} entries)
+    :raises ValueError: If the file is not an archive of a supported version
+    """
+    f = _open(path, "r")
+    try:
+        header = json.loads(f.readline() or "null")
+    except ValueError:
+        header = None
+    if not isinstance(header, dict) or header.get("format") != ARCHIVE_FORMAT:
+        f.close()
+        raise ValueError(f"{path} is not an AMR archive")
+    if header.get("version", 0) > ARCHIVE_VERSION:
+        f.close()
+        raise ValueError(f"{path} is a version {header['version']} archive; this script reads up to {ARCHIVE_VERSION}")
+
+    def entries():
+        with f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    return header, entries()
+
+
+def import_rules(host: str, port: str, entries: Iterator[Dict[str, Any]], headers: Dict[str, str],
+                 concurrency: int = bulk_executor.DEFAULT_CONCURRENCY, dry_run: bool = False,
+                 counts: Optional[Counter] = None) -> List[bulk_executor.RowResult]:
+    """
+    Creates or updates the rules of an archive on an MX, skipping the rules it already has unchanged.
+
+    :param host: The MX host
+    :param port: The MX port
+    :param entries: The archive entries, from read_archive()
+    :param headers: The headers of the API calls
+    :param concurrency: The maximum number of rules in flight at once
+    :param dry_run: Only read the target, and count what would be sent
+    :param counts: Optional Counter, incremented with "created"/"updated"/"identical" (or "create"/"update" when
+                   dry_run is set)
+    :return: A list of RowResult, one per rule, in archive order
+    """
+    counts = counts if counts is not None else Counter()
+    counts_lock = threading.Lock()
+
+    def count(outcome):
+        with counts_lock:
+            counts[outcome] += 1
+
+    def restore(rownum, entry):
+        name, rule = entry["name"], entry["rule"]
+        url = get_amr.rule_url(name, host, port)
+        status, current = fetch_rule(host, port, name, headers)
+        if current is not None and audit_snapshot.canonical(current) == audit_snapshot.canonical(rule):
+            count("identical")
+            return True
+        if status not in (200, 404):
+            return f"Failed to read the target rule (Error Code: {status})"
+        if dry_run:
+            count("create" if current is None else "update")
+            logger.info("Would %s AMR: %s", "create" if current is None else "update", name,
+                        extra={"rule_name": name})
+            return True
+        if current is None:
+            response = mx_client.post(url, json=rule, headers=headers)
+            outcome = "created"
+        else:
+            response = mx_client.put(url, json=rule, headers=headers)
+            outcome = "updated"
+        if response.status_code == 200:
+            count(outcome)
+            logger.info("Successfully %s AMR: %s", outcome, name, extra={"rule_name": name})
+        else:
+            logger.error("Failed to import AMR: %s (Error Code: %d)", name, response.status_code,
+                         extra={"rule_name": name, "status_code": response.status_code})
+        return response
+
+    return bulk_executor.run_bulk(entries, restore, concurrency)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Copy agent monitoring rules between MXs through an archive file.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="write the rules of an MX to an archive")
+    export_parser.add_argument("--output", required=True, help="archive file (gzip compressed if it ends with .gz)")
+    export_parser.add_argument("--rule", action="append", help="export only this rule (repeatable)")
+    import_parser = commands.add_parser("import", help="create or update the rules of an archive on an MX")
+    import_parser.add_argument("--input", required=True, help="archive file written by export")
+    import_parser.add_argument("--dry-run", action="store_true", help="only print what would be sent")
+    for command_parser in (export_parser, import_parser):
+        command_parser.add_argument("--host", default=get_amr.HOST, help=f"MX host (default: {get_amr.HOST})")
+        command_parser.add_argument("--port", default=get_amr.PORT, help=f"MX port (default: {get_amr.PORT})")
+        command_parser.add_argument("--concurrency", type=int, default=bulk_executor.DEFAULT_CONCURRENCY,
+                                    help="rules read or written at the same time")
+        mx_logging.add_arguments(command_parser)
+        metrics.add_arguments(command_parser)
+    args = parser.parse_args()
+    mx_logging.configure(args.log_level, args.log_format)
+    metrics.write_at_exit(args.metrics_json, args.metrics_prom)
+    session_manager = authorization_v2.get_session_manager(args.host, args.port, BASIC_AUTHORIZATION)
+    if session_manager.get_cookie() is None:
+        print(f'Request failed with status code {session_manager.status_code}')
+        raise SystemExit(1)
+    headers: Dict[str, str] = {"Content-Type": "application/json", "Authorization": BASIC_AUTHORIZATION}
+    start = time.perf_counter()
+    if args.command == "export":
+        # Written next to the archive and renamed over it, so a failed export never leaves a partial archive.
+        tmp_path = os.path.join(os.path.dirname(args.output), ".tmp." + os.path.basename(args.output))
+        try:
+            with _open(tmp_path, "w") as f:
+                written, failed = export_rules(args.host, args.port, f, headers, args.rule, args.concurrency)
+            os.replace(tmp_path, args.output)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        print(f"Exported {written} agent monitoring rules from {args.host}:{args.port} to {args.output} "
+              f"in {time.perf_counter() - start:.2f}s")
+        for name, status in failed:
+            print(f"  {name}: {status}")
+        raise SystemExit(1 if failed else 0)
+    header, entries = read_archive(args.input)
+    logger.info("Importing the rules exported from %s", header.get("mx"))
+    counts: Counter = Counter()
+    results = import_rules(args.host, args.port, entries, headers, args.concurrency, args.dry_run, counts)
+    bulk_executor.print_summary(results, "Agent monitoring rules", time.perf_counter() - start)
+    print(", ".join(f"{outcome}: {counts[outcome]}" for outcome in
+                    (("create", "update", "identical") if args.dry_run else ("created", "updated", "identical"))))
+    raise SystemExit(0 if all(r.ok for r in results) else 1)
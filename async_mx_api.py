@@ -0,0 +1,368 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote
+
+import aiohttp
+
+import authorization_v2
+import metrics
+import mx_client
+import request_policy
+
+"""
+Description:
+This Python script provides an asyncio counterpart to the blocking MX API functions, built on aiohttp.
+
+AsyncMXClient logs in through the same /auth/session flow as authorization_v2, keeps one session cookie per MX and
+sends every call over a single pooled aiohttp connector, so thousands of requests to several MXs can be in flight
+from one event loop without a thread per request.  A semaphore bounds how many requests are in flight at once, and
+run_bulk() fans a per-row coroutine out over an iterable of CSV rows under that limit, holding only the rows in flight.
+
+Every request follows the retry rules of request_policy: a retryable status code (RETRYABLE_STATUS_CODES) or a
+transport error is retried up to MAX_RETRIES times with its backoff(), honouring Retry-After, and a POST is only
+retried when the MX turned it away without processing it (rejected()).  The semaphore takes the place of the blocking
+per-host limiter and circuit breaker, which cannot run on an event loop.
+
+SyncMXClient runs an AsyncMXClient on a background event loop and exposes the same calls as blocking methods, so the
+existing scripts (and bulk_executor) can use the async engine without being rewritten.
+
+Usage:
+    async with AsyncMXClient(concurrency=200) as client:
+        await client.login(host, port)
+        response = await client.create_protected_ip_list(host, port, site, server_group, ip, gateway_group, body)
+
+Developer note: This is code from my personal lab for my professional development. This should be considered example
+code only.
+
+Revision History:
+-----------------
+2026-10-17:
+    Initial creation of the script.
+2026-10-17:
+    Messages go through logging and every request is recorded in metrics.
+2026-10-18:
+    Requests are retried under request_policy's rules; run_bulk() keeps only the rows in flight.
+2026-10-18:
+    get_all_audit_report_configurations() checks the status code.
+"""
+
+logger = logging.getLogger(__name__)
+
+# Global variables
+DEFAULT_CONCURRENCY = 100
+# Total and per-MX limits on open connections.
+CONNECTION_LIMIT = 200
+CONNECTION_LIMIT_PER_HOST = 100
+# Total timeout of one request, in seconds.
+TIMEOUT = 120
+API_PATH = "/SecureSphere/api/v1"
+
+
+class AsyncResponse:
+    """
+    The parts of an aiohttp response the scripts use, read while the connection was still open.  Mirrors the
+    status_code/text/json() attributes of requests.Response so callers can treat both the same way.
+    """
+
+    def __init__(self, status_code: int, text: str, url: str, headers: Optional[Dict[str, str]] = None):
+        self.status_code = status_code
+        self.text = text
+        self.url = url
+        self.headers = headers or {}
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+
+class AsyncMXClient:
+    """
+    Asynchronous MX API client.  Use it as an async context manager, or call open() and close().
+    """
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY, basic_authorization: Optional[str] = None,
+                 debug: bool = False):
+        """
+        :param concurrency: The maximum number of requests in flight at once, across all MXs
+        :param basic_authorization: The Basic Authorization header value.  Defaults to authorization_v2's.
+        :param debug: Whether to enable debug mode or not.
+        """
+        self.concurrency = concurrency
+        self.basic_authorization = basic_authorization or authorization_v2.BASIC_AUTHORIZATION
+        self.debug = debug
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # Session cookie and its login lock per (host, port).
+        self._cookies: Dict[Tuple[str, str], str] = {}
+        self._login_locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+    async def open(self) -> None:
+        connector = aiohttp.TCPConnector(limit=CONNECTION_LIMIT, limit_per_host=CONNECTION_LIMIT_PER_HOST,
+                                         ssl=None if mx_client.VERIFY_SSL else False)
+        self._session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=TIMEOUT),
+                                              headers={"Content-Type": "application/json"})
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self) -> "AsyncMXClient":
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def login(self, host: str, port: str) -> Optional[str]:
+        """
+        Logs in to an MX through /auth/session and stores its session cookie.
+
+        :param host: The MX host
+        :param port: The MX port
+        :return: (str) The cookies in string format, or None if the login failed.
+        """
+        key = (str(host), str(port))
+        lock = self._login_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            return await self._login(key)
+
+    async def _login(self, key: Tuple[str, str]) -> Optional[str]:
+        url = f"https://{key[0]}:{key[1]}{API_PATH}/auth/session"
+        async with self._semaphore:
+            async with self._session.post(url, headers={"Authorization": self.basic_authorization}) as response:
+                text = await response.text()
+                if response.status != 200:
+                    logger.error("Failed to log in to %s:%s with status code %d", key[0], key[1], response.status)
+                    self._cookies.pop(key, None)
+                    return None
+                j_id = response.cookies.get("JSESSIONID")
+                sso_id = response.cookies.get("SSOSESSIONID")
+        cookie = f"JSESSIONID={j_id.value if j_id else None}; SSOSESSIONID={sso_id.value if sso_id else None}"
+        if self.debug:
+            logger.debug("Logged in to %s:%s: %s", key[0], key[1], text)
+        self._cookies[key] = cookie
+        return cookie
+
+    async def request(self, method: str, host: str, port: str, path: str, json: Any = None,
+                      headers: Optional[Dict[str, str]] = None) -> AsyncResponse:
+        """
+        Sends one request to an MX, logging in first if needed and once more if the MX answers 401.
+
+        :param method: The HTTP method
+        :param host: The MX host
+        :param port: The MX port
+        :param path: The path below /SecureSphere/api/v1, including any query string
+        :param json: The JSON body, if any
+        :param headers: Extra request headers
+        :return: The response
+        """
+        key = (str(host), str(port))
+        url = f"https://{key[0]}:{key[1]}{API_PATH}{path}"
+        cookie = self._cookies.get(key) or await self.login(*key)
+        response = await self._send(method, url, cookie, json, headers)
+        if response.status_code == 401:
+            lock = self._login_locks.setdefault(key, asyncio.Lock())
+            async with lock:
+                # Another request may have logged in again while this one was waiting.
+                if self._cookies.get(key) == cookie:
+                    await self._login(key)
+            response = await self._send(method, url, self._cookies.get(key), json, headers)
+        return response
+
+    async def _send(self, method, url, cookie, json, headers) -> AsyncResponse:
+        request_headers = dict(headers or {})
+        if cookie:
+            request_headers["Cookie"] = cookie
+        idempotent = method.upper() in request_policy.IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            response: Optional[AsyncResponse] = None
+            error: Optional[Exception] = None
+            try:
+                response = await self._send_once(method, url, json, request_headers)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = e
+            retryable = error is not None or response.status_code in request_policy.RETRYABLE_STATUS_CODES
+            if retryable and not idempotent and not _rejected(response, error):
+                retryable = False
+            if not retryable or attempt >= request_policy.MAX_RETRIES:
+                if error is not None:
+                    raise error
+                return response
+            attempt += 1
+            logger.debug("Retrying %s %s (attempt %d): %s", method, url, attempt,
+                         error if error is not None else response.status_code)
+            # Waits outside the semaphore, so a backing-off request does not hold a slot.
+            await asyncio.sleep(request_policy.backoff(attempt, response))
+
+    async def _send_once(self, method, url, json, headers) -> AsyncResponse:
+        async with self._semaphore:
+            start = time.perf_counter()
+            async with self._session.request(method, url, json=json, headers=headers) as response:
+                text = await response.text()
+            latency = time.perf_counter() - start
+        sent = int(response.request_info.headers.get("Content-Length") or 0)
+        metrics.record_request(method, url, response.status, latency, sent, len(text.encode()))
+        logger.debug("%s %s -> %d in %.3fs", method, url, response.status, latency)
+        return AsyncResponse(response.status, text, url, dict(response.headers))
+
+    async def create_db_connection(self, host, port, site_name, server_group_name, service_name, connection_name,
+                                   body, headers=None) -> AsyncResponse:
+        """
+        Async counterpart of create_db_connection_v2.create_db_connection().
+        """
+        path = f"/conf/dbServices/{site_name}/{server_group_name}/{service_name}/dbConnections/{connection_name}"
+        response = await self.request("POST", host, port, path, body, headers)
+        if response.status_code == 200:
+            logger.info("Successfully created database connection with alias: %s", connection_name)
+        else:
+            logger.error("Failed to create database connection with alias: %s (Error Code: %d)\nHere is the error message: %s",
+                         connection_name, response.status_code, response.text)
+        return response
+
+    async def create_protected_ip_list(self, host, port, site_name, server_group_name, ip_address,
+                                       gateway_group_name, body, headers=None) -> AsyncResponse:
+        """
+        Async counterpart of create_protected__ip_list_v2.create_protected_ip_list().
+        """
+        path = (f"/conf/serverGroups/{site_name}/{server_group_name}/protectedIPs/{ip_address}"
+                f"?gatewayGroup={gateway_group_name}")
+        response = await self.request("POST", host, port, path, body, headers)
+        if response.status_code == 200:
+            logger.info("Successfully created Protected and Server Group IP address: %s", ip_address)
+        else:
+            logger.error("Failed to create Protected and Server Group IP address: %s (Error Code: %d)\nHere is the error message: %s",
+                         ip_address, response.status_code, response.text)
+        return response
+
+    async def update_server_group_iplist(self, host, port, site_name, server_group_name, ip_address, body,
+                                         headers=None) -> AsyncResponse:
+        """
+        Async counterpart of update_os_connection__ip_list_v2.update_server_group_iplist().
+        """
+        path = f"/conf/serverGroups/{site_name}/{server_group_name}/servers/{ip_address}"
+        response = await self.request("PUT", host, port, path, body, headers)
+        if response.status_code == 200:
+            logger.info("Successfully updated OS for IP address: %s", ip_address)
+        else:
+            logger.error("Failed to update OS for IP address: %s (Error Code: %d)\nHere is the error message: %s",
+                         ip_address, response.status_code, response.text)
+        return response
+
+    async def get_agent_monitoring_rule(self, host, port, rule_name, headers=None) -> Optional[Dict]:
+        """
+        Async counterpart of get_amr.get_agent_monitoring_rule().  Returns None if the rule could not be retrieved.
+        """
+        response = await self.request("GET", host, port, f"/conf/agentsMonitoringRules/{quote(rule_name, safe='')}",
+                                      None, headers)
+        if response.status_code != 200:
+            logger.error("Failed to retrieve AMR: %s (Error Code: %d)\nHere is the error message: %s",
+                         rule_name, response.status_code, response.text)
+            return None
+        return response.json()
+
+    async def get_all_audit_report_configurations(self, host, port, headers=None) -> Optional[List[Dict]]:
+        """
+        Async counterpart of get_all_audit_report_configurations_v2.get_all_audit_report_configurations().  Returns None
+        if the configurations could not be retrieved.
+        """
+        response = await self.request("GET", host, port, "/conf/jsonar/dbauditreports/", None, headers)
+        if response.status_code != 200:
+            logger.error("Failed to retrieve the DB Audit report configurations (Error Code: %d)\nHere is the error "
+                         "message: %s", response.status_code, response.text)
+            return None
+        return response.json()
+
+
+def _rejected(response: Optional[AsyncResponse], error: Optional[Exception]) -> bool:
+    # request_policy.rejected() for aiohttp: a connection that was never established was not processed.
+    if error is not None:
+        return isinstance(error, aiohttp.ClientConnectorError)
+    return request_policy.rejected(response, None)
+
+
+async def run_bulk(rows: Iterable[Dict[str, Any]], task: Callable[[int, Dict[str, Any]], Awaitable[Any]],
+                   concurrency: int = DEFAULT_CONCURRENCY,
+                   on_result: Optional[Callable[[Dict[str, Any], Any], None]] = None,
+                   keep_results: bool = True) -> List[Any]:
+    """
+    Runs the coroutine task(rownum, row) for every row, with at most concurrency rows in flight.  Rows are read
+    lazily, so the input can be streamed, and only the rows in flight are held.
+
+    :param rows: An iterable of dictionaries, one per CSV row
+    :param task: The per-row coroutine function.  rownum starts at 1.
+    :param concurrency: The maximum number of rows in flight at once
+    :param on_result: Optional function called with (row, result) as each row completes
+    :param keep_results: Collect the results for the return value.  A caller that only uses on_result passes False so
+                         memory does not grow with every row.
+    :return: The task results (or the exceptions they raised), in row order (empty when keep_results is False)
+    """
+    slots = asyncio.Semaphore(max(1, int(concurrency)))
+    in_flight = set()
+    results: List[Tuple[int, Any]] = []
+
+    async def run_one(rownum, row):
+        try:
+            result = await task(rownum, row)
+        except Exception as e:
+            result = e
+        finally:
+            slots.release()
+        if keep_results:
+            results.append((rownum, result))
+        if on_result is not None:
+            on_result(row, result)
+
+    for rownum, row in enumerate(rows, start=1):
+        await slots.acquire()
+        future = asyncio.ensure_future(run_one(rownum, row))
+        in_flight.add(future)
+        future.add_done_callback(in_flight.discard)
+    if in_flight:
+        await asyncio.gather(*in_flight)
+    results.sort(key=lambda item: item[0])
+    return [result for _, result in results]
+
+
+class SyncMXClient:
+    """
+    Blocking wrapper around AsyncMXClient.  The async client runs on an event loop in a daemon thread, and every
+    method call blocks until its coroutine completes, so it can be used from the existing scripts and from
+    bulk_executor worker threads.
+    """
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY, basic_authorization: Optional[str] = None,
+                 debug: bool = False):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="mx-async-loop", daemon=True)
+        self._thread.start()
+        self.client = AsyncMXClient(concurrency, basic_authorization, debug)
+        self.run(self.client.open())
+
+    def run(self, coroutine: Awaitable) -> Any:
+        """
+        Runs a coroutine on the background loop and returns its result.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def close(self) -> None:
+        self.run(self.client.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def __enter__(self) -> "SyncMXClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __getattr__(self, name: str) -> Callable:
+        method = getattr(self.client, name)
+        if not asyncio.iscoroutinefunction(method):
+            return method
+        return lambda *args, **kwargs: self.run(method(*args, **kwargs))
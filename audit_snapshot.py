@@ -0,0 +1,257 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, IO, Iterable, Iterator, List, NamedTuple, Optional
+
+"""
+Description:
+This Python script keeps a local, content-addressed snapshot store of the DB Audit report configurations, so a poll of
+the MX reports only what changed since the last one.
+
+Each flattened report configuration is identified by the first of IDENTITY_FIELDS it has, and hashed (SHA-256 of its
+canonical JSON).  The store is a directory:
+    objects/ab/ab12...json   every distinct configuration ever seen, written once and named by its hash
+    index.json               the current state: poll number, time, and identity -> hash of every report
+    changelog.ndjson         one line per poll that changed something: the added, changed and removed reports
+SnapshotStore.sync() streams the reports of a poll, compares each hash with the index (a dictionary lookup, so a poll
+costs the same with months of history as with none), writes the new objects, appends the poll's changes to the
+changelog and replaces the index.  Unchanged reports cost one hash each and write nothing.  manifest_at() rebuilds the
+state of any past poll from the changelog, and get() reads a configuration back by hash.
+
+Usage:
+    store = audit_snapshot.SnapshotStore("audit_snapshots")
+    changes = store.sync(get_all_audit_report_configurations_v2.iter_audit_report_configurations(headers))
+    audit_snapshot.write_changes(changes, sys.stdout)
+
+Developer note: This is code from my personal lab for my professional development. This should be considered example
+code only.
+
+Revision History:
+-----------------
+2026-10-17:
+    Initial creation of the script.
+"""
+
+# Global variables
+# Fields that identify a report configuration, in order of preference.  A report with none of them is identified by
+# its hash, so an edit shows as a removal and an addition.
+IDENTITY_FIELDS = ('reportId', 'reportName', 'id', 'name')
+INDEX_FILE = "index.json"
+CHANGELOG_FILE = "changelog.ndjson"
+OBJECTS_DIR = "objects"
+
+
+class Change(NamedTuple):
+    """
+    One report that was added, changed or removed by a poll.  old_hash is None for an addition, new_hash and config
+    are None for a removal.
+    """
+    op: str
+    identity: str
+    old_hash: Optional[str]
+    new_hash: Optional[str]
+    config: Optional[Dict[str, Any]]
+
+    def to_dict(self) -> Dict[str, Any]:
+        entry = {"op": self.op, "id": self.identity}
+        if self.old_hash is not None:
+            entry["old"] = self.old_hash
+        if self.new_hash is not None:
+            entry["new"] = self.new_hash
+        return entry
+
+
+class Changes(NamedTuple):
+    """
+    The outcome of a poll.
+    """
+    poll: int
+    timestamp: float
+    total: int
+    added: List[Change]
+    changed: List[Change]
+    removed: List[Change]
+
+    @property
+    def count(self) -> int:
+        return len(self.added) + len(self.changed) + len(self.removed)
+
+
+def canonical(config: Dict[str, Any]) -> bytes:
+    """
+    The canonical JSON of a configuration: sorted keys and no whitespace, so equal configurations hash equally.
+
+    :param config: A flattened report configuration
+    :return: The UTF-8 encoded JSON
+    """
+    return json.dumps(config, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def identity_of(config: Dict[str, Any], digest: str) -> str:
+    """
+    The identity of a configuration: its first IDENTITY_FIELDS value, or its hash.
+
+    :param config: A flattened report configuration
+    :param digest: The configuration's hash
+    :return: The identity, as a string
+    """
+    for field in IDENTITY_FIELDS:
+        value = config.get(field)
+        if value is not None and value != "":
+            return f"{field}={value}"
+    return f"sha256={digest}"
+
+
+class SnapshotStore:
+    """
+    A directory holding the configurations seen so far, the current index and the changelog.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.objects_dir = os.path.join(directory, OBJECTS_DIR)
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self.changelog_path = os.path.join(directory, CHANGELOG_FILE)
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], digest + ".json")
+
+    def load_index(self) -> Dict[str, Any]:
+        """
+        The current state of the store.
+
+        :return: {"poll": last poll number, "timestamp": its time, "reports": {identity: hash}}
+        """
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"poll": 0, "timestamp": None, "reports": {}}
+
+    def get(self, digest: str) -> Dict[str, Any]:
+        """
+        Reads a configuration back by its hash.
+
+        :param digest: The hash
+        :return: The configuration
+        :raises FileNotFoundError: If the store does not have it
+        """
+        with open(self._object_path(digest), encoding="utf-8") as f:
+            return json.load(f)
+
+    def _put(self, digest: str, data: bytes) -> None:
+        path = self._object_path(digest)
+        if os.path.exists(path):
+            return
+        _atomic_write(path, data)
+
+    def sync(self, configs: Iterable[Dict[str, Any]]) -> Changes:
+        """
+        Records a poll: compares the configurations with the index, stores the new ones and logs the differences.
+
+        The index is only replaced once every configuration has been read, so a poll that fails half way changes
+        nothing.
+
+        :param configs: Every report configuration of the MX, e.g. iter_audit_report_configurations(headers)
+        :return: The poll's Changes
+        """
+        index = self.load_index()
+        previous: Dict[str, str] = index["reports"]
+        current: Dict[str, str] = {}
+        added: List[Change] = []
+        changed: List[Change] = []
+        for config in configs:
+            data = canonical(config)
+            digest = hashlib.sha256(data).hexdigest()
+            identity = identity_of(config, digest)
+            if identity in current:
+                # Two reports share an identity field value; tell them apart by content.
+                identity = f"sha256={digest}"
+            current[identity] = digest
+            old = previous.get(identity)
+            if old == digest:
+                continue
+            self._put(digest, data)
+            if old is None:
+                added.append(Change("added", identity, None, digest, config))
+            else:
+                changed.append(Change("changed", identity, old, digest, config))
+        removed = [Change("removed", identity, digest, None, None)
+                   for identity, digest in previous.items() if identity not in current]
+        changes = Changes(index["poll"] + 1, time.time(), len(current), added, changed, removed)
+        if changes.count:
+            line = {"poll": changes.poll, "ts": round(changes.timestamp, 3),
+                    "changes": [change.to_dict() for change in added + changed + removed]}
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.changelog_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(line, separators=(",", ":")) + "\n")
+        _atomic_write(self.index_path, json.dumps({"poll": changes.poll, "timestamp": changes.timestamp,
+                                                   "reports": current}).encode("utf-8"))
+        return changes
+
+    def iter_changelog(self) -> Iterator[Dict[str, Any]]:
+        """
+        The changelog, one poll at a time, oldest first.
+
+        :return: An iterator of {"poll", "ts", "changes": [{"op", "id", "old", "new"}]}
+        """
+        try:
+            with open(self.changelog_path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+        except FileNotFoundError:
+            return
+
+    def manifest_at(self, poll: int) -> Dict[str, str]:
+        """
+        The state of the store after a past poll, rebuilt from the changelog.
+
+        :param poll: The poll number
+        :return: {identity: hash}
+        """
+        manifest: Dict[str, str] = {}
+        for entry in self.iter_changelog():
+            if entry["poll"] > poll:
+                break
+            for change in entry["changes"]:
+                if change["op"] == "removed":
+                    manifest.pop(change["id"], None)
+                else:
+                    manifest[change["id"]] = change["new"]
+        return manifest
+
+
+def write_changes(changes: Changes, stream: IO[str], include_config: bool = True) -> int:
+    """
+    Writes the changes of a poll as NDJSON, one change per line, for downstream consumers.
+
+    :param changes: The Changes returned by SnapshotStore.sync()
+    :param stream: The text stream to write to
+    :param include_config: Include the new configuration in added and changed lines
+    :return: The number of lines written
+    """
+    for change in changes.added + changes.changed + changes.removed:
+        entry = dict(change.to_dict(), poll=changes.poll)
+        if include_config and change.config is not None:
+            entry["config"] = change.config
+        stream.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    return changes.count
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -1,7 +1,23 @@
-import requests
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
 import urllib3
 from requests import Response
 
+import mx_client
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: the cache file is only locked between the threads of one process.
+    fcntl = None
+
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 """
@@ -18,6 +34,16 @@ Revision History:
 -----------------
 2023-02-23:
     Initial creation of the script.    
+2026-10-17:
+    Added MXSessionManager, which caches the session cookies per MX in memory and in a permission-restricted file,
+    reuses them across runs until they expire, logs in again on 401 and refreshes them from a background keepalive.
+    The session cookies are scoped to their MX, so one process can hold sessions to several MXs.
+2026-10-18:
+    MXSessionManager takes a session_name, for the sessions of session_pool, and has logout().  keepalive() sends the
+    manager's own cookie.
+2026-10-18:
+    Updates of the session cache file are serialized, between threads and (where fcntl exists) between processes, so
+    concurrent logins no longer overwrite each other's sessions.
 """
 
 # Global variables
@@ -25,8 +51,18 @@ HOST = "192.168.102.188"
 PORT = "8083"
 BASIC_AUTHORIZATION = 'Basic YWR'
 DEBUG = True
+# Session cookie cache shared by every script run.  Created with 0600 permissions.
+SESSION_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".mx_session_cache.json")
+# How long the MX keeps an idle session alive, in seconds.
+SESSION_TTL = 30 * 60
+# Refresh the session this many seconds before it is due to expire.
+SESSION_REFRESH_MARGIN = 5 * 60
+# How often the background keepalive thread wakes up, in seconds.
+KEEPALIVE_INTERVAL = 60
+# Light-weight authenticated GET used to keep the session alive.
+KEEPALIVE_PATH = "/SecureSphere/api/v1/administration/version"
 
-def authorization(debug=False):
+def authorization(debug=False, host=None, port=None, basic_authorization=None):
     """
     This function logs in to the MX using Basic Authorization.
 
@@ -40,13 +76,16 @@ def authorization(debug=False):
 
     :param debug:
     :type debug: Boolean necessary to enable/disable
+    :param host: The MX host.  Defaults to HOST.
+    :param port: The MX port.  Defaults to PORT.
+    :param basic_authorization: The Basic Authorization header value.  Defaults to BASIC_AUTHORIZATION.
     :return: Returns the requests.Response
     :rtype: <class 'requests.models.Response'>
     """
-    url = f"https://{HOST}:{PORT}/SecureSphere/api/v1/auth/session"
+    url = f"https://{host or HOST}:{port or PORT}/SecureSphere/api/v1/auth/session"
     payload = {}
-    headers = dict(Authorization=BASIC_AUTHORIZATION)
-    auth_response: Response = requests.request("POST", url, headers=headers, data=payload, verify=False)
+    headers = dict(Authorization=basic_authorization or BASIC_AUTHORIZATION)
+    auth_response: Response = mx_client.request("POST", url, reauth=False, headers=headers, data=payload)
     if debug:
         print(f"Request URL: {auth_response.request.url}")
         print(f"Request Headers: {auth_response.request.headers}")
@@ -82,6 +121,283 @@ def get_cookie(response, debug):
     return cookie
 
 
+class MXSessionManager:
+    """
+    Keeps one MX session (JSESSIONID/SSOSESSIONID cookie pair) alive for as long as it is needed.
+
+    The cookie pair is cached in memory and in SESSION_CACHE_FILE, keyed by MX and credential, so it is reused by
+    every following script run until it expires instead of posting to /auth/session each time.  The manager registers
+    itself with mx_client, which calls refresh() to log in again when a request is answered with 401, and
+    start_keepalive() refreshes the session ahead of expiry from a background thread.
+
+    A named session (session_name) is one of several sessions to the same MX, see session_pool: it has its own cache
+    entry, and its cookie is not installed on mx_client's shared session nor used for re-login on 401; whoever holds
+    it sends the cookie with each request.
+    """
+
+    def __init__(self, host=None, port=None, basic_authorization=None, cache_file=SESSION_CACHE_FILE,
+                 ttl=SESSION_TTL, debug=False, session_name=None):
+        """
+        :param host: The MX host.  Defaults to HOST.
+        :param port: The MX port.  Defaults to PORT.
+        :param basic_authorization: The Basic Authorization header value.  Defaults to BASIC_AUTHORIZATION.
+        :param cache_file: The file the cookies are persisted to, or None to cache in memory only.
+        :param ttl: How long the MX keeps an idle session alive, in seconds.
+        :param debug: Whether to enable debug mode or not.
+        :param session_name: Optional name of the session, e.g. "pool-3", to hold several sessions with one credential.
+        """
+        self.host = str(host or HOST)
+        self.port = str(port or PORT)
+        self.basic_authorization = basic_authorization or BASIC_AUTHORIZATION
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.debug = debug
+        self.session_name = session_name
+        self.cookie: Optional[str] = None
+        self.expires_at = 0.0
+        # Status code of the last login attempt, for reporting failures.
+        self.status_code: Optional[int] = None
+        self._lock = threading.RLock()
+        self._stop_keepalive = threading.Event()
+        self._keepalive_thread: Optional[threading.Thread] = None
+        credential = hashlib.sha256(self.basic_authorization.encode()).hexdigest()[:16]
+        self._cache_key = f"{self.host}:{self.port}:{credential}"
+        if session_name is not None:
+            self._cache_key += f":{session_name}"
+
+    def get_cookie(self) -> Optional[str]:
+        """
+        Returns a valid session cookie, logging in only when neither the memory nor the file cache has one.
+
+        :return: (str) The cookies in string format, or None if the login failed.
+        """
+        with self._lock:
+            if self.cookie is not None and time.time() < self.expires_at:
+                return self.cookie
+            if self._load():
+                if self.debug:
+                    print(f"Reusing cached MX session for {self.host}:{self.port}")
+                self._install()
+                return self.cookie
+            return self.login()
+
+    def login(self) -> Optional[str]:
+        """
+        Posts to /auth/session and caches the new cookie pair.
+
+        :return: (str) The cookies in string format, or None if the login failed.
+        """
+        with self._lock:
+            response = authorization(self.debug, self.host, self.port, self.basic_authorization)
+            self.status_code = response.status_code
+            if response.status_code != 200:
+                print(f"Failed to log in to {self.host}:{self.port} with status code {response.status_code}")
+                self.cookie = None
+                self.expires_at = 0.0
+                return None
+            self.cookie = get_cookie(response, self.debug)
+            self.expires_at = time.time() + self.ttl
+            self._save()
+            self._install()
+            return self.cookie
+
+    def refresh(self, stale_cookie: Optional[str] = None) -> Optional[str]:
+        """
+        Logs in again after the MX rejected stale_cookie.  If another thread already replaced it, the current cookie is
+        returned without a second login.
+
+        :param stale_cookie: (str) The Cookie header of the rejected request.
+        :return: (str) The cookies in string format, or None if the login failed.
+        """
+        with self._lock:
+            if self.cookie is not None and stale_cookie is not None and not self._sent_with(stale_cookie):
+                return self.cookie
+            return self.login()
+
+    def keepalive(self) -> None:
+        """
+        Refreshes the session if it is within SESSION_REFRESH_MARGIN of expiring.  A cheap authenticated GET extends
+        the existing session; a new login is only done if the MX no longer accepts it.
+
+        :return: None
+        """
+        with self._lock:
+            if self.cookie is None or self.expires_at - time.time() > SESSION_REFRESH_MARGIN:
+                return
+            url = f"https://{self.host}:{self.port}{KEEPALIVE_PATH}"
+            try:
+                response = mx_client.request("GET", url, reauth=False, headers={"Cookie": self.cookie})
+            except Exception as e:
+                print(f"MX keepalive to {self.host}:{self.port} failed: {e}")
+                return
+            if response.status_code == 200:
+                self.expires_at = time.time() + self.ttl
+                self._save()
+            else:
+                self.login()
+
+    def start_keepalive(self, interval=KEEPALIVE_INTERVAL) -> None:
+        """
+        Starts a daemon thread that calls keepalive() every interval seconds.
+
+        :param interval: Seconds between keepalive checks.
+        :return: None
+        """
+        if self._keepalive_thread is not None and self._keepalive_thread.is_alive():
+            return
+        self._stop_keepalive.clear()
+
+        def run():
+            while not self._stop_keepalive.wait(interval):
+                self.keepalive()
+
+        self._keepalive_thread = threading.Thread(target=run, name=f"mx-keepalive-{self.host}", daemon=True)
+        self._keepalive_thread.start()
+
+    def stop_keepalive(self) -> None:
+        """
+        Stops the keepalive thread started by start_keepalive().
+
+        :return: None
+        """
+        self._stop_keepalive.set()
+        if self._keepalive_thread is not None:
+            self._keepalive_thread.join()
+            self._keepalive_thread = None
+
+    def logout(self) -> None:
+        """
+        Ends the session on the MX (best effort) and drops it from the caches.
+
+        :return: None
+        """
+        with self._lock:
+            if self.cookie is not None:
+                url = f"https://{self.host}:{self.port}/SecureSphere/api/v1/auth/session"
+                try:
+                    mx_client.request("DELETE", url, reauth=False, headers={"Cookie": self.cookie})
+                except Exception as e:
+                    print(f"MX logout from {self.host}:{self.port} failed: {e}")
+            self.invalidate()
+
+    def invalidate(self) -> None:
+        """
+        Drops the cached session from memory and from the cache file.
+
+        :return: None
+        """
+        with self._lock:
+            self.cookie = None
+            self.expires_at = 0.0
+            self._save()
+
+    def _sent_with(self, cookie_header: str) -> bool:
+        current = mx_client.parse_cookie(self.cookie or "")
+        sent = mx_client.parse_cookie(cookie_header)
+        return current.get("JSESSIONID") == sent.get("JSESSIONID")
+
+    def _install(self) -> None:
+        if self.session_name is not None:
+            return
+        # The cookies are scoped to this MX, so several managers can share mx_client's session.
+        mx_client.set_cookie(self.cookie, self.host)
+        mx_client.register_reauth(self.refresh, self.host)
+
+    def _load(self) -> bool:
+        entry = _read_cache_file(self.cache_file).get(self._cache_key)
+        if not entry or entry.get("expires_at", 0) <= time.time():
+            return False
+        self.cookie = entry["cookie"]
+        self.expires_at = entry["expires_at"]
+        return True
+
+    def _save(self) -> None:
+        if self.cache_file is None:
+            return
+        with _cache_file_locked(self.cache_file):
+            cache = _read_cache_file(self.cache_file)
+            now = time.time()
+            cache = {key: entry for key, entry in cache.items() if entry.get("expires_at", 0) > now}
+            if self.cookie is not None:
+                cache[self._cache_key] = {"cookie": self.cookie, "expires_at": self.expires_at}
+            else:
+                cache.pop(self._cache_key, None)
+            _write_cache_file(self.cache_file, cache)
+
+
+_session_managers: Dict[str, MXSessionManager] = {}
+_session_managers_lock = threading.Lock()
+
+
+def get_session_manager(host=None, port=None, basic_authorization=None, debug=False) -> MXSessionManager:
+    """
+    Returns the process-wide MXSessionManager for an MX, creating it on first use.
+
+    :param host: The MX host.  Defaults to HOST.
+    :param port: The MX port.  Defaults to PORT.
+    :param basic_authorization: The Basic Authorization header value.  Defaults to BASIC_AUTHORIZATION.
+    :param debug: Whether to enable debug mode or not.
+    :return: The session manager
+    """
+    key = f"{host or HOST}:{port or PORT}:{basic_authorization or BASIC_AUTHORIZATION}"
+    with _session_managers_lock:
+        manager = _session_managers.get(key)
+        if manager is None:
+            manager = MXSessionManager(host, port, basic_authorization, cache_file=SESSION_CACHE_FILE, debug=debug)
+            _session_managers[key] = manager
+        return manager
+
+
+# Serializes the read-modify-write of the cache file between the session managers of this process.
+_cache_file_lock = threading.Lock()
+
+
+@contextmanager
+def _cache_file_locked(path) -> Iterator[None]:
+    # The lock file sits next to the cache, since the cache itself is replaced on every write.
+    with _cache_file_lock:
+        fd = None
+        if fcntl is not None:
+            try:
+                fd = os.open(f"{path}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+            except OSError as e:
+                print(f"Unable to lock the MX session cache {path}: {e}")
+        try:
+            if fd is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+
+def _read_cache_file(path) -> Dict[str, Dict]:
+    if path is None:
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_cache_file(path, cache) -> None:
+    # mkstemp() creates the file readable and writable by the current user only (0600).  It is renamed over the cache
+    # so a concurrent run never reads a partial file.
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".mx_session_cache.")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Unable to write the MX session cache {path}: {e}")
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+
+
 if __name__ == '__main__':
     debug = DEBUG
     response: object = authorization(debug)
@@ -0,0 +1,343 @@
+import argparse
+import logging
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import bulk_executor
+import mx_client
+
+"""
+Description:
+This Python script provides the batched (coalesced) write mode of the server group scripts.
+
+create_protected_ip_list() and update_server_group_iplist() send one request per IP, even when hundreds of rows target
+the same site and server group.  run_batched() groups the rows by MX, site and server group instead, and writes each
+group with the MX's collection-level endpoint, one request per BATCH_SIZE rows:
+    protected IPs      PUT /conf/serverGroups/{site}/{server group}/protectedIPs   {"protected-ips": [...]}
+    server group IPs   PUT /conf/serverGroups/{site}/{server group}/servers        {"servers": [...]}
+A collection PUT replaces the whole list, so the current list is read once per group (GET on the same collection) and
+the rows are merged into it.  The PUT carries the GET's ETag in If-Match, so an entry another writer added in between
+is not overwritten: the MX answers 412 and the batch's rows are sent with the per-IP calls.  An MX that sends no ETag
+can't detect this, and batched writes then need exclusive access to their server groups for the length of the run.
+A group's batches run one after the other; different groups run concurrently, per MX, through
+bulk_executor.run_per_mx().  The collection requests and the per-IP calls of an MX share one limit of concurrency
+requests in flight.  Rows are held back per group until it fills a batch, at most MAX_PENDING_ROWS in all: past that,
+the largest group is written as a partial batch.
+
+Every row still gets its own RowResult (and journal entry):
+- the rows of a successful collection PUT share its status code;
+- a row the collection PUT can't express (a create of an IP the MX already has, an update of an IP it doesn't have) is
+  sent with the per-IP call, so it gets the MX's own answer;
+- when the MX is older than BATCH_MIN_VERSION, or answers the collection PUT with 404/405/501, the MX is remembered as
+  not supporting it and the rows are sent with the per-IP calls, concurrently;
+- when a collection PUT fails for any other reason, its rows are retried with the per-IP calls, so the failure is
+  pinned to the rows that cause it.
+
+Usage:
+    results = batch_writes.run_batched(rows, batch_writes.PROTECTED_IPS, create_row, headers, concurrency, debug,
+                                       journal.record)
+
+Developer note: This is code from my personal lab for my professional development. This should be considered example
+code only.
+
+Revision History:
+-----------------
+2026-10-17:
+    Initial creation of the script.
+2026-10-18:
+    The batches and the per-IP calls of an MX share one concurrency limit; the rows held back for their batch are
+    bounded (MAX_PENDING_ROWS); the collection PUT is conditional on the GET's ETag.
+2026-10-18:
+    Added run_batched_numbered(), for rows that keep their numbers in the file after --resume/--retry-failed.
+"""
+
+logger = logging.getLogger(__name__)
+
+# Global variables
+API_PATH = "/SecureSphere/api/v1"
+# Rows written per collection PUT.
+BATCH_SIZE = 500
+# Rows held back in under-full batches, across all groups, before the largest group is written early.
+MAX_PENDING_ROWS = 5000
+# The oldest MX version (GET /administration/version) whose collection PUTs are used.
+BATCH_MIN_VERSION = (13, 0)
+# Answers to a collection PUT that mean the MX does not have it.
+UNSUPPORTED_STATUS_CODES = frozenset({404, 405, 501})
+
+# (MX-IP, MX-port) -> whether the MX takes collection PUTs
+_supported: Dict[Tuple[str, str], bool] = {}
+_supported_lock = threading.Lock()
+
+
+class BatchOperation(NamedTuple):
+    """
+    A per-IP write that can be coalesced into a collection PUT.
+
+    collection: the collection under /conf/serverGroups/{site}/{server group}
+    list_field: the field of the collection's GET and PUT bodies that holds the list
+    item: builds the list item of a row
+    create: True if the rows add items (an IP already in the list is sent per IP), False if they update existing items
+            (an IP missing from the list is sent per IP)
+    """
+    name: str
+    collection: str
+    list_field: str
+    item: Callable[[Dict[str, Any]], Dict[str, Any]]
+    create: bool
+
+
+PROTECTED_IPS = BatchOperation(
+    "protected IPs", "protectedIPs", "protected-ips",
+    lambda row: {"ip": row['ip-address'], "gateway-group": row['gateway_group_name'], "comment": row['comment']},
+    create=True)
+SERVER_OS = BatchOperation(
+    "server group IPs", "servers", "servers",
+    lambda row: {"ip": row['ip-address'], "OS-type": row['OS-type']},
+    create=False)
+
+
+def group_key(row: Dict[str, Any]) -> Tuple[str, str, Any, Any]:
+    """
+    The server group a row writes to.
+
+    :param row: A dictionary representing one row of the input CSV file
+    :return: The (MX-IP, MX-port, site, server_group_name) tuple
+    """
+    return bulk_executor.mx_key(row) + (row.get('site'), row.get('server_group_name'))
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Adds the --batch and --batch-size options.
+
+    :param parser: The script's argument parser
+    :return: None
+    """
+    parser.add_argument("--batch", action="store_true",
+                        help="write the rows of each server group with collection requests, falling back to one "
+                             "request per IP where the MX does not support them")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help=f"rows written per collection request (default: {BATCH_SIZE})")
+
+
+def _version(text: str) -> Tuple[int, ...]:
+    return tuple(int(part) for part in re.findall(r"\d+", text))
+
+
+def supports_batches(host: str, port: str, headers: Dict[str, str]) -> bool:
+    """
+    Whether an MX takes collection PUTs, judging by its version.  The answer is cached per MX, and is turned to False
+    when the MX rejects a collection PUT as unknown.
+
+    :param host: The MX host
+    :param port: The MX port
+    :param headers: The headers of the API calls
+    :return: True if collection PUTs should be tried
+    """
+    key = (str(host), str(port))
+    with _supported_lock:
+        if key in _supported:
+            return _supported[key]
+    supported = True
+    try:
+        response = mx_client.get(f"https://{host}:{port}{API_PATH}/administration/version", headers=headers)
+        if response.status_code == 200:
+            version = _version(str(response.json().get("serverVersion", "")))
+            supported = not version or version >= BATCH_MIN_VERSION
+    except Exception as e:
+        # The collection PUT itself tells whether it is supported.
+        logger.debug("Unable to read the version of MX %s:%s: %s", host, port, e)
+    with _supported_lock:
+        return _supported.setdefault(key, supported)
+
+
+def _mark_unsupported(host: str, port: str) -> None:
+    with _supported_lock:
+        _supported[(str(host), str(port))] = False
+
+
+def _batches(numbered_rows: Iterable[Tuple[int, Dict[str, Any]]], batch_size: int,
+             max_pending: int = MAX_PENDING_ROWS) -> Iterator[Dict[str, Any]]:
+    """
+    Groups the rows by server group, yielding a batch as soon as a group has batch_size rows, the largest group when
+    more than max_pending rows are held back, and the rest at the end.  A batch carries the MX-IP/MX-port of its rows,
+    so run_per_mx() partitions it like a row.
+    """
+    pending: Dict[Hashable, List[Tuple[int, Dict[str, Any]]]] = {}
+    held = 0
+
+    def batch(key, group_rows):
+        return {'MX-IP': group_rows[0][1].get('MX-IP'), 'MX-port': group_rows[0][1].get('MX-port'),
+                'group': key, 'rows': group_rows}
+
+    for rownum, row in numbered_rows:
+        key = group_key(row)
+        group = pending.setdefault(key, [])
+        group.append((rownum, row))
+        held += 1
+        if len(group) >= batch_size:
+            held -= len(group)
+            yield batch(key, pending.pop(key))
+        elif held > max_pending:
+            largest = max(pending, key=lambda k: len(pending[k]))
+            held -= len(pending[largest])
+            yield batch(largest, pending.pop(largest))
+    for key, group in pending.items():
+        yield batch(key, group)
+
+
+def run_batched(rows: Iterable[Dict[str, Any]], operation: BatchOperation,
+                send_one: Callable[[int, Dict[str, Any]], Any],
+                headers: Dict[str, str],
+                concurrency: int = bulk_executor.DEFAULT_CONCURRENCY,
+                debug: bool = False,
+                on_result: Optional[Callable[[Dict[str, Any], bulk_executor.RowResult], None]] = None,
+                batch_size: int = BATCH_SIZE) -> List[bulk_executor.RowResult]:
+    """
+    Writes the rows with one collection PUT per server group batch, and the rows that can't be batched with send_one.
+    See run_batched_numbered().
+
+    :param rows: An iterable of dictionaries, one per CSV row
+    :param operation: PROTECTED_IPS or SERVER_OS
+    :param send_one: The per-row task of the script, used for the rows that are not batched
+    :param headers: The headers of the API calls
+    :param concurrency: The maximum number of requests (collection or per-IP) in flight at once, per MX
+    :param debug: Whether to enable debug mode or not.
+    :param on_result: Optional function called with (row, RowResult) as each row completes, e.g. RunJournal.record
+    :param batch_size: The maximum number of rows per collection PUT
+    :return: A list of RowResult, one per row, sorted by rownum
+    """
+    return run_batched_numbered(enumerate(rows, start=1), operation, send_one, headers, concurrency, debug, on_result,
+                                batch_size)
+
+
+def run_batched_numbered(numbered_rows: Iterable[Tuple[int, Dict[str, Any]]], operation: BatchOperation,
+                         send_one: Callable[[int, Dict[str, Any]], Any],
+                         headers: Dict[str, str],
+                         concurrency: int = bulk_executor.DEFAULT_CONCURRENCY,
+                         debug: bool = False,
+                         on_result: Optional[Callable[[Dict[str, Any], bulk_executor.RowResult], None]] = None,
+                         batch_size: int = BATCH_SIZE) -> List[bulk_executor.RowResult]:
+    """
+    Same as run_batched(), for rows that already carry their rownum, e.g. the rows RunJournal.filter_numbered() kept.
+
+    :param numbered_rows: An iterable of (rownum, row) tuples
+    :param operation: PROTECTED_IPS or SERVER_OS
+    :param send_one: The per-row task of the script, used for the rows that are not batched
+    :param headers: The headers of the API calls
+    :param concurrency: The maximum number of requests (collection or per-IP) in flight at once, per MX
+    :param debug: Whether to enable debug mode or not.
+    :param on_result: Optional function called with (row, RowResult) as each row completes, e.g. RunJournal.record
+    :param batch_size: The maximum number of rows per collection PUT
+    :return: A list of RowResult, one per row, sorted by rownum
+    """
+    results: List[bulk_executor.RowResult] = []
+    results_lock = threading.Lock()
+    # Batch number -> batch, until run_batch() takes it.  The batches left failed to log in to their MX.
+    pending: Dict[int, Dict[str, Any]] = {}
+    # One limit per MX for both levels: the batch workers and the per-IP workers they start.
+    slots: Dict[Tuple[str, str], threading.BoundedSemaphore] = {}
+
+    def slot(host, port):
+        with results_lock:
+            if (host, port) not in slots:
+                slots[(host, port)] = threading.BoundedSemaphore(max(1, int(concurrency)))
+            return slots[(host, port)]
+
+    def numbered_batches():
+        # run_per_mx() numbers the batches the same way.
+        for batch_number, batch in enumerate(_batches(numbered_rows, batch_size), start=1):
+            with results_lock:
+                pending[batch_number] = batch
+            yield batch
+
+    def record(numbered_rows, ok, status_code, message, elapsed):
+        row_results = [bulk_executor.RowResult(rownum, ok, status_code, message, elapsed)
+                       for rownum, _ in numbered_rows]
+        with results_lock:
+            results.extend(row_results)
+        if on_result is not None:
+            for (_, row), result in zip(numbered_rows, row_results):
+                on_result(row, result)
+
+    def send_each(numbered_rows, mx_slot):
+        def send_limited(rownum, row):
+            with mx_slot:
+                return send_one(rownum, row)
+
+        row_results = bulk_executor.run_numbered(numbered_rows, send_limited, concurrency, on_result=on_result)
+        with results_lock:
+            results.extend(row_results)
+
+    def write_batch(batch):
+        """
+        Writes what it can of a batch with one collection PUT, and returns the rows left to send one by one.
+        """
+        numbered_rows = batch['rows']
+        host, port, site_name, server_group_name = batch['group']
+        if not supports_batches(host, port, headers):
+            return numbered_rows
+        url = f"https://{host}:{port}{API_PATH}/conf/serverGroups/{site_name}/{server_group_name}/{operation.collection}"
+        start = time.perf_counter()
+        response = mx_client.get(url, headers=headers)
+        if response.status_code != 200:
+            logger.warning("Unable to read the %s of %s/%s (Error Code: %d); sending them one by one",
+                           operation.name, site_name, server_group_name, response.status_code)
+            return numbered_rows
+        etag = response.headers.get("ETag")
+        items = {item.get("ip"): item for item in response.json().get(operation.list_field, [])}
+        batched, single = [], []
+        for rownum, row in numbered_rows:
+            item = operation.item(row)
+            if (item["ip"] in items) == operation.create:
+                single.append((rownum, row))
+            else:
+                items[item["ip"]] = dict(items.get(item["ip"], {}), **item)
+                batched.append((rownum, row))
+        if not batched:
+            return single
+        # Only replace the list if nobody changed it since it was read.
+        put_headers = dict(headers, **{"If-Match": etag}) if etag else headers
+        response = mx_client.put(url, json={operation.list_field: list(items.values())}, headers=put_headers)
+        fields = {"site": site_name, "server_group": server_group_name, "rows": len(batched),
+                  "status_code": response.status_code}
+        if response.status_code == 200:
+            logger.info("Successfully wrote %d %s of %s/%s with one request", len(batched), operation.name,
+                        site_name, server_group_name, extra=fields)
+            record(batched, True, response.status_code, "", time.perf_counter() - start)
+            return single
+        if response.status_code in UNSUPPORTED_STATUS_CODES:
+            logger.info("MX %s:%s does not take collection requests for %s (Error Code: %d); sending them one by one",
+                        host, port, operation.name, response.status_code, extra=fields)
+            _mark_unsupported(host, port)
+        else:
+            logger.warning("Failed to write %d %s of %s/%s with one request (Error Code: %d); sending them one by one",
+                           len(batched), operation.name, site_name, server_group_name, response.status_code,
+                           extra=fields)
+        return numbered_rows
+
+    def run_batch(batch_number, batch):
+        with results_lock:
+            pending.pop(batch_number, None)
+        mx_slot = slot(*batch['group'][:2])
+        try:
+            with mx_slot:
+                single = write_batch(batch)
+        except Exception as e:
+            logger.warning("Failed to write the %s of %s/%s with one request: %s; sending them one by one",
+                           operation.name, batch['group'][2], batch['group'][3], e)
+            single = batch['rows']
+        # The slot is released first: the per-IP calls take their own, one per request.
+        if single:
+            send_each(single, mx_slot)
+
+    batch_results = bulk_executor.run_per_mx(numbered_batches(), run_batch, concurrency,
+                                             lambda batch: batch['group'], debug)
+    for result in batch_results:
+        batch = pending.pop(result.rownum, None)
+        if batch is not None:
+            record(batch['rows'], False, result.status_code, result.message, 0.0)
+    results.sort(key=lambda r: r.rownum)
+    return results
@@ -0,0 +1,316 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+import authorization_v2
+import batch_writes
+import bulk_executor
+import config_cache
+import create_protected__ip_list_v2
+import get_all_audit_report_configurations_v2
+import get_amr
+import metrics
+import mx_client
+import provision_pipeline
+import request_policy
+
+"""
+Description:
+This Python script benchmarks the provisioning and retrieval functions of this repository against the local mock MX
+(mock_mx.py), so performance regressions and improvements can be measured repeatably and without a production MX.
+
+The mock MX is started as a separate process, so the peak RSS reported is that of the scripts' code alone.  Each
+scenario drives the real functions with synthetic rows:
+    protected_ip        create_protected_ip_list() for every row, through bulk_executor.run_per_mx()
+    protected_ip_batch  the same rows through batch_writes.run_batched(): one collection PUT per server group batch
+    pipeline            provision_pipeline.run_pipeline(): protected IP, OS update and db connection for every row
+    amr                 get_amr.get_agent_monitoring_rule() for --rows lookups over --amrs rules, through config_cache
+    audit_reports       get_all_audit_report_configurations_v2.iter_audit_report_configurations()
+and reports rows (or items) per second, p50/p95/p99 latency, peak RSS, and the connections, requests and logins the
+mock MX saw.  Peak RSS is the process' high-water mark, so it only grows from one scenario to the next; run a single
+--scenario to measure it in isolation.
+
+--startup measures the import time of each script instead: every script in STARTUP_MODULES is imported in a fresh
+interpreter --repeat times, and the median wall time of the import, of the whole interpreter run, and whether pandas
+was loaded are reported.  A one-off run pays this before its first request.  The first row imports requests alone:
+every script loads it through mx_client, and with pandas and numpy no longer loaded at start it is about three
+quarters of a script's import time, the floor the scripts are measured against.
+
+Usage:
+$ python benchmark.py --rows 2000 --concurrency 16 --latency 0.01 --json results.json
+$ python benchmark.py --startup --repeat 20
+
+Developer note: This is code from my personal lab for my professional development. This should be considered example
+code only.
+
+Revision History:
+-----------------
+2026-10-17:
+    Initial creation of the script.
+2026-10-17:
+    Added the protected_ip_batch scenario.
+2026-10-18:
+    Added --startup, the import-time benchmark.
+2026-10-18:
+    --startup reports the import time of requests alone as the baseline.
+"""
+
+# Global variables
+SCENARIOS = ("protected_ip", "protected_ip_batch", "pipeline", "amr", "audit_reports")
+MOCK_HOST = "127.0.0.1"
+HEADERS = {"Content-Type": "application/json", "Authorization": "Basic YmVuY2g6YmVuY2g="}
+# requests first: the baseline every script pays through mx_client.
+STARTUP_MODULES = ("requests", "create_protected__ip_list_v2", "update_os_connection__ip_list_v2",
+                   "create_db_connection_v2", "provision_pipeline", "get_amr", "get_all_audit_report_configurations_v2")
+# Run in a fresh interpreter by measure_startup(): imports the module and prints the import time and whether pandas
+# was loaded.
+STARTUP_PROBE = ("import sys, time; start = time.perf_counter(); import {module}; elapsed = time.perf_counter() - start; "
+                 "import lazy_imports; print(elapsed, lazy_imports.is_loaded('pandas'))")
+
+
+def start_mock_mx(args: argparse.Namespace) -> Tuple[subprocess.Popen, int]:
+    """
+    Starts mock_mx.py on a free port and waits until it listens.
+
+    :param args: The benchmark's arguments
+    :return: The process and its port
+    """
+    command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "mock_mx.py"),
+               "--host", MOCK_HOST, "--port", "0", "--latency", str(args.latency), "--jitter", str(args.jitter),
+               "--error-rate", str(args.error_rate), "--audit-reports", str(args.audit_reports)]
+    if args.session_ttl is not None:
+        command += ["--session-ttl", str(args.session_ttl)]
+    if args.retry_after is not None:
+        command += ["--retry-after", str(args.retry_after)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if not line:
+        process.wait()
+        raise RuntimeError(f"The mock MX exited with status code {process.returncode}")
+    port = int(line.rsplit(":", 1)[1].split("/", 1)[0])
+    return process, port
+
+
+def make_rows(count: int, port: int, groups: int) -> List[Dict[str, Any]]:
+    """
+    Synthetic rows with the columns of every provisioning script, spread over a number of server groups.
+    """
+    return [{'MX-IP': MOCK_HOST, 'MX-port': port, 'site': "Bench Site", 'server_group_name': f"Bench Group {i % groups}",
+             'service_name': "Bench Service", 'connection_name': f"bench-{i}",
+             'ip-address': f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}",
+             'gateway_group_name': "bench-gateway-group", 'comment': f"row {i}",
+             'OS-type': ("Windows", "Linux", "AIX")[i % 3], 'user-name': "bench", 'password': "bench",
+             'named-instance': None, 'domain-name': None, 'port': 1433}
+            for i in range(count)]
+
+
+def percentile(sorted_values: Sequence[float], p: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted sequence, or 0.0 if it is empty.
+    """
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
+
+
+def mock_request(port: int, method: str, path: str) -> Dict[str, Any]:
+    response = mx_client.request(method, f"https://{MOCK_HOST}:{port}{path}", reauth=False)
+    return response.json()
+
+
+def scenario_protected_ip(rows, port, args) -> Tuple[int, List[float], int]:
+    def create_row(rownum, row):
+        return create_protected__ip_list_v2.create_protected_ip_list(
+            row['MX-IP'], row['MX-port'], row['site'], row['server_group_name'], row['ip-address'],
+            row['gateway_group_name'], {'comment': row['comment']}, HEADERS)
+
+    results = bulk_executor.run_per_mx(rows, create_row, args.concurrency)
+    return len(results), [r.elapsed for r in results], sum(not r.ok for r in results)
+
+
+def scenario_protected_ip_batch(rows, port, args) -> Tuple[int, List[float], int]:
+    def create_row(rownum, row):
+        return create_protected__ip_list_v2.create_protected_ip_list(
+            row['MX-IP'], row['MX-port'], row['site'], row['server_group_name'], row['ip-address'],
+            row['gateway_group_name'], {'comment': row['comment']}, HEADERS)
+
+    results = batch_writes.run_batched(rows, batch_writes.PROTECTED_IPS, create_row, HEADERS, args.concurrency)
+    return len(results), [r.elapsed for r in results], sum(not r.ok for r in results)
+
+
+def scenario_pipeline(rows, port, args) -> Tuple[int, List[float], int]:
+    results = provision_pipeline.run_pipeline(rows, HEADERS, args.concurrency)
+    return len(results), [r.elapsed for r in results], sum(not r.ok for r in results)
+
+
+def scenario_amr(rows, port, args) -> Tuple[int, List[float], int]:
+    get_amr.HOST, get_amr.PORT = MOCK_HOST, str(port)
+    base = f"https://{MOCK_HOST}:{port}/SecureSphere/api/v1/conf/agentsMonitoringRules"
+    for i in range(args.amrs):
+        mx_client.post(f"{base}/bench-rule-{i}", json={"policy-type": "ds-agents-monitoring-rules"}, headers=HEADERS)
+    config_cache.invalidate()
+    latencies: List[float] = []
+
+    def lookup(i):
+        start = time.perf_counter()
+        get_amr.get_agent_monitoring_rule(f"bench-rule-{i % args.amrs}", HEADERS)
+        latencies.append(time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(lookup, range(len(rows))))
+    return len(latencies), latencies, 0
+
+
+def scenario_audit_reports(rows, port, args) -> Tuple[int, List[float], int]:
+    module = get_all_audit_report_configurations_v2
+    module.HOST, module.PORT, module.DEBUG = MOCK_HOST, str(port), False
+    latencies: List[float] = []
+    count = 0
+    last = time.perf_counter()
+    for _ in module.iter_audit_report_configurations(HEADERS):
+        now = time.perf_counter()
+        latencies.append(now - last)
+        last = now
+        count += 1
+    return count, latencies, 0
+
+
+def run_scenario(name: str, scenario: Callable, rows, port: int, args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Runs one scenario against a freshly reset mock MX and measures it.
+
+    :return: The scenario's measurements
+    """
+    mock_request(port, "POST", "/mock/reset")
+    metrics.reset()
+    retries_before = sum(p.retries for p in request_policy.policies())
+    start = time.perf_counter()
+    # The functions print a line per call; keep that out of the measurement and the report.
+    with contextlib.redirect_stdout(io.StringIO()):
+        count, latencies, errors = scenario(rows, port, args)
+    elapsed = time.perf_counter() - start
+    server = mock_request(port, "GET", "/mock/stats")
+    latencies.sort()
+    return {"scenario": name, "items": count, "errors": errors, "seconds": round(elapsed, 3),
+            "items_per_second": round(count / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "connections": server["connections"], "peak_connections": server["peak_connections"],
+            "server_requests": sum(server["requests"].values()), "logins": server["logins"],
+            "retries": sum(p.retries for p in request_policy.policies()) - retries_before,
+            "cache": config_cache.stats() if name == "amr" else None,
+            "api_metrics": metrics.summary()["endpoints"]}
+
+
+def measure_startup(module: str, repeat: int) -> Dict[str, Any]:
+    """
+    Imports a module in a fresh interpreter repeat times.
+
+    :param module: The module to import, e.g. "get_amr"
+    :param repeat: The number of interpreter runs
+    :return: The median import and interpreter run times, and whether pandas was loaded
+    """
+    import_times, run_times = [], []
+    pandas_loaded = False
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", STARTUP_PROBE.format(module=module)], capture_output=True,
+                                text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        run_times.append(time.perf_counter() - start)
+        import_time, loaded = output.split()
+        import_times.append(float(import_time))
+        pandas_loaded = pandas_loaded or loaded == "True"
+    import_times.sort()
+    run_times.sort()
+    return {"module": module, "import_ms": round(percentile(import_times, 50) * 1000, 1),
+            "run_ms": round(percentile(run_times, 50) * 1000, 1), "pandas": pandas_loaded}
+
+
+def print_startup_report(reports: List[Dict[str, Any]]) -> None:
+    columns = (("module", 40), ("import_ms", 10), ("run_ms", 10), ("pandas", 7))
+    print(" ".join(f"{c:>{w}}" for c, w in columns))
+    for report in reports:
+        print(" ".join(f"{str(report[c]):>{w}}" for c, w in columns))
+
+
+def print_report(reports: List[Dict[str, Any]]) -> None:
+    columns = (("scenario", 18), ("items", 7), ("errors", 7), ("items_per_second", 10), ("p50_ms", 9),
+               ("p95_ms", 9), ("p99_ms", 9), ("peak_rss_mb", 9), ("connections", 8), ("peak_connections", 8),
+               ("server_requests", 9), ("logins", 7), ("retries", 8))
+    titles = {"items_per_second": "items/s", "peak_rss_mb": "rss MB", "connections": "conns",
+              "peak_connections": "peak", "server_requests": "requests"}
+    print(" ".join(f"{titles.get(c, c):>{w}}" for c, w in columns))
+    for report in reports:
+        print(" ".join(f"{report[c]:>{w}}" for c, w in columns))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the MX API scripts against a local mock MX.")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS,
+                        help="scenario to run (repeatable, default: all)")
+    parser.add_argument("--rows", type=int, default=1000, help="rows (or lookups) per scenario")
+    parser.add_argument("--groups", type=int, default=10, help="server groups the rows are spread over")
+    parser.add_argument("--amrs", type=int, default=50, help="distinct agent monitoring rules looked up")
+    parser.add_argument("--concurrency", type=int, default=bulk_executor.DEFAULT_CONCURRENCY,
+                        help="rows in flight at once")
+    parser.add_argument("--latency", type=float, default=0.0, help="mock MX service time per request, in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random +/- variation of the latency, in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests the mock MX fails")
+    parser.add_argument("--retry-after", type=float, help="Retry-After seconds sent with the injected errors")
+    parser.add_argument("--session-ttl", type=float, help="seconds after which mock MX sessions expire")
+    parser.add_argument("--audit-reports", type=int, default=10000,
+                        help="number of DB Audit report configurations served")
+    parser.add_argument("--rate-limit", type=float, default=request_policy.RATE_LIMIT,
+                        help="client requests per second per MX (default: no limit)")
+    parser.add_argument("--startup", action="store_true",
+                        help="measure the import time of each script in a fresh interpreter instead")
+    parser.add_argument("--repeat", type=int, default=10, help="with --startup, interpreter runs per script")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    if args.startup:
+        reports = [measure_startup(module, args.repeat) for module in STARTUP_MODULES]
+        print_startup_report(reports)
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump({"arguments": vars(args), "results": reports}, f, indent=2)
+            print(f"Results written to {args.json}")
+        sys.exit(0)
+
+    # Never touch the real session cache file.
+    authorization_v2.SESSION_CACHE_FILE = None
+    request_policy.RATE_LIMIT = args.rate_limit or None
+    process, port = start_mock_mx(args)
+    try:
+        rows = make_rows(args.rows, port, args.groups)
+        scenarios = {"protected_ip": scenario_protected_ip, "protected_ip_batch": scenario_protected_ip_batch,
+                     "pipeline": scenario_pipeline, "amr": scenario_amr, "audit_reports": scenario_audit_reports}
+        with contextlib.redirect_stdout(io.StringIO()):
+            authorization_v2.get_session_manager(MOCK_HOST, port).get_cookie()
+        reports = [run_scenario(name, scenarios[name], rows, port, args) for name in args.scenario or SCENARIOS]
+    finally:
+        process.terminate()
+        process.wait()
+        mx_client.close()
+    print_report(reports)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"arguments": vars(args), "results": reports}, f, indent=2)
+        print(f"Results written to {args.json}")
@@ -0,0 +1,333 @@
+import argparse
+import logging
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Iterable, List, NamedTuple, Optional, Tuple
+
+import authorization_v2
+import mx_client
+
+"""
+Description:
+This Python script provides the bulk executor shared by the CSV provisioning scripts.
+
+The provisioning scripts used to process input.csv one row at a time, blocking on every HTTP round trip to the MX.
+run_bulk() runs the per-row calls on a bounded pool of worker threads instead.  Rows are submitted as they are read, and
+never more than a small multiple of the concurrency level is queued, so the input can be streamed.  When an order_key is
+given, rows that share a key (for example the same site and server group) are run one after the other in file order,
+while rows with different keys still run concurrently.  Every row produces a RowResult, and print_summary() prints the
+totals at the end of the run.
+
+run_per_mx() partitions the rows by their MX-IP/MX-port columns, logs in once per MX and runs each partition in
+parallel, with its own MX session and its own concurrency budget.
+
+Usage:
+    results = bulk_executor.run_bulk(rows, task, concurrency=16, order_key=bulk_executor.server_group_key)
+    bulk_executor.print_summary(results, "Protected IP's")
+
+Developer note: This is code from my personal lab for my professional development. This should be considered example
+code only.
+
+Revision History:
+-----------------
+2026-10-17:
+    Initial creation of the script.
+2026-10-17:
+    Added run_per_mx() for input files that target several MXs.
+2026-10-18:
+    run_numbered() takes keep_results=False, for callers that stream the results of an endless input.
+2026-10-18:
+    run_per_mx() logs in to each MX in its partition thread, and never waits on one MX's queue to feed the others.
+2026-10-18:
+    Added run_per_mx_numbered(), for rows that keep their numbers in the file after --resume/--retry-failed.
+2026-10-18:
+    An on_result that raises is logged; the rows queued behind it in the same order key still run.
+"""
+
+logger = logging.getLogger(__name__)
+
+# Global variables
+DEFAULT_CONCURRENCY = 16
+# Rows queued ahead of the workers, per worker.
+QUEUE_DEPTH_PER_WORKER = 2
+# Marks the end of the rows fed to an MX partition.
+_END_OF_ROWS = object()
+
+
+class RowResult(NamedTuple):
+    """
+    The outcome of one CSV row.
+    """
+    rownum: int
+    ok: bool
+    status_code: Optional[int]
+    message: str
+    elapsed: float
+
+
+def server_group_key(row: Dict[str, Any]) -> Hashable:
+    """
+    Order key that serializes the rows targeting the same server group on the same MX.
+
+    :param row: A dictionary representing one row of the input CSV file
+    :return: The (MX-IP, MX-port, site, server_group_name) tuple
+    """
+    return row.get('MX-IP'), row.get('MX-port'), row.get('site'), row.get('server_group_name')
+
+
+def mx_key(row: Dict[str, Any]) -> Tuple[str, str]:
+    """
+    The MX a row is sent to.
+
+    :param row: A dictionary representing one row of the input CSV file
+    :return: The (MX-IP, MX-port) tuple, as strings
+    """
+    return str(row.get('MX-IP')), str(row.get('MX-port'))
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Adds the command line options shared by the bulk provisioning scripts.
+
+    :param parser: The script's argument parser
+    :return: None
+    """
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="number of rows sent to each MX at the same time")
+    parser.add_argument("--ordered", action="store_true",
+                        help="send the rows of each server group one at a time, in file order")
+    parser.add_argument("--journal", help="result journal file (default: <input csv>.journal.db)")
+    resume = parser.add_mutually_exclusive_group()
+    resume.add_argument("--resume", action="store_true",
+                        help="skip the rows the journal records as already succeeded")
+    resume.add_argument("--retry-failed", action="store_true",
+                        help="only send the rows the journal records as failed")
+
+
+def run_bulk(rows: Iterable[Dict[str, Any]], task: Callable[[int, Dict[str, Any]], Any],
+             concurrency: int = DEFAULT_CONCURRENCY,
+             order_key: Optional[Callable[[Dict[str, Any]], Hashable]] = None,
+             on_result: Optional[Callable[[Dict[str, Any], RowResult], None]] = None) -> List[RowResult]:
+    """
+    Runs task(rownum, row) for every row on a bounded pool of worker threads.
+
+    The task returns the requests.Response of its API call (a 200 counts as success), a bool, or None for success.
+    Exceptions raised by the task are recorded as failures and do not stop the run.
+
+    :param rows: An iterable of dictionaries, one per CSV row.  It is consumed lazily.
+    :param task: The per-row function.  rownum starts at 1.
+    :param concurrency: The maximum number of rows in flight at once
+    :param order_key: Optional function; rows with equal keys are run sequentially, in input order
+    :param on_result: Optional function called with (row, RowResult) as each row completes, e.g. RunJournal.record
+    :return: A list of RowResult, sorted by rownum
+    """
+    return run_numbered(enumerate(rows, start=1), task, concurrency, order_key, on_result)
+
+
+def run_numbered(numbered_rows: Iterable[Tuple[int, Dict[str, Any]]], task: Callable[[int, Dict[str, Any]], Any],
+                 concurrency: int = DEFAULT_CONCURRENCY,
+                 order_key: Optional[Callable[[Dict[str, Any]], Hashable]] = None,
+                 on_result: Optional[Callable[[Dict[str, Any], RowResult], None]] = None,
+                 keep_results: bool = True) -> List[RowResult]:
+    """
+    Same as run_bulk(), for rows that already carry their rownum, e.g. a subset of the rows of a file.
+
+    :param numbered_rows: An iterable of (rownum, row) tuples.  It is consumed lazily.
+    :param task: The per-row function
+    :param concurrency: The maximum number of rows in flight at once
+    :param order_key: Optional function; rows with equal keys are run sequentially, in input order
+    :param on_result: Optional function called with (row, RowResult) as each row completes
+    :param keep_results: Collect the results for the return value.  A caller that only uses on_result, e.g. on an
+                         endless stream of rows, passes False so memory does not grow with every row.
+    :return: A list of RowResult, sorted by rownum (empty when keep_results is False)
+    """
+    concurrency = max(1, int(concurrency))
+    mx_client.ensure_pool_size(concurrency)
+    results: List[RowResult] = []
+    results_lock = threading.Lock()
+    # Bounds the number of rows read ahead of the workers.
+    slots = threading.BoundedSemaphore(concurrency * QUEUE_DEPTH_PER_WORKER)
+    # Rows waiting behind a running row with the same order key.
+    lanes: Dict[Hashable, deque] = {}
+    lanes_lock = threading.Lock()
+
+    def run_one(rownum, row):
+        start = time.perf_counter()
+        try:
+            result = _to_result(rownum, task(rownum, row), time.perf_counter() - start)
+        except Exception as e:
+            result = RowResult(rownum, False, None, f"{type(e).__name__}: {e}", time.perf_counter() - start)
+        finally:
+            slots.release()
+        if keep_results:
+            with results_lock:
+                results.append(result)
+        _notify(on_result, row, result)
+
+    def run_lane(key, rownum, row):
+        item = (rownum, row)
+        while item is not None:
+            run_one(*item)
+            with lanes_lock:
+                waiting = lanes[key]
+                if waiting:
+                    item = waiting.popleft()
+                else:
+                    del lanes[key]
+                    item = None
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="mx-bulk") as executor:
+        for rownum, row in numbered_rows:
+            slots.acquire()
+            if order_key is None:
+                executor.submit(run_one, rownum, row)
+                continue
+            key = order_key(row)
+            with lanes_lock:
+                if key in lanes:
+                    lanes[key].append((rownum, row))
+                    continue
+                lanes[key] = deque()
+            executor.submit(run_lane, key, rownum, row)
+
+    results.sort(key=lambda r: r.rownum)
+    return results
+
+
+def run_per_mx(rows: Iterable[Dict[str, Any]], task: Callable[[int, Dict[str, Any]], Any],
+               concurrency: int = DEFAULT_CONCURRENCY,
+               order_key: Optional[Callable[[Dict[str, Any]], Hashable]] = None,
+               debug: bool = False,
+               on_result: Optional[Callable[[Dict[str, Any], RowResult], None]] = None) -> List[RowResult]:
+    """
+    Runs task(rownum, row) for every row, partitioned by the MX in the row's MX-IP and MX-port columns.
+    See run_per_mx_numbered().
+
+    :param rows: An iterable of dictionaries, one per CSV row.  It is consumed lazily.
+    :param task: The per-row function.  rownum starts at 1 and counts rows across all MXs.
+    :param concurrency: The maximum number of rows in flight at once, per MX
+    :param order_key: Optional function; rows with equal keys are run sequentially, in input order
+    :param debug: Whether to enable debug mode or not.
+    :param on_result: Optional function called with (row, RowResult) as each row completes, e.g. RunJournal.record
+    :return: A list of RowResult, sorted by rownum
+    """
+    return run_per_mx_numbered(enumerate(rows, start=1), task, concurrency, order_key, debug, on_result)
+
+
+def run_per_mx_numbered(numbered_rows: Iterable[Tuple[int, Dict[str, Any]]],
+                        task: Callable[[int, Dict[str, Any]], Any],
+                        concurrency: int = DEFAULT_CONCURRENCY,
+                        order_key: Optional[Callable[[Dict[str, Any]], Hashable]] = None,
+                        debug: bool = False,
+                        on_result: Optional[Callable[[Dict[str, Any], RowResult], None]] = None) -> List[RowResult]:
+    """
+    Same as run_per_mx(), for rows that already carry their rownum, e.g. the rows RunJournal.filter_numbered() kept.
+
+    The first row for an MX starts a partition thread, which logs in to the MX through
+    authorization_v2.get_session_manager(), so each MX gets its own session cookie, and runs that MX's rows on its own
+    pool of concurrency workers.  Partitions run in parallel: the rows are handed to them through unbounded queues, so
+    a slow or unreachable MX holds back only its own rows (which wait in memory), never the logins and rows of the
+    other MXs.  If the login to an MX fails, its rows are recorded as failures without being sent.
+
+    :param numbered_rows: An iterable of (rownum, row) tuples.  It is consumed lazily.
+    :param task: The per-row function
+    :param concurrency: The maximum number of rows in flight at once, per MX
+    :param order_key: Optional function; rows with equal keys are run sequentially, in input order
+    :param debug: Whether to enable debug mode or not.
+    :param on_result: Optional function called with (row, RowResult) as each row completes, e.g. RunJournal.record
+    :return: A list of RowResult, sorted by rownum
+    """
+    results: List[RowResult] = []
+    results_lock = threading.Lock()
+    # Row queue per MX.  Unbounded, so that the reader never waits on a slow or unreachable MX while the others idle.
+    partitions: Dict[Tuple[str, str], queue.Queue] = {}
+    threads: List[threading.Thread] = []
+
+    def queued_rows(rows_queue):
+        while True:
+            item = rows_queue.get()
+            if item is _END_OF_ROWS:
+                return
+            yield item
+
+    def run_partition(key, rows_queue):
+        # Each partition logs in to its own MX, so a slow login holds back only that MX's rows.
+        manager = authorization_v2.get_session_manager(*key, debug=debug)
+        if manager.get_cookie() is None:
+            message = f"Login to MX {key[0]}:{key[1]} failed"
+            partition_results = []
+            for rownum, row in queued_rows(rows_queue):
+                result = RowResult(rownum, False, manager.status_code, message, 0.0)
+                partition_results.append(result)
+                _notify(on_result, row, result)
+        else:
+            logger.info("Logged in to MX %s:%s", *key, extra={"mx": f"{key[0]}:{key[1]}"})
+            manager.start_keepalive()
+            partition_results = run_numbered(queued_rows(rows_queue), task, concurrency, order_key, on_result)
+        with results_lock:
+            results.extend(partition_results)
+
+    try:
+        for rownum, row in numbered_rows:
+            key = mx_key(row)
+            rows_queue = partitions.get(key)
+            if rows_queue is None:
+                rows_queue = partitions[key] = queue.Queue()
+                thread = threading.Thread(target=run_partition, args=(key, rows_queue),
+                                          name=f"mx-partition-{key[0]}:{key[1]}")
+                thread.start()
+                threads.append(thread)
+            rows_queue.put((rownum, row))
+    finally:
+        for rows_queue in partitions.values():
+            rows_queue.put(_END_OF_ROWS)
+        for thread in threads:
+            thread.join()
+
+    results.sort(key=lambda r: r.rownum)
+    return results
+
+
+def _notify(on_result: Optional[Callable[[Dict[str, Any], RowResult], None]], row: Dict[str, Any],
+            result: RowResult) -> None:
+    # A failing callback (e.g. a journal that can't be written) is logged, and never stops the rows behind this one.
+    if on_result is None:
+        return
+    try:
+        on_result(row, result)
+    except Exception:
+        logger.exception("on_result failed for row %d", result.rownum, extra={"rownum": result.rownum})
+
+
+def _to_result(rownum: int, outcome: Any, elapsed: float) -> RowResult:
+    status_code = getattr(outcome, "status_code", None)
+    if status_code is not None:
+        ok = status_code == 200
+        return RowResult(rownum, ok, status_code, "" if ok else outcome.text, elapsed)
+    if outcome is None or outcome is True:
+        return RowResult(rownum, True, None, "", elapsed)
+    return RowResult(rownum, False, None, "failed" if outcome is False else str(outcome), elapsed)
+
+
+def print_summary(results: List[RowResult], title: str, elapsed: Optional[float] = None) -> None:
+    """
+    Prints the totals of a bulk run and the rows that failed.
+
+    :param results: The list returned by run_bulk()
+    :param title: What was being provisioned, e.g. "Protected IP's"
+    :param elapsed: Optional wall time of the run in seconds, used for the rows/sec figure
+    :return: None
+    """
+    failed = [r for r in results if not r.ok]
+    print(f"\n{title}: {len(results)} rows, {len(results) - len(failed)} succeeded, {len(failed)} failed")
+    if elapsed:
+        print(f"Elapsed: {elapsed:.2f}s ({len(results) / elapsed:.1f} rows/sec)")
+    if failed:
+        by_status = Counter(str(r.status_code) if r.status_code is not None else "no response" for r in failed)
+        print("Failures by status code: " + ", ".join(f"{k}: {v}" for k, v in sorted(by_status.items())))
+        for r in failed:
+            status = r.status_code if r.status_code is not None else "-"
+            print(f"  row {r.rownum}: {status} {r.message.strip()[:200]}")
@@ -0,0 +1,491 @@
+import argparse
+import importlib
+import importlib.util
+import json
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import amr_archive
+import authorization_v2
+import bulk_executor
+import csv_reader
+import get_all_audit_report_configurations_v2
+import get_amr
+import lazy_imports
+import metrics
+import mx_logging
+import reconcile
+
+# pyarrow is optional: without it the export falls back to NDJSON.
+pa = lazy_imports.lazy_module("pyarrow", "Parquet and Arrow exports")
+
+"""
+Description:
+This Python script exports MX configuration to columnar files for offline analysis with a dataframe engine (pandas,
+polars, DuckDB, Spark...), instead of re-fetching and re-parsing JSON for every query.
+
+Each object is flattened (flatten()): nested objects become dotted columns ("criteria.operation"), lists are kept as
+JSON text, and every column gets one type (bool, int64, float64 or string) per row group.  The datasets (DATASETS) are:
+    audit_reports   the flattened DB Audit report configurations   (get_all_audit_report_configurations_v2.py)
+    amrs            the agent monitoring rules                      (amr_archive.py)
+    protected_ips   the protected IPs of the server groups of --input
+    server_ips      the server group IPs of the server groups of --input
+They are written in row groups of --row-group-size rows as they are fetched, never all in memory, under Hive-style
+partition directories, by MX and, for the server group datasets, by site:
+    OUTPUT/protected_ips/mx=10.0.0.1_8083/site=DC01/part-00000.parquet
+--format parquet (the default when pyarrow is installed) or arrow (Arrow IPC) need pyarrow; ndjson needs nothing and
+writes the same flattened rows, one JSON object per line.  A row group that brings new columns, or a column whose type
+changed, starts a new part file, so every file has one schema; a column whose type widened (int to float, or to
+string) is rewritten with the wider type in the partition's earlier files when the partition is closed, so a column
+has one type in every file of a partition.  Read a partition with union-by-name, e.g.
+    duckdb: SELECT * FROM read_parquet('OUTPUT/audit_reports/**/*.parquet', hive_partitioning=1, union_by_name=1)
+A dataset is written to OUTPUT/.tmp.<dataset> and swapped in once complete, so a re-export replaces every part file of
+the previous one, and a failed export leaves the previous one in place.
+
+Usage:
+$ python columnar_export.py --output export --mx 10.0.0.1:8083 --dataset audit_reports --dataset amrs
+$ python columnar_export.py --output export --dataset protected_ips --input input.csv --format ndjson
+
+Developer note: This is code from my personal lab for my professional development. This should be considered example
+code only.
+
+Revision History:
+-----------------
+2026-10-18:
+    Initial creation of the script.
+2026-10-18:
+    A dataset is written to a fresh directory and swapped in, so a re-export leaves no part files of the previous one.
+2026-10-18:
+    A column whose type widens keeps one type across the part files of a partition.
+"""
+
+logger = logging.getLogger(__name__)
+
+# Global variables
+BASIC_AUTHORIZATION = get_amr.BASIC_AUTHORIZATION
+DATASETS = ("audit_reports", "amrs", "protected_ips", "server_ips")
+FORMATS = ("parquet", "arrow", "ndjson")
+EXTENSIONS = {"parquet": ".parquet", "arrow": ".arrow", "ndjson": ".ndjson"}
+# Rows buffered per partition before they are written as a row group.
+ROW_GROUP_SIZE = 10000
+# Number of server group collections fetched at the same time.
+FETCH_CONCURRENCY = 8
+# Server group dataset -> (collection below /conf/serverGroups/{site}/{server group}, CSV columns)
+INVENTORY = {
+    "protected_ips": ("protectedIPs", ('MX-IP', 'MX-port', 'site', 'server_group_name')),
+    "server_ips": ("servers", ('MX-IP', 'MX-port', 'site', 'server_group_name')),
+}
+
+
+def default_format() -> str:
+    """
+    parquet if pyarrow is installed, otherwise ndjson.
+    """
+    return "parquet" if importlib.util.find_spec("pyarrow") is not None else "ndjson"
+
+
+def flatten(obj: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    """
+    Flattens a JSON object: nested objects become dotted keys, lists become JSON text.
+
+    :param obj: The object
+    :param prefix: Prefix of the keys, used for the recursion
+    :return: A flat dictionary of scalar values
+    """
+    flat: Dict[str, Any] = {}
+    for key, value in obj.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, list):
+            flat[name] = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        else:
+            flat[name] = value
+    return flat
+
+
+def column_types(rows: Sequence[Dict[str, Any]]) -> Dict[str, Optional[str]]:
+    """
+    The type of every column of a row group: "bool", "int", "float" or "string", or None if it only has nulls.  A
+    column whose values mix types is a string column (an int column with floats is a float column).
+
+    :param rows: Flat rows
+    :return: Column name -> type, in the order the columns first appear
+    """
+    seen: Dict[str, set] = {}
+    for row in rows:
+        for name, value in row.items():
+            kinds = seen.setdefault(name, set())
+            if value is None:
+                continue
+            if isinstance(value, bool):
+                kinds.add("bool")
+            elif isinstance(value, int):
+                kinds.add("int")
+            elif isinstance(value, float):
+                kinds.add("float")
+            else:
+                kinds.add("string")
+    types: Dict[str, Optional[str]] = {}
+    for name, kinds in seen.items():
+        if not kinds:
+            # Only nulls: fits any type.
+            types[name] = None
+        elif len(kinds) == 1:
+            types[name] = kinds.pop()
+        elif kinds == {"int", "float"}:
+            types[name] = "float"
+        else:
+            types[name] = "string"
+    return types
+
+
+def _conform(value: Any, kind: str) -> Any:
+    if value is None:
+        return None
+    if kind == "string" and not isinstance(value, str):
+        return json.dumps(value) if isinstance(value, bool) else str(value)
+    if kind == "float":
+        return float(value)
+    return value
+
+
+def merge_types(types: Dict[str, str], other: Dict[str, Optional[str]]) -> Dict[str, str]:
+    """
+    The column types that hold the values of both: a type that changed widens to float (int and float) or string.
+
+    :param types: Column name -> type
+    :param other: Column name -> type, or None for a column with only nulls
+    :return: The merged column types, in the order the columns first appear
+    """
+    merged = dict(types)
+    for name, kind in other.items():
+        previous = merged.get(name, kind)
+        if kind is None or previous == kind:
+            merged[name] = previous or "string"
+        elif {previous, kind} == {"int", "float"}:
+            merged[name] = "float"
+        else:
+            merged[name] = "string"
+    return merged
+
+
+class PartitionWriter:
+    """
+    Writes the rows of one partition to part files, a row group at a time.  When a column's type widens, the part files
+    written before are rewritten with the wider type on close(), so a column has one type across the partition.
+    """
+
+    def __init__(self, directory: str, fmt: str, row_group_size: int = ROW_GROUP_SIZE):
+        self.directory = directory
+        self.format = fmt
+        self.row_group_size = row_group_size
+        self.rows = 0
+        self.files = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._types: Optional[Dict[str, str]] = None
+        self._writer = None
+        self._file = None
+        # (path, column types) of every part file written.
+        self._parts: List[Tuple[str, Dict[str, str]]] = []
+
+    def write(self, row: Dict[str, Any]) -> None:
+        self._buffer.append(row)
+        if len(self._buffer) >= self.row_group_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Writes the buffered rows as one row group.
+        """
+        if not self._buffer:
+            return
+        rows, self._buffer = self._buffer, []
+        types = column_types(rows)
+        if self._types is not None:
+            # The open file is kept when the row group fits its schema; otherwise the next file gets both columns.
+            merged = merge_types(self._types, types)
+            if merged != self._types:
+                self._close_file()
+            types = merged
+        if self._types is None:
+            self._types = {name: kind or "string" for name, kind in types.items()}
+            self._file, self._writer = self._open_file(self._next_path(), self._types)
+        self._write_rows(rows, self._types, self._file, self._writer)
+        self.rows += len(rows)
+
+    def _write_rows(self, rows: Sequence[Dict[str, Any]], types: Dict[str, str], file, writer) -> None:
+        columns = {name: [_conform(row.get(name), kind) for row in rows] for name, kind in types.items()}
+        if self.format == "ndjson":
+            names = list(types)
+            for values in zip(*columns.values()):
+                file.write(json.dumps(dict(zip(names, values)), ensure_ascii=False) + "\n")
+        else:
+            batch = pa.record_batch([pa.array(values, type=self._arrow_type(kind))
+                                     for values, kind in zip(columns.values(), types.values())],
+                                    schema=self._schema(types))
+            writer.write_batch(batch)
+
+    @staticmethod
+    def _arrow_type(kind: str):
+        return {"bool": pa.bool_(), "int": pa.int64(), "float": pa.float64(), "string": pa.string()}[kind]
+
+    def _schema(self, types: Dict[str, str]):
+        return pa.schema([(name, self._arrow_type(kind)) for name, kind in types.items()])
+
+    def _next_path(self) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"part-{self.files:05d}{EXTENSIONS[self.format]}")
+        self.files += 1
+        self._parts.append((path, self._types))
+        return path
+
+    def _open_file(self, path: str, types: Dict[str, str]):
+        """
+        :return: (file, writer); the writer is None for ndjson
+        """
+        if self.format == "ndjson":
+            return open(path, "w", encoding="utf-8"), None
+        if self.format == "parquet":
+            parquet = importlib.import_module("pyarrow.parquet")
+            return None, parquet.ParquetWriter(path, self._schema(types), compression="zstd")
+        file = pa.OSFile(path, "wb")
+        return file, pa.ipc.new_file(file, self._schema(types))
+
+    def _close_file(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._types = None
+
+    def _read_row_groups(self, path: str) -> Iterator[List[Dict[str, Any]]]:
+        if self.format == "ndjson":
+            with open(path, encoding="utf-8") as f:
+                rows = []
+                for line in f:
+                    rows.append(json.loads(line))
+                    if len(rows) >= self.row_group_size:
+                        yield rows
+                        rows = []
+                if rows:
+                    yield rows
+        elif self.format == "parquet":
+            parquet = importlib.import_module("pyarrow.parquet")
+            for batch in parquet.ParquetFile(path).iter_batches(batch_size=self.row_group_size):
+                yield batch.to_pylist()
+        else:
+            with pa.OSFile(path, "rb") as file:
+                reader = pa.ipc.open_file(file)
+                for i in range(reader.num_record_batches):
+                    yield reader.get_batch(i).to_pylist()
+
+    def _unify_types(self) -> None:
+        # The part files whose columns were widened by a later file are rewritten with the widened types.
+        final: Dict[str, str] = {}
+        for _, types in self._parts:
+            final = merge_types(final, types)
+        for path, types in self._parts:
+            widened = {name: final[name] for name in types}
+            if widened == types:
+                continue
+            tmp_path = os.path.join(self.directory, ".tmp." + os.path.basename(path))
+            file, writer = self._open_file(tmp_path, widened)
+            try:
+                for rows in self._read_row_groups(path):
+                    self._write_rows(rows, widened, file, writer)
+            finally:
+                if writer is not None:
+                    writer.close()
+                if file is not None:
+                    file.close()
+            os.replace(tmp_path, path)
+
+    def close(self) -> None:
+        self.flush()
+        self._close_file()
+        self._unify_types()
+
+
+class DatasetWriter:
+    """
+    Writes the rows of a dataset to one PartitionWriter per partition, under a staging directory that replaces the
+    dataset's directory when the writer is closed.
+    """
+
+    def __init__(self, root: str, dataset: str, fmt: str, row_group_size: int = ROW_GROUP_SIZE):
+        self.root = os.path.join(root, dataset)
+        self.staging = os.path.join(root, f".tmp.{dataset}")
+        self.format = fmt
+        self.row_group_size = row_group_size
+        self.partitions: Dict[Tuple[Tuple[str, str], ...], PartitionWriter] = {}
+        # Left over by an interrupted export.
+        shutil.rmtree(self.staging, ignore_errors=True)
+
+    def write(self, partition: Sequence[Tuple[str, Any]], obj: Dict[str, Any]) -> None:
+        """
+        :param partition: The partition, as (column, value) pairs, e.g. (("mx", "10.0.0.1_8083"), ("site", "DC01"))
+        :param obj: The object; it is flattened
+        """
+        key = tuple((name, str(value)) for name, value in partition)
+        writer = self.partitions.get(key)
+        if writer is None:
+            directory = os.path.join(self.staging, *(f"{name}={_path_safe(value)}" for name, value in key))
+            writer = self.partitions[key] = PartitionWriter(directory, self.format, self.row_group_size)
+        writer.write(flatten(obj))
+
+    def close(self, commit: bool = True) -> Tuple[int, int]:
+        """
+        :param commit: Replace the dataset's directory with the files written; False discards them
+        :return: (rows written, files written)
+        """
+        try:
+            for writer in self.partitions.values():
+                writer.close()
+        except BaseException:
+            commit = False
+            raise
+        finally:
+            if commit:
+                self._swap()
+            else:
+                shutil.rmtree(self.staging, ignore_errors=True)
+        return (sum(w.rows for w in self.partitions.values()), sum(w.files for w in self.partitions.values()))
+
+    def _swap(self) -> None:
+        os.makedirs(self.staging, exist_ok=True)
+        previous = f"{self.staging}.old"
+        shutil.rmtree(previous, ignore_errors=True)
+        if os.path.exists(self.root):
+            os.rename(self.root, previous)
+        os.rename(self.staging, self.root)
+        shutil.rmtree(previous, ignore_errors=True)
+
+    def __enter__(self) -> "DatasetWriter":
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        self.close(commit=exc_type is None)
+
+
+def _path_safe(value: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in value) or "_"
+
+
+def mx_partition(host: str, port: str) -> Tuple[str, str]:
+    return "mx", f"{host}_{port}"
+
+
+def iter_audit_reports(host: str, port: str, headers: Dict[str, str]) -> Iterator[Tuple[Sequence, Dict]]:
+    partition = (mx_partition(host, port),)
+    for config in get_all_audit_report_configurations_v2.iter_audit_report_configurations(headers, host, port):
+        yield partition, config
+
+
+def iter_amrs(host: str, port: str, headers: Dict[str, str]) -> Iterator[Tuple[Sequence, Dict]]:
+    partition = (mx_partition(host, port),)
+    for name, status, rule in amr_archive.iter_rules(host, port, headers):
+        if rule is None:
+            logger.error("Failed to retrieve AMR: %s (%s)", name, status, extra={"rule_name": name})
+            continue
+        yield partition, rule
+
+
+def iter_inventory(dataset: str, rows: Iterable[Dict[str, Any]]) -> Iterator[Tuple[Sequence, Dict]]:
+    """
+    Fetches a server group collection for every server group of the rows, FETCH_CONCURRENCY at a time.
+
+    :param dataset: "protected_ips" or "server_ips"
+    :param rows: The rows of the input CSV file
+    :return: An iterator of (partition, item), each item with its server_group
+    """
+    collection, columns = INVENTORY[dataset]
+    groups = list(dict.fromkeys(tuple(str(row.get(column)) for column in columns) for row in rows))
+
+    def fetch(group):
+        host, port, site, server_group = group
+        try:
+            return group, reconcile.get_collection(host, port, f"/conf/serverGroups/{site}/{server_group}/{collection}")
+        except Exception as e:
+            logger.error("Unable to read the %s of %s/%s: %s", collection, site, server_group, e)
+            return group, None
+
+    with ThreadPoolExecutor(max_workers=FETCH_CONCURRENCY) as executor:
+        for (host, port, site, server_group), items in executor.map(fetch, groups):
+            partition = (mx_partition(host, port), ("site", site))
+            for item in items or []:
+                yield partition, dict(item if isinstance(item, dict) else {"value": item},
+                                      server_group=server_group)
+
+
+def export(dataset: str, objects: Iterable[Tuple[Sequence, Dict]], output: str, fmt: str,
+           row_group_size: int = ROW_GROUP_SIZE) -> Tuple[int, int]:
+    """
+    Writes the objects of a dataset under output/dataset, replacing its previous export once every object is written.
+
+    :param dataset: The dataset name
+    :param objects: An iterable of (partition, object)
+    :param output: The output directory
+    :param fmt: "parquet", "arrow" or "ndjson"
+    :param row_group_size: Rows buffered per partition before they are written
+    :return: (rows written, files written)
+    """
+    writer = DatasetWriter(output, dataset, fmt, row_group_size)
+    try:
+        for partition, obj in objects:
+            writer.write(partition, obj)
+    except BaseException:
+        # The previous export of the dataset, if any, stays in place.
+        writer.close(commit=False)
+        raise
+    return writer.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export MX configuration to partitioned columnar files.")
+    parser.add_argument("--output", required=True, help="output directory")
+    parser.add_argument("--dataset", action="append", choices=DATASETS, help="dataset to export (repeatable, "
+                                                                             "default: all)")
+    parser.add_argument("--mx", action="append", metavar="HOST:PORT",
+                        help=f"MX of the audit_reports and amrs datasets (repeatable, default: "
+                             f"{get_amr.HOST}:{get_amr.PORT})")
+    parser.add_argument("--input", default="input.csv",
+                        help="CSV file whose server groups the protected_ips and server_ips datasets read")
+    parser.add_argument("--format", choices=FORMATS, default=default_format(),
+                        help="file format (default: parquet if pyarrow is installed, otherwise ndjson)")
+    parser.add_argument("--row-group-size", type=int, default=ROW_GROUP_SIZE, help="rows per row group")
+    mx_logging.add_arguments(parser)
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    mx_logging.configure(args.log_level, args.log_format)
+    metrics.write_at_exit(args.metrics_json, args.metrics_prom)
+    if args.format != "ndjson" and importlib.util.find_spec("pyarrow") is None:
+        parser.error(f"--format {args.format} needs pyarrow (pip install pyarrow); use --format ndjson")
+    headers: Dict[str, str] = {"Content-Type": "application/json", "Authorization": BASIC_AUTHORIZATION}
+    mxs = [tuple(mx.rsplit(":", 1)) for mx in args.mx or [f"{get_amr.HOST}:{get_amr.PORT}"]]
+    datasets = args.dataset or DATASETS
+    inventory_rows: List[Dict[str, Any]] = []
+    if any(dataset in INVENTORY for dataset in datasets):
+        inventory_rows = list(csv_reader.iter_rows(args.input, columns=INVENTORY["protected_ips"][1]))
+    logins = (mxs if any(dataset not in INVENTORY for dataset in datasets) else []) + \
+        [bulk_executor.mx_key(row) for row in inventory_rows]
+    for host, port in dict.fromkeys(logins):
+        if authorization_v2.get_session_manager(host, port, BASIC_AUTHORIZATION).get_cookie() is None:
+            logger.error("Login to MX %s:%s failed", host, port)
+    for dataset in datasets:
+        start = time.perf_counter()
+        if dataset == "audit_reports":
+            objects = (item for host, port in mxs for item in iter_audit_reports(host, port, headers))
+        elif dataset == "amrs":
+            objects = (item for host, port in mxs for item in iter_amrs(host, port, headers))
+        else:
+            objects = iter_inventory(dataset, inventory_rows)
+        rows, files = export(dataset, objects, args.output, args.format, args.row_group_size)
+        print(f"{dataset}: {rows} rows in {files} {args.format} files under {os.path.join(args.output, dataset)} "
+              f"({time.perf_counter() - start:.2f}s)")
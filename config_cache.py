@@ -0,0 +1,353 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Set
+from urllib.parse import urlsplit
+
+import mx_client
+
+"""
+Description:
+This Python script provides a read-through cache for the read-only MX configuration GETs (/conf/...), such as agent
+monitoring rules, DB Audit report configurations and the site tree.
+
+get() answers from an in-memory LRU, then from an optional on-disk tier (DISK_CACHE_DIR), and only then from the MX:
+- every endpoint has its own time to live (ENDPOINT_TTLS);
+- an expired entry that carries an ETag or Last-Modified is revalidated with If-None-Match/If-Modified-Since, and a 304
+  refreshes it without transferring the body again;
+- concurrent identical GETs are coalesced, so only one of them goes to the MX and the others wait for its answer;
+- every successful write made through mx_client (POST/PUT/DELETE) invalidates the cached entries under its URL and
+  its parent collection; a write below a server group (serverGroups/{site}/{server group}/..., or dbServices/...)
+  invalidates the whole subtree of the server group and the site's listing, since e.g. a protectedIPs POST also
+  creates a server IP.  invalidate() can be called explicitly.
+stats() returns the hit/miss counters.
+
+Usage:
+    response = config_cache.get(url, headers=headers)
+    if response.status_code == 200:
+        data = response.json()
+
+Developer note: This is code from my personal lab for my professional development. This should be considered example
+code only.
+
+Revision History:
+-----------------
+2026-10-17:
+    Initial creation of the script.
+2026-10-18:
+    A write below a server group invalidates its whole subtree.  invalidate() reads the disk tier outside the lock, and
+    a GET that was in flight during an invalidation is not cached.
+2026-10-18:
+    get() reads and writes the disk tier outside the lock; invalidations match an index of the disk entries instead of
+    reading every file.
+"""
+
+logger = logging.getLogger(__name__)
+
+# Global variables
+# Entries kept in memory.
+MAX_ENTRIES = 1024
+# Directory of the on-disk tier, or None to cache in memory only.
+DISK_CACHE_DIR: Optional[str] = None
+# Time to live in seconds, by the first path segment(s) after /conf/.  Longest match wins.
+ENDPOINT_TTLS: Dict[str, float] = {
+    "agentsMonitoringRules": 300,
+    "jsonar/dbauditreports": 600,
+    "dbauditreports": 600,
+    "sites": 3600,
+    "serverGroups": 600,
+    "dbServices": 600,
+}
+DEFAULT_TTL = 300
+# The /conf/ collections keyed by {site}/{server group}, whose writes invalidate the server group's subtree.
+SERVER_GROUP_ROOTS = ("serverGroups", "dbServices")
+
+
+class CachedResponse:
+    """
+    A cached 200 response.  Mirrors the status_code/text/json()/headers attributes of requests.Response.
+    """
+
+    def __init__(self, url: str, text: str, etag: Optional[str] = None, last_modified: Optional[str] = None,
+                 stored_at: Optional[float] = None):
+        self.url = url
+        self.status_code = 200
+        self.text = text
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = time.time() if stored_at is None else stored_at
+        self.from_cache = False
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["ETag"] = self.etag
+        if self.last_modified:
+            headers["Last-Modified"] = self.last_modified
+        return headers
+
+    def json(self):
+        return json.loads(self.text)
+
+    def to_dict(self) -> Dict:
+        return {"url": self.url, "text": self.text, "etag": self.etag, "last_modified": self.last_modified,
+                "stored_at": self.stored_at}
+
+
+_entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+_lock = threading.Lock()
+# In-flight GETs, for single-flight coalescing.
+_in_flight: Dict[str, threading.Event] = {}
+# In-flight GETs invalidated before they completed; their answer may predate the write and is not cached.
+_stale_in_flight: Set[str] = set()
+# File name -> URL of the disk tier's entries, so an invalidation does not read every file.  See _disk_entries().
+_disk_index: Dict[str, str] = {}
+_disk_index_lock = threading.Lock()
+_stats = {"hits": 0, "disk_hits": 0, "misses": 0, "revalidated": 0, "coalesced": 0, "invalidations": 0}
+
+
+def ttl_for(url: str) -> float:
+    """
+    The time to live of a URL's entry.
+
+    :param url: The full MX API URL
+    :return: The TTL in seconds
+    """
+    path = urlsplit(url).path
+    _, _, conf_path = path.partition("/conf/")
+    best, best_length = DEFAULT_TTL, -1
+    for prefix, ttl in ENDPOINT_TTLS.items():
+        if (conf_path == prefix or conf_path.startswith(prefix + "/")) and len(prefix) > best_length:
+            best, best_length = ttl, len(prefix)
+    return best
+
+
+def get(url: str, headers: Optional[Dict[str, str]] = None, ttl: Optional[float] = None):
+    """
+    GETs a configuration URL through the cache.
+
+    :param url: The full MX API URL
+    :param headers: Request headers, used only when the MX is called
+    :param ttl: Optional time to live overriding ENDPOINT_TTLS
+    :return: A CachedResponse, or the requests.Response of the MX if it did not answer 200/304
+    """
+    ttl = ttl_for(url) if ttl is None else ttl
+    while True:
+        with _lock:
+            entry = _entries.get(url)
+            if entry is not None and time.time() - entry.stored_at < ttl:
+                _entries.move_to_end(url)
+                _stats["hits"] += 1
+                entry.from_cache = True
+                return entry
+            waiter = _in_flight.get(url)
+            if waiter is None:
+                _in_flight[url] = threading.Event()
+                break
+            _stats["coalesced"] += 1
+        # Another thread is already loading or fetching this URL: wait for it and read its result.
+        waiter.wait()
+
+    try:
+        if entry is None:
+            # The disk tier is read without the lock, by the one thread loading this URL.
+            entry = _load_from_disk(url)
+            if entry is not None:
+                with _lock:
+                    if url in _stale_in_flight:
+                        entry = None
+                    else:
+                        _remember(url, entry)
+                        if time.time() - entry.stored_at < ttl:
+                            _stats["disk_hits"] += 1
+                            entry.from_cache = True
+                            return entry
+        return _fetch(url, headers, entry)
+    finally:
+        with _lock:
+            _stale_in_flight.discard(url)
+            _in_flight.pop(url).set()
+
+
+def _fetch(url: str, headers: Optional[Dict[str, str]], entry: Optional[CachedResponse]):
+    request_headers = dict(headers or {})
+    if entry is not None:
+        if entry.etag:
+            request_headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            request_headers["If-Modified-Since"] = entry.last_modified
+    response = mx_client.get(url, headers=request_headers)
+    with _lock:
+        stale = url in _stale_in_flight
+        if stale:
+            _stats["misses"] += 1
+    if stale:
+        # Invalidated while in flight: pass the answer through uncached, and never revalidate the dropped entry.
+        return mx_client.get(url, headers=headers) if response.status_code == 304 else response
+    with _lock:
+        if response.status_code == 304 and entry is not None:
+            _stats["revalidated"] += 1
+            entry.stored_at = time.time()
+            entry.from_cache = True
+            _remember(url, entry)
+        else:
+            _stats["misses"] += 1
+            if response.status_code != 200:
+                return response
+            entry = CachedResponse(url, response.text, response.headers.get("ETag"),
+                                   response.headers.get("Last-Modified"))
+            _remember(url, entry)
+    _save_to_disk(entry)
+    with _lock:
+        stale = url in _stale_in_flight
+    if stale:
+        # Invalidated while the file was written: _drop() may have scanned the directory before it existed.
+        _remove_from_disk(url)
+    return entry
+
+
+def _remember(url: str, entry: CachedResponse) -> None:
+    _entries[url] = entry
+    _entries.move_to_end(url)
+    while len(_entries) > MAX_ENTRIES:
+        _entries.popitem(last=False)
+
+
+def invalidate(url_prefix: str = "") -> int:
+    """
+    Drops every cached entry whose URL starts with url_prefix, from memory and from disk.
+
+    :param url_prefix: The URL prefix, or "" to clear the whole cache
+    :return: The number of entries dropped from memory
+    """
+    return _drop(lambda url: url.startswith(url_prefix))
+
+
+def _drop(matches: Callable[[str], bool]) -> int:
+    with _lock:
+        urls = [url for url in _entries if matches(url)]
+        for url in urls:
+            del _entries[url]
+        _stats["invalidations"] += len(urls)
+        _stale_in_flight.update(url for url in _in_flight if matches(url))
+    # The disk tier is matched against its index, without the lock, so cache lookups are not held up by the file I/O.
+    for name, url in _disk_entries().items():
+        if matches(url):
+            _remove(os.path.join(DISK_CACHE_DIR, name))
+    return len(urls)
+
+
+def _invalidate_after_write(method: str, url: str, status_code: int) -> None:
+    if status_code >= 300 or "/conf/" not in url:
+        return
+    base, _, conf_path = url.split("?", 1)[0].rstrip("/").partition("/conf/")
+    segments = conf_path.split("/")
+    if segments[0] in SERVER_GROUP_ROOTS and len(segments) >= 3:
+        # Everything of the server group (its protected IPs, servers, db services...) and the site's listing.
+        subtree = f"{base}/conf/{'/'.join(segments[:3])}"
+        listing = f"{base}/conf/{'/'.join(segments[:2])}"
+    else:
+        # The collection the written object belongs to, which includes the object itself and everything below it.
+        subtree = listing = f"{base}/conf/{'/'.join(segments[:-1])}"
+    _drop(lambda cached: cached.split("?", 1)[0] == listing or _under(cached, subtree))
+
+
+def _under(url: str, prefix: str) -> bool:
+    return url == prefix or url.startswith(prefix + "/") or url.startswith(prefix + "?")
+
+
+def stats() -> Dict[str, int]:
+    """
+    The cache counters: hits (memory), disk_hits, misses (sent to the MX), revalidated (304), coalesced (waited for
+    an identical in-flight GET), invalidations, and the current number of entries.
+
+    :return: A dictionary of counter name to value
+    """
+    with _lock:
+        return dict(_stats, entries=len(_entries))
+
+
+def _disk_path(url: str) -> Optional[str]:
+    if not DISK_CACHE_DIR:
+        return None
+    return os.path.join(DISK_CACHE_DIR, hashlib.sha256(url.encode()).hexdigest() + ".json")
+
+
+def _load_from_disk(url: str) -> Optional[CachedResponse]:
+    path = _disk_path(url)
+    if path is None:
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("url") != url:
+        return None
+    return CachedResponse(url, data["text"], data.get("etag"), data.get("last_modified"), data.get("stored_at"))
+
+
+def _save_to_disk(entry: CachedResponse) -> None:
+    path = _disk_path(entry.url)
+    if path is None:
+        return
+    os.makedirs(DISK_CACHE_DIR, mode=0o700, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=DISK_CACHE_DIR, prefix=".tmp.")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry.to_dict(), f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning("Unable to write the configuration cache entry %s: %s", path, e)
+        _remove(tmp_path)
+        return
+    with _disk_index_lock:
+        _disk_index[os.path.basename(path)] = entry.url
+
+
+def _remove_from_disk(url: str) -> None:
+    path = _disk_path(url)
+    if path is not None:
+        _remove(path)
+
+
+def _disk_entries() -> Dict[str, str]:
+    """
+    The entries of the disk tier, as file name -> URL.  Only the files not indexed yet (e.g. written by another
+    process) are read.
+    """
+    if not DISK_CACHE_DIR or not os.path.isdir(DISK_CACHE_DIR):
+        return {}
+    names = {name for name in os.listdir(DISK_CACHE_DIR) if name.endswith(".json") and not name.startswith(".tmp.")}
+    with _disk_index_lock:
+        for name in set(_disk_index) - names:
+            del _disk_index[name]
+        unindexed = names - set(_disk_index)
+    for name in unindexed:
+        try:
+            with open(os.path.join(DISK_CACHE_DIR, name), encoding="utf-8") as f:
+                url = json.load(f).get("url", "")
+        except (OSError, ValueError):
+            continue
+        with _disk_index_lock:
+            _disk_index[name] = url
+    with _disk_index_lock:
+        return {name: url for name, url in _disk_index.items() if name in names}
+
+
+def _remove(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+    with _disk_index_lock:
+        _disk_index.pop(os.path.basename(path), None)
+
+
+mx_client.add_write_listener(_invalidate_after_write)
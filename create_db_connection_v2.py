@@ -1,18 +1,34 @@
+import argparse
+import logging
+import time
 from typing import Dict, Any
 
-import requests
-import authorization_v2
-import pandas as pd
-import json
+import metrics
+import mx_client
+import mx_logging
+import preflight
+import bulk_executor
+import csv_reader
+import inventory
+import reconcile
+import run_journal
+import session_pool
+import shard_queue
 
 """
 This script is used to create multiple database connections (aliases) via API calls. The input data is stored in a CSV
 file named input.csv. This file must include several columns of data that will be used to create the connection. The
-script will read in the data from the CSV file, create a dictionary, and iterate over each row of the dictionary to
-make the appropriate API calls to create the connection. If an API call is successful, a message will be printed to the
-console indicating the connection was created. If the call fails, an error message will be printed to the console.
+script will stream the rows of the CSV file as dictionaries and make the API call that creates each connection. If an
+API call is successful, a message is logged indicating the connection was created. If the call fails, an error
+message is logged, and the summary at the end of the run lists the failed rows.
 
-It utilizes two functions: create_db_connection and read_csv.
+read_csv() streams the rows.  Optionally, preflight validates and deduplicates them and the inventory mirror skips the
+rows whose db service is missing.  The rows are then sent through one of:
+    bulk_executor.run_per_mx_numbered()   create_db_connection() per row, concurrently, per MX (the default)
+    shard_queue.run_sharded_numbered()    the same, with the rows shared by several workers (--shard-queue)
+    reconcile.run_plan()                  create_db_connection(), update_db_connection() and delete_db_connection() for
+                                          the differences with the MX (--reconcile)
+Every outcome is recorded in the result journal (run_journal), for --resume and --retry-failed.
 
 Usage:
 1. Modify the CSV file to reflect your desired entries.
@@ -30,10 +46,32 @@ Revision History:
 -----------------
 2023-02-23:
     Initial creation of the script.    
+2026-10-17:
+    read_csv() streams the rows with csv_reader instead of the pandas/JSON round trip.
+2026-10-17:
+    Messages go through logging (--log-level, --log-format) and API metrics can be written at exit.
+2026-10-17:
+    Added --preflight and --preflight-only: the file is validated and deduplicated before anything is sent.
+2026-10-18:
+    Added --shard-queue: several workers, on any number of hosts, share the rows of a run through shard_queue.
+2026-10-18:
+    Added --inventory: rows whose db service the inventory mirror knows to be missing are not sent.
+2026-10-18:
+    Added --sessions and --accounts: the requests are spread over a pool of MX sessions (session_pool).
+2026-10-18:
+    --reconcile plans from every row of the file, so --resume/--retry-failed no longer turn --delete-extra against
+    the rows an earlier run created.
 """
 
+logger = logging.getLogger(__name__)
+
 # Important filename variable
 input_csv_filename = "input.csv"
+# Each row is everything in the CSV file.  Not all API calls will require every parameter, so only these are read.
+csv_columns = ('MX-IP', 'MX-port', 'site', 'server_group_name', 'service_name', 'connection_name', 'ip-address',
+               'OS-type', 'user-name', 'password', 'named-instance', 'domain-name', 'port')
+# The columns that identify a row in the result journal
+journal_key_columns = ('MX-IP', 'MX-port', 'site', 'server_group_name', 'service_name', 'connection_name')
 
 def create_db_connection(host, port, site_name, server_group_name, service_name, connection_name, body, headers):
     """
@@ -48,96 +86,176 @@ def create_db_connection(host, port, site_name, server_group_name, service_name,
     :param body: A dictionary representing the data to send to the API
     :param headers: A dictionary representing the headers to send with the API request
 
-    :return: None
+    :return: The requests.Response of the API call
+    """
+    url: str = f"https://{host}:{port}/SecureSphere/api/v1/conf/dbServices/{site_name}/{server_group_name}/{service_name}/dbConnections/{connection_name}"
+    response = mx_client.post(url, json=body, headers=headers)
+    fields = {"connection_name": connection_name, "status_code": response.status_code}
+    if response.status_code == 200:
+        logger.info("Successfully created database connection with alias: %s", connection_name, extra=fields)
+    else:
+        logger.error("Failed to create database connection with alias: %s (Error Code: %d)\n"
+                     "Here is the error message: %s",
+                     connection_name, response.status_code, response.text, extra=fields)
+    return response
+
+
+def update_db_connection(host, port, site_name, server_group_name, service_name, connection_name, body, headers):
+    """
+    Makes an API call to update an existing database connection (alias).
+
+    :param host: A string representing the host name
+    :param port: A string representing the port number
+    :param site_name: A string representing the site name
+    :param server_group_name: A string representing the server group name
+    :param service_name: A string representing the service name
+    :param connection_name: A string representing the connection name
+    :param body: A dictionary representing the data to send to the API
+    :param headers: A dictionary representing the headers to send with the API request
+
+    :return: The requests.Response of the API call
+    """
+    url: str = f"https://{host}:{port}/SecureSphere/api/v1/conf/dbServices/{site_name}/{server_group_name}/{service_name}/dbConnections/{connection_name}"
+    response = mx_client.put(url, json=body, headers=headers)
+    fields = {"connection_name": connection_name, "status_code": response.status_code}
+    if response.status_code == 200:
+        logger.info("Successfully updated database connection with alias: %s", connection_name, extra=fields)
+    else:
+        logger.error("Failed to update database connection with alias: %s (Error Code: %d)\n"
+                     "Here is the error message: %s",
+                     connection_name, response.status_code, response.text, extra=fields)
+    return response
+
+
+def delete_db_connection(host, port, site_name, server_group_name, service_name, connection_name, headers):
+    """
+    Makes an API call to delete a database connection (alias).
+
+    :param host: A string representing the host name
+    :param port: A string representing the port number
+    :param site_name: A string representing the site name
+    :param server_group_name: A string representing the server group name
+    :param service_name: A string representing the service name
+    :param connection_name: A string representing the connection name
+    :param headers: A dictionary representing the headers to send with the API request
+
+    :return: The requests.Response of the API call
     """
     url: str = f"https://{host}:{port}/SecureSphere/api/v1/conf/dbServices/{site_name}/{server_group_name}/{service_name}/dbConnections/{connection_name}"
-    response = requests.post(url, json=body, headers=headers, verify=False)
+    response = mx_client.delete(url, headers=headers)
+    fields = {"connection_name": connection_name, "status_code": response.status_code}
     if response.status_code == 200:
-        print(f"Successfully created database connection with alias: {connection_name}")
+        logger.info("Successfully deleted database connection with alias: %s", connection_name, extra=fields)
     else:
-        print("Error Code:  " + str(response.status_code))
-        print(
-            f"Failed to create database connection with alias: {connection_name}\nHere is the error message: {response.text}")
+        logger.error("Failed to delete database connection with alias: %s (Error Code: %d)\n"
+                     "Here is the error message: %s",
+                     connection_name, response.status_code, response.text, extra=fields)
+    return response
+
 
 def read_csv(debug):
     """
-    Reads data from an input CSV file, converts it to a JSON string, and returns it as a dictionary.
+    Lazily reads the rows of the input CSV file, keeping only the columns this script uses.
 
     :param debug: A boolean flag indicating whether to enable debugging
 
-    :return: A dictionary containing the data from the input CSV file
+    :return: An iterator of dictionaries, one per row of the input CSV file
     """
-    # Read CSV file
-    data = pd.read_csv(input_csv_filename)
-
-    # Convert DataFrame to JSON string
-    json_string = data.to_json(orient='records')
-    # Convert data to dictionary
-    data = json.loads(json_string)
     if debug == True:
-        print(type(data))
-        print(data)
-        # Print JSON string
-        print("This is json_string")
-        print(json_string)
-        print("This is data")
-        print(type(data))
-        print("This is data[0]")
-        print(data[0])
-        print(type(data[0]))
-    return data
+        logger.debug("Reading %s columns: %s", input_csv_filename, csv_columns)
+    return csv_reader.iter_rows(input_csv_filename, columns=csv_columns)
 
 
 if __name__ == '__main__':
     """Create db connections (aliases) for SecureSphere using data from a CSV file.
 
     This script reads data from a CSV file and uses it to create db connections (aliases) in SecureSphere.
-    It first logs in to SecureSphere using the `authorization` module and gets an authorization cookie,
-    then uses this cookie to make API requests to create the db connections.
+    It logs in once to each MX named in the MX-IP/MX-port columns using the `authorization_v2` module,
+    then uses that MX's session cookie to make API requests to create the db connections.
         
     Usage:
-    $ python create_db_connection_v2.py
+    $ python create_db_connection_v2.py [--concurrency N] [--ordered] [--resume | --retry-failed] [--preflight | --preflight-only] [--inventory DB] [--shard-queue DB [--lease SECONDS] [--worker-id ID] | --reconcile [--dry-run] [--delete-extra]] [--sessions N [--accounts FILE]]
     """
+    parser = argparse.ArgumentParser(description="Create db connections (aliases) from the input CSV file.")
+    bulk_executor.add_arguments(parser)
+    reconcile.add_arguments(parser, "db connections")
+    preflight.add_arguments(parser)
+    shard_queue.add_arguments(parser)
+    inventory.add_arguments(parser)
+    session_pool.add_arguments(parser)
+    mx_logging.add_arguments(parser)
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    # The modes are exclusive: each sends the rows its own way.
+    if (args.reconcile or args.dry_run) and args.shard_queue:
+        parser.error("--reconcile/--dry-run can't be combined with --shard-queue")
+    mx_logging.configure(args.log_level, args.log_format)
+    metrics.write_at_exit(args.metrics_json, args.metrics_prom)
     debug = True
+    session_pool.configure(args.accounts, args.sessions, debug=debug)
     data = read_csv(debug)
-    # Get the session_id via get_cookie()
-    my_response = authorization.authorization()
-    my_cookies = authorization.get_cookie(my_response, debug)
-    headers: Dict[str, str] = {"Content-Type": "application/json", "Authorization": "Basic MjM=",
-                               'Cookie': my_cookies}
-    if my_response.status_code == 200:
-        # The request was successful
-        print("\nThe initial login request was successful\nWe will now begin creating a db connection (alias) for each"
-              " of the Protected IP's")
-        # Iterate through the dictionary
-        assert isinstance(data, object)
-        count = len(data)
-        rownum = 1
-        for row in data:
-            print(f"\nInserting row {str(rownum)}:  {row['connection_name']}")
-            original_dict = row
-            # Each row is everything in the CSV file.  Not all API calls will require every parameter. This next step
-            # creates a smaller dictionary from the original row of data.
-            keys = ('MX-IP', 'MX-port', 'site', 'server_group_name', 'service_name', 'connection_name', 'ip-address',
-                    'OS-type', 'user-name', 'password','named-instance','domain-name', 'port')
-            new_dict: Dict[str, Any] = dict((k, original_dict[k]) for k in keys if k in original_dict)
-            if debug:
-                print(f"This is the row {row}")
-                print(f"This is the new_dict {new_dict}")
-            body = new_dict
-            # Parameters for the MX and Site Tree hierarchy.
-            # Troubleshooting
-            mx_host: str = body['MX-IP']
-            #host: str = ""
-            mx_port: str = body['MX-port']
-            #port: str = "8083"
-            site_name: str = body['site']
-            server_group_name: str = body['server_group_name']
-            service_name: str = body['service_name']
-            connection_name: str = body['connection_name']
-            # Send parameters to create_db_connection()
-            create_db_connection(mx_host, mx_port, site_name, server_group_name, service_name, connection_name, body, headers)
-            rownum = rownum + 1
-    else:
-        # The request was not successful
-        print(f'Request failed with status code {my_response.status_code}')
+    if args.preflight or args.preflight_only:
+        preflight_plan = preflight.run(input_csv_filename,
+                                       [preflight.Operation("db_connection", csv_columns, journal_key_columns)])
+        preflight.print_report(preflight_plan)
+        if args.preflight_only:
+            raise SystemExit(0 if preflight_plan.ok else 1)
+        data = preflight_plan.records()
+    headers: Dict[str, str] = {"Content-Type": "application/json", "Authorization": "Basic MjM="}
+    # Rows are grouped by their MX-IP/MX-port; each MX is logged in to once, reusing a cached session if it has one
+    print("\nWe will now begin creating a db connection (alias) for each"
+          " of the Protected IP's")
+
+    def create_row(rownum, row):
+        logger.debug("Inserting row %d:  %s", rownum, row['connection_name'])
+        body: Dict[str, Any] = row
+        # Parameters for the MX and Site Tree hierarchy.
+        mx_host: str = body['MX-IP']
+        mx_port: str = body['MX-port']
+        site_name: str = body['site']
+        server_group_name: str = body['server_group_name']
+        service_name: str = body['service_name']
+        connection_name: str = body['connection_name']
+        # Send parameters to create_db_connection()
+        return create_db_connection(mx_host, mx_port, site_name, server_group_name, service_name, connection_name,
+                                    body, headers)
+
+    def update_row(rownum, row):
+        logger.debug("Updating row %d:  %s", rownum, row['connection_name'])
+        return update_db_connection(row['MX-IP'], row['MX-port'], row['site'], row['server_group_name'],
+                                    row['service_name'], row['connection_name'], row, headers)
+
+    def delete_row(rownum, row):
+        logger.debug("Deleting %s", row['connection_name'])
+        return delete_db_connection(row['MX-IP'], row['MX-port'], row['site'], row['server_group_name'],
+                                    row['service_name'], row['connection_name'], headers)
+
+    if args.inventory:
+        mirror = inventory.Inventory(args.inventory)
+        create_row = inventory.guard(mirror, create_row, "db_services", ('site', 'server_group_name', 'service_name'))
+        update_row = inventory.guard(mirror, update_row, "db_services", ('site', 'server_group_name', 'service_name'))
+
+    order_key = bulk_executor.server_group_key if args.ordered else None
+    journal_path = args.journal or run_journal.default_path(input_csv_filename)
+    with run_journal.RunJournal(journal_path, "db_connection", journal_key_columns) as journal:
+        # Numbered before filtering, so the results keep the rows' numbers in the file.
+        pending = journal.filter_numbered(enumerate(data, start=1), args.resume, args.retry_failed)
+        start = time.perf_counter()
+        if args.reconcile or args.dry_run:
+            # Planned from every row of the file, not only the ones --resume/--retry-failed would send: the rows
+            # already in place are planned as identical, and --delete-extra must not take them for extra objects.
+            plan = reconcile.plan_db_connections(list(data), args.delete_extra, debug)
+            reconcile.print_plan(plan, "db connections (aliases)", verbose=args.dry_run)
+            if args.dry_run:
+                raise SystemExit(0)
+            handlers = {'create': create_row, 'update': update_row, 'delete': delete_row}
+            results = reconcile.run_plan(plan, handlers, args.concurrency, order_key, debug, journal.record)
+        elif args.shard_queue:
+            shards = shard_queue.ShardQueue(args.shard_queue, "db_connection", args.worker_id, args.lease,
+                                            input_csv_filename)
+            results = shard_queue.run_sharded_numbered(shards, pending, create_row, args.concurrency, order_key,
+                                                       debug, journal.record)
+        else:
+            results = bulk_executor.run_per_mx_numbered(pending, create_row, args.concurrency, order_key, debug,
+                                                        journal.record)
+    bulk_executor.print_summary(results, "db connections (aliases)", time.perf_counter() - start)
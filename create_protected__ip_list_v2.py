@@ -1,12 +1,23 @@
-import json
+import argparse
+import logging
+import time
 from typing import Dict
 
-import pandas as pd
-import requests
-import authorization_v2
+import metrics
+import mx_client
+import mx_logging
+import preflight
+import batch_writes
+import bulk_executor
+import csv_reader
+import inventory
+import reconcile
+import run_journal
+import session_pool
+import shard_queue
 
 """
-This script reads data from an input CSV file, converts it to a JSON string, and iterates through each row of the data 
+This script streams the rows of an input CSV file and iterates through each row of the data 
 to create a protected IP list on a specified server group in Imperva SecureSphere using the API.
  
 It utilizes two functions: create_protected_ip_list and read_csv.
@@ -27,10 +38,33 @@ Revision History:
 -----------------
 2023-02-23:
     Initial creation of the script.  
+2026-10-17:
+    read_csv() streams the rows with csv_reader instead of the pandas/JSON round trip.
+2026-10-17:
+    Messages go through logging (--log-level, --log-format) and API metrics can be written at exit.
+2026-10-17:
+    Added --preflight and --preflight-only: the file is validated and deduplicated before anything is sent.
+2026-10-17:
+    Added --batch: the rows of each server group are written with collection requests.
+2026-10-18:
+    Added --shard-queue: several workers, on any number of hosts, share the rows of a run through shard_queue.
+2026-10-18:
+    Added --inventory: rows whose server group the inventory mirror knows to be missing are not sent.
+2026-10-18:
+    Added --sessions and --accounts: the requests are spread over a pool of MX sessions (session_pool).
+2026-10-18:
+    --reconcile plans from every row of the file, so --resume/--retry-failed no longer turn --delete-extra against
+    the rows an earlier run created.
 """
 
+logger = logging.getLogger(__name__)
+
 # Important filename variable
 input_csv_filename = "input.csv"
+# The columns of the CSV file this script uses
+csv_columns = ('MX-IP', 'MX-port', 'site', 'server_group_name', 'ip-address', 'gateway_group_name', 'comment')
+# The columns that identify a row in the result journal
+journal_key_columns = ('MX-IP', 'MX-port', 'site', 'server_group_name', 'ip-address')
 
 def create_protected_ip_list(host, port, site_name, server_group_name, ip_address, gateway_group_name, body, headers):
     """
@@ -45,91 +79,179 @@ def create_protected_ip_list(host, port, site_name, server_group_name, ip_addres
     :param body: The JSON body of the POST request
     :param headers: The headers of the POST request
 
-    :return: None
+    :return: The requests.Response of the API call
     """
     url: str = f"https://{host}:{port}/SecureSphere/api/v1/conf/serverGroups/{site_name}/{server_group_name}/protectedIPs/{ip_address}?gatewayGroup={gateway_group_name}"
-    response = requests.post(url, json=body, headers=headers, verify=False)
+    response = mx_client.post(url, json=body, headers=headers)
+    fields = {"ip_address": ip_address, "status_code": response.status_code}
     if response.status_code == 200:
         # The Server Group IP's are created by default
-        print(f"Successfully created Protected and Server Group IP address: {ip_address}")
+        logger.info("Successfully created Protected and Server Group IP address: %s", ip_address, extra=fields)
+    else:
+        logger.error("Failed to create Protected and Server Group IP address: %s (Error Code: %d)\nHere is the error message: %s",
+                     ip_address, response.status_code, response.text, extra=fields)
+    return response
+
+
+def update_protected_ip(host, port, site_name, server_group_name, ip_address, gateway_group_name, body, headers):
+    """
+    Updates the comment of an existing protected IP on a specified server group.
+
+    :param host: The hostname or IP address of the Imperva SecureSphere Management Server
+    :param port: The port number of the Imperva SecureSphere Management Server
+    :param site_name: The name of the site in Imperva SecureSphere
+    :param server_group_name: The name of the server group in Imperva SecureSphere
+    :param ip_address: The protected IP address to update
+    :param gateway_group_name: The name of the gateway group in Imperva SecureSphere
+    :param body: The JSON body of the PUT request
+    :param headers: The headers of the PUT request
+
+    :return: The requests.Response of the API call
+    """
+    url: str = f"https://{host}:{port}/SecureSphere/api/v1/conf/serverGroups/{site_name}/{server_group_name}/protectedIPs/{ip_address}?gatewayGroup={gateway_group_name}"
+    response = mx_client.put(url, json=body, headers=headers)
+    fields = {"ip_address": ip_address, "status_code": response.status_code}
+    if response.status_code == 200:
+        logger.info("Successfully updated Protected IP address: %s", ip_address, extra=fields)
+    else:
+        logger.error("Failed to update Protected IP address: %s (Error Code: %d)\nHere is the error message: %s",
+                     ip_address, response.status_code, response.text, extra=fields)
+    return response
+
+
+def delete_protected_ip(host, port, site_name, server_group_name, ip_address, gateway_group_name, headers):
+    """
+    Deletes a protected IP from a specified server group.
+
+    :param host: The hostname or IP address of the Imperva SecureSphere Management Server
+    :param port: The port number of the Imperva SecureSphere Management Server
+    :param site_name: The name of the site in Imperva SecureSphere
+    :param server_group_name: The name of the server group in Imperva SecureSphere
+    :param ip_address: The protected IP address to delete
+    :param gateway_group_name: The name of the gateway group in Imperva SecureSphere
+    :param headers: The headers of the DELETE request
+
+    :return: The requests.Response of the API call
+    """
+    url: str = f"https://{host}:{port}/SecureSphere/api/v1/conf/serverGroups/{site_name}/{server_group_name}/protectedIPs/{ip_address}?gatewayGroup={gateway_group_name}"
+    response = mx_client.delete(url, headers=headers)
+    fields = {"ip_address": ip_address, "status_code": response.status_code}
+    if response.status_code == 200:
+        logger.info("Successfully deleted Protected IP address: %s", ip_address, extra=fields)
     else:
-        print("Error Code:  " + str(response.status_code))
-        print(
-            f"Failed to create Protected and Server Group IP address : {ip_address}\nHere is the error message: {response.text}")
+        logger.error("Failed to delete Protected IP address: %s (Error Code: %d)\nHere is the error message: %s",
+                     ip_address, response.status_code, response.text, extra=fields)
+    return response
 
 
 def read_csv(debug):
     """
-    Reads data from an input CSV file, converts it to a JSON string, and returns it as a dictionary.
+    Lazily reads the rows of the input CSV file, keeping only the columns this script uses.
 
     :param debug: A boolean flag indicating whether to enable debugging
 
-    :return: A dictionary containing the data from the input CSV file
+    :return: An iterator of dictionaries, one per row of the input CSV file
     """
-    # Read CSV file
-    data = pd.read_csv(input_csv_filename)
-
-    # Convert DataFrame to JSON string
-    json_string = data.to_json(orient='records')
-    # Convert data to dictionary
-    data = json.loads(json_string)
     if debug == True:
-        print(type(data))
-        print(data)
-        # Print JSON string
-        print("This is json_string")
-        print(json_string)
-        print("This is data")
-        print(type(data))
-        print("This is data[0]")
-        print(data[0])
-        print(type(data[0]))
-    return data
+        logger.debug("Reading %s columns: %s", input_csv_filename, csv_columns)
+    return csv_reader.iter_rows(input_csv_filename, columns=csv_columns)
 
 
 if __name__ == '__main__':
     """Create protected IP lists for SecureSphere using data from a CSV file.
 
     This script reads data from a CSV file and uses it to create protected IP lists in SecureSphere.
-    It first logs in to SecureSphere using the `authorization` module and gets an authorization cookie,
-    then uses this cookie to make API requests to create the protected IP lists.
+    It logs in once to each MX named in the MX-IP/MX-port columns using the `authorization_v2` module,
+    then uses that MX's session cookie to make API requests to create the protected IP lists.
 
     Usage:
-    $ python create_protected_ip_list_v2.py
+    $ python create_protected_ip_list_v2.py [--concurrency N] [--ordered] [--resume | --retry-failed] [--preflight | --preflight-only] [--inventory DB] [--shard-queue DB [--lease SECONDS] [--worker-id ID] | --batch [--batch-size N] | --reconcile [--dry-run] [--delete-extra]] [--sessions N [--accounts FILE]]
     """
+    parser = argparse.ArgumentParser(description="Create protected IP's from the input CSV file.")
+    bulk_executor.add_arguments(parser)
+    batch_writes.add_arguments(parser)
+    reconcile.add_arguments(parser, "protected IP's")
+    preflight.add_arguments(parser)
+    shard_queue.add_arguments(parser)
+    inventory.add_arguments(parser)
+    session_pool.add_arguments(parser)
+    mx_logging.add_arguments(parser)
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    # The modes are exclusive: each sends the rows its own way.
+    if (args.reconcile or args.dry_run) and (args.batch or args.shard_queue):
+        parser.error("--reconcile/--dry-run can't be combined with --batch or --shard-queue")
+    if args.batch and args.shard_queue:
+        parser.error("--batch can't be combined with --shard-queue")
+    mx_logging.configure(args.log_level, args.log_format)
+    metrics.write_at_exit(args.metrics_json, args.metrics_prom)
     debug = False
+    session_pool.configure(args.accounts, args.sessions, debug=debug)
     data = read_csv(debug)
-    # Get the session_id via get_cookie()
-    my_response = authorization.authorization()
-    my_cookies = authorization.get_cookie(my_response, debug)
-    headers: Dict[str, str] = {"Content-Type": "application/json", "Authorization": "Basic Y=",
-                               'Cookie': my_cookies}
-    if my_response.status_code == 200:
-        # The request was successful
-        print("\nThe initial login request was successful\nWe will now begin creating the Protected IP's and the Server"
-              " Group IP's")
-        # Iterate through the dictionary
-        assert isinstance(data, object)
-        count = len(data)
-        rownum: int = 1
-        for row in data:
-            print(f"\nInserting row {str(rownum)}:  Site: {row['site']} and IP: {row['ip-address']}")
-            original_dict = row
-            mx_host: str = row['MX-IP']
-            mx_port: str = row['MX-port']
-            site_name: str = row['site']
-            server_group_name: str = row['server_group_name']
-            service_name: str = row['service_name']
-            connection_name: str = row['connection_name']
-            ip_address: str = row['ip-address']
-            gateway_group_name: str = row['gateway_group_name']
-            comment = row['comment']
-            assert isinstance(comment, object)
-            # body = {'comment': '16-Jan-23'}
-            body = {'comment': comment}
-            create_protected_ip_list(mx_host, mx_port, site_name, server_group_name, ip_address, gateway_group_name, body,
-                                     headers)
-            rownum: int = rownum + 1
-    else:
-        # The request was not successful
-        print(f'Request failed with status code {my_response.status_code}')
+    if args.preflight or args.preflight_only:
+        preflight_plan = preflight.run(input_csv_filename,
+                                       [preflight.Operation("protected_ip", csv_columns, journal_key_columns)])
+        preflight.print_report(preflight_plan)
+        if args.preflight_only:
+            raise SystemExit(0 if preflight_plan.ok else 1)
+        data = preflight_plan.records()
+    headers: Dict[str, str] = {"Content-Type": "application/json", "Authorization": "Basic Y="}
+    # Rows are grouped by their MX-IP/MX-port; each MX is logged in to once, reusing a cached session if it has one
+    print("\nWe will now begin creating the Protected IP's and the Server"
+          " Group IP's")
+
+    def create_row(rownum, row):
+        logger.debug("Inserting row %d:  Site: %s and IP: %s", rownum, row['site'], row['ip-address'])
+        mx_host: str = row['MX-IP']
+        mx_port: str = row['MX-port']
+        site_name: str = row['site']
+        server_group_name: str = row['server_group_name']
+        ip_address: str = row['ip-address']
+        gateway_group_name: str = row['gateway_group_name']
+        comment = row['comment']
+        body = {'comment': comment}
+        return create_protected_ip_list(mx_host, mx_port, site_name, server_group_name, ip_address,
+                                        gateway_group_name, body, headers)
+
+    def update_row(rownum, row):
+        logger.debug("Updating row %d:  Site: %s and IP: %s", rownum, row['site'], row['ip-address'])
+        return update_protected_ip(row['MX-IP'], row['MX-port'], row['site'], row['server_group_name'],
+                                   row['ip-address'], row['gateway_group_name'], {'comment': row['comment']}, headers)
+
+    def delete_row(rownum, row):
+        logger.debug("Deleting Site: %s and IP: %s", row['site'], row['ip-address'])
+        return delete_protected_ip(row['MX-IP'], row['MX-port'], row['site'], row['server_group_name'],
+                                   row['ip-address'], row['gateway_group_name'], headers)
+
+    if args.inventory:
+        mirror = inventory.Inventory(args.inventory)
+        create_row = inventory.guard(mirror, create_row, "server_groups", ('site', 'server_group_name'))
+        update_row = inventory.guard(mirror, update_row, "server_groups", ('site', 'server_group_name'))
+
+    order_key = bulk_executor.server_group_key if args.ordered else None
+    journal_path = args.journal or run_journal.default_path(input_csv_filename)
+    with run_journal.RunJournal(journal_path, "protected_ip", journal_key_columns) as journal:
+        # Numbered before filtering, so the results keep the rows' numbers in the file.
+        pending = journal.filter_numbered(enumerate(data, start=1), args.resume, args.retry_failed)
+        start = time.perf_counter()
+        if args.reconcile or args.dry_run:
+            # Planned from every row of the file, not only the ones --resume/--retry-failed would send: the rows
+            # already in place are planned as identical, and --delete-extra must not take them for extra objects.
+            plan = reconcile.plan_protected_ips(list(data), args.delete_extra, debug)
+            reconcile.print_plan(plan, "Protected IP's", verbose=args.dry_run)
+            if args.dry_run:
+                raise SystemExit(0)
+            handlers = {'create': create_row, 'update': update_row, 'delete': delete_row}
+            results = reconcile.run_plan(plan, handlers, args.concurrency, order_key, debug, journal.record)
+        elif args.batch:
+            results = batch_writes.run_batched_numbered(pending, batch_writes.PROTECTED_IPS, create_row, headers,
+                                                        args.concurrency, debug, journal.record, args.batch_size)
+        elif args.shard_queue:
+            shards = shard_queue.ShardQueue(args.shard_queue, "protected_ip", args.worker_id, args.lease,
+                                            input_csv_filename)
+            results = shard_queue.run_sharded_numbered(shards, pending, create_row, args.concurrency, order_key,
+                                                       debug, journal.record)
+        else:
+            results = bulk_executor.run_per_mx_numbered(pending, create_row, args.concurrency, order_key, debug,
+                                                        journal.record)
+    bulk_executor.print_summary(results, "Protected IP's", time.perf_counter() - start)
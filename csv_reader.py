@@ -0,0 +1,101 @@
+import csv
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+"""
+Description:
+This Python script provides the streaming CSV reader shared by the provisioning scripts.
+
+Each script used to load the whole input file with pandas, serialize it to a JSON string and parse it back, which holds
+three copies of the inventory in memory before the first API call.  iter_rows() reads the file lazily with the standard
+csv module and yields one typed dictionary per row, so work starts on row 1 right away and memory use does not grow with
+the size of the file.  Only the requested columns are kept, and iter_chunks() groups rows into lists for callers that
+work in batches.
+
+Values are converted the same way the pandas round trip did: numeric columns (see COLUMN_TYPES) become int, and empty
+cells become None.
+
+Usage:
+    for row in csv_reader.iter_rows("input.csv", columns=('MX-IP', 'MX-port', 'ip-address')):
+        ...
+
+Developer note: This is code from my personal lab for my professional development. This should be considered example
+code only.
+
+Revision History:
+-----------------
+2026-10-17:
+    Initial creation of the script.
+"""
+
+# Global variables
+# Columns that are converted from text.  Every other column is kept as a string.
+COLUMN_TYPES: Dict[str, Callable[[str], Any]] = {
+    'MX-port': int,
+    'port': int,
+}
+# Size of the read buffer, in bytes.
+READ_BUFFER = 1024 * 1024
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def iter_rows(filename: str, columns: Optional[Sequence[str]] = None,
+              column_types: Optional[Dict[str, Callable[[str], Any]]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily reads a CSV file and yields one dictionary per row.
+
+    :param filename: The CSV file to read.  The first line must be the header.
+    :param columns: Optional list of the columns to keep.  Defaults to every column in the file.
+    :param column_types: Optional column name to converter mapping.  Defaults to COLUMN_TYPES.
+    :return: An iterator of dictionaries, keyed by column name
+    :raises ValueError: If a requested column is not in the file
+    """
+    column_types = COLUMN_TYPES if column_types is None else column_types
+    with open(filename, newline='', encoding='utf-8-sig', buffering=READ_BUFFER) as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        if columns is None:
+            columns = header
+        missing = [c for c in columns if c not in header]
+        if missing:
+            raise ValueError(f"{filename} is missing the column(s): {', '.join(missing)}")
+        # (name, position, converter) for each projected column
+        projection = [(c, header.index(c), column_types.get(c)) for c in columns]
+        for record in reader:
+            if not record:
+                continue
+            row = {}
+            for name, position, convert in projection:
+                value = record[position] if position < len(record) else ''
+                if value == '':
+                    row[name] = None
+                elif convert is None:
+                    row[name] = value
+                else:
+                    try:
+                        row[name] = convert(value)
+                    except ValueError:
+                        row[name] = value
+            yield row
+
+
+def iter_chunks(filename: str, chunk_size: int = DEFAULT_CHUNK_SIZE, columns: Optional[Sequence[str]] = None,
+                column_types: Optional[Dict[str, Callable[[str], Any]]] = None) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Lazily reads a CSV file and yields lists of up to chunk_size rows.
+
+    :param filename: The CSV file to read
+    :param chunk_size: The maximum number of rows per list
+    :param columns: Optional list of the columns to keep
+    :param column_types: Optional column name to converter mapping.  Defaults to COLUMN_TYPES.
+    :return: An iterator of lists of dictionaries
+    """
+    chunk = []
+    for row in iter_rows(filename, columns, column_types):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -1,6 +1,14 @@
-import requests
+import argparse
+import logging
+import sys
+import config_cache
+import metrics
+import mx_client
+import mx_logging
+import audit_snapshot
 import authorization_v2
-from typing import Dict, List
+import json_stream
+from typing import Dict, Iterator, List
 
 """
 This script retrieves all flattened DB Audit report configurations and returns them as a JSON list.
@@ -14,13 +22,29 @@ Revision History:
 -----------------
 2023-02-23:
     Initial creation of the script.  
+2026-10-17:
+    Added iter_audit_report_configurations(), which parses the response incrementally and yields one report
+    configuration at a time, and the --ndjson option to write them straight to disk.
+2026-10-17:
+    get_all_audit_report_configurations() reads through config_cache.
+2026-10-17:
+    Messages go through logging; --log-level, --log-format, --metrics-json and --metrics-prom options.
+2026-10-17:
+    Added --sync: each poll is recorded in an audit_snapshot store and only the added, changed and removed reports are
+    written out.
+2026-10-18:
+    iter_audit_report_configurations() takes the MX host and port, for callers that read several MXs.
 """
 
+logger = logging.getLogger(__name__)
+
 # Global variables
 HOST = "192.168.102.188"
 PORT = "8083"
 BASIC_AUTHORIZATION = 'Basic YWR'
 DEBUG = True
+# Bytes read from the response per chunk when streaming.
+STREAM_CHUNK_SIZE = 64 * 1024
 
 
 def get_all_audit_report_configurations(headers: Dict[str, str]) -> List[Dict]:
@@ -38,28 +62,81 @@ def get_all_audit_report_configurations(headers: Dict[str, str]) -> List[Dict]:
     url = f"https://{HOST}:{PORT}/SecureSphere/api/v1/conf/jsonar/dbauditreports/"
     # Test URL
     #url = f"https://{HOST}:{PORT}/SecureSphere/api/v1/conf/dbauditreports/"
-    if DEBUG:
-        print(f"This is the url: {url}")
-    response = requests.get(url, headers=headers, verify=False)
+    logger.debug("This is the url: %s", url)
+    response = config_cache.get(url, headers=headers)
     return response.json()
 
 
+def iter_audit_report_configurations(headers: Dict[str, str], host: str = None, port: str = None) -> Iterator[Dict]:
+    """
+    Retrieve all flattened DB Audit report configurations, one at a time.
+
+    Details:
+    Unlike get_all_audit_report_configurations(), the response body is read incrementally with iter_content() and
+    parsed with json_stream, so each report configuration is yielded as soon as it has been received and peak memory
+    stays flat no matter how many reports are configured.
+    :param headers: Headers for authorization and content-type
+    :param host: The MX host.  Defaults to HOST.
+    :param port: The MX port.  Defaults to PORT.
+    :return: Iterator of flattened DB Audit report configurations
+    :raises RuntimeError: If the MX does not return the report configurations
+    """
+    url = f"https://{host or HOST}:{port or PORT}/SecureSphere/api/v1/conf/jsonar/dbauditreports/"
+    logger.debug("This is the url: %s", url)
+    response = mx_client.get(url, headers=headers, stream=True)
+    with response:
+        if response.status_code != 200:
+            raise RuntimeError(f"Failed to retrieve the DB Audit report configurations. "
+                               f"Error Code: {response.status_code} {response.text}")
+        yield from json_stream.iter_array_items(response.iter_content(chunk_size=STREAM_CHUNK_SIZE))
+
+
 if __name__ == '__main__':
     """
         Entry point of the script. This code will execute only if this script is run directly, not if it is imported as 
-        a module. It retrieves all flattened DB Audit report configurations using the 
-        `get_all_audit_report_configurations` function and prints them to the console.
+        a module. It streams all flattened DB Audit report configurations using the 
+        `iter_audit_report_configurations` function and prints them to the console, or with --ndjson writes them to a
+        file, one JSON object per line.  With --sync DIR it records the poll in the snapshot store DIR and writes only
+        the changes since the previous poll (to --changes, default stdout).
         """
-    # Get the session_id via get_cookie()
-    my_response = authorization_v2.authorization()
-    my_cookies = authorization_v2.get_cookie(my_response, DEBUG)
-    headers: Dict[str, str] = {"Content-Type": "application/json", "Authorization": BASIC_AUTHORIZATION,
-                               'Cookie': my_cookies}
-    if my_response.status_code != 200:
+    parser = argparse.ArgumentParser(description="Retrieve all flattened DB Audit report configurations.")
+    parser.add_argument("--ndjson", metavar="FILE", help="write the report configurations to FILE as NDJSON")
+    parser.add_argument("--sync", metavar="DIR",
+                        help="record this poll in the snapshot store DIR and write only the changes since the last one")
+    parser.add_argument("--changes", metavar="FILE", default="-",
+                        help="with --sync, the NDJSON file the changes are appended to (default: stdout)")
+    mx_logging.add_arguments(parser)
+    metrics.add_arguments(parser)
+    parser.set_defaults(log_level="DEBUG" if DEBUG else "INFO")
+    args = parser.parse_args()
+    mx_logging.configure(args.log_level, args.log_format)
+    metrics.write_at_exit(args.metrics_json, args.metrics_prom)
+    # Get the session_id from the session cache, logging in only if there is no valid cached session
+    session_manager = authorization_v2.get_session_manager(HOST, PORT, debug=DEBUG)
+    my_cookies = session_manager.get_cookie()
+    headers: Dict[str, str] = {"Content-Type": "application/json", "Authorization": BASIC_AUTHORIZATION}
+    if my_cookies is None:
         # The request was not successful
-        print(f'Request failed with status code {my_response.status_code}')
+        print(f'Request failed with status code {session_manager.status_code}')
 
     else:
         # The request was successful
-        all_configs = get_all_audit_report_configurations(headers)
-        print(all_configs)
+        configs = iter_audit_report_configurations(headers)
+        if args.sync:
+            changes = audit_snapshot.SnapshotStore(args.sync).sync(configs)
+            if args.changes == "-":
+                audit_snapshot.write_changes(changes, sys.stdout)
+            else:
+                with open(args.changes, "a", encoding="utf-8") as changes_file:
+                    audit_snapshot.write_changes(changes, changes_file)
+            logger.info("Poll %d: %d reports, %d added, %d changed, %d removed", changes.poll, changes.total,
+                        len(changes.added), len(changes.changed), len(changes.removed),
+                        extra={"poll": changes.poll, "reports": changes.total, "added": len(changes.added),
+                               "changed": len(changes.changed), "removed": len(changes.removed)})
+        elif args.ndjson:
+            with open(args.ndjson, "w", encoding="utf-8") as ndjson_file:
+                count = json_stream.write_ndjson(configs, ndjson_file)
+            print(f"Wrote {count} DB Audit report configurations to {args.ndjson}")
+        else:
+            for config in configs:
+                print(config)
@@ -1,6 +1,9 @@
+import logging
 from typing import Dict
+from urllib.parse import quote
 
-import requests
+import config_cache
+import mx_logging
 import authorization_v2
 import json
 
@@ -19,8 +22,21 @@ Revision History:
 -----------------
 2023-05-02:
     Initial creation of the script.    
+2026-10-17:
+    get_agent_monitoring_rule() reads through config_cache.
+2026-10-17:
+    Messages go through logging instead of print().
+2026-10-18:
+    Added rule_url(), for callers that look rules up on another MX.
+2026-10-18:
+    get_agent_monitoring_rule() returns None when the rule can't be retrieved, instead of raising
+    UnboundLocalError.  See amr_archive.py to copy every rule of an MX.
+2026-10-18:
+    rule_url() quotes the rule name, so names with "/", "?", "#" or spaces reach the right rule.
 """
 
+logger = logging.getLogger(__name__)
+
 # Global variables
 HOST = "192.168.102.188"
 #HOST = "192.169.43.91"
@@ -29,6 +45,20 @@ BASIC_AUTHORIZATION = 'Basic YWR'
 DEBUG = False
 
 
+def rule_url(rule_name, host=None, port=None):
+    """
+    The API URL of an agent monitoring rule.
+
+    :param rule_name: The name of the agent monitoring rule
+    :param host: The MX host.  Defaults to HOST.
+    :param port: The MX port.  Defaults to PORT.
+    :return: The URL
+    """
+    # Rule names may hold spaces, "/", "?" or "#": quoted as one path segment.
+    return (f"https://{host or HOST}:{port or PORT}/SecureSphere/api/v1/conf/agentsMonitoringRules/"
+            f"{quote(rule_name, safe='')}")
+
+
 def get_agent_monitoring_rule(rule_name, headers):
     """
     Retrieves an agent monitoring rule by its name.
@@ -40,36 +70,37 @@ def get_agent_monitoring_rule(rule_name, headers):
         dict: The agent monitoring rule information as a dictionary,
               or None if the rule is not found.
     """
-    url = f"https://{HOST}:{PORT}/SecureSphere/api/v1/conf/agentsMonitoringRules/{rule_name}"
+    url = rule_url(rule_name)
 
-    print(url)
+    logger.debug(url)
     #
     # headers = {
     #     "Content-Type": "application/json",
     #     "Cookie": "JSESSIONID=0123456789ABCDEF0123456789ABCDEF"
     # }
     #body = {'policy-type':'ds-agents-monitoring-rules'}
-    body = {}
 
-    response = requests.get(url, json=body, headers=headers, verify=False)
+    data = None
+    # Read through the configuration cache, so repeated lookups of a rule do not go back to the MX
+    response = config_cache.get(url, headers=headers)
     #list_response = requests.request("GET", url, headers=headers, data=payload, verify=False)
     if response.status_code == 200:
-        print(f"Successfully retrieved : {rule_name}")
+        logger.info("Successfully retrieved : %s", rule_name, extra={"rule_name": rule_name})
         data = response.json()
-        print(data)
+        logger.debug("%s", data)
     else:
-        print("Error Code:  " + str(response.status_code))
-        print(
-            f"Failed to retrieve AMR: {rule_name}\nHere is the error message: {response.text}")
+        logger.error("Failed to retrieve AMR: %s (Error Code: %d)\nHere is the error message: %s",
+                     rule_name, response.status_code, response.text,
+                     extra={"rule_name": rule_name, "status_code": response.status_code})
     return data
 
 if __name__ == '__main__':
-    # Get the session_id via get_cookie()
-    my_response = authorization_v2.authorization()
-    my_cookies = authorization_v2.get_cookie(my_response, DEBUG)
-    headers: Dict[str, str] = {"Content-Type": "application/json", "Authorization": BASIC_AUTHORIZATION,
-                               'Cookie': my_cookies}
-    if my_response.status_code == 200:
+    mx_logging.configure("DEBUG" if DEBUG else "INFO")
+    # Get the session_id from the session cache, logging in only if there is no valid cached session
+    session_manager = authorization_v2.get_session_manager(HOST, PORT, debug=DEBUG)
+    my_cookies = session_manager.get_cookie()
+    headers: Dict[str, str] = {"Content-Type": "application/json", "Authorization": BASIC_AUTHORIZATION}
+    if my_cookies is not None:
         # The request was successful
         print("\nThe initial login request was successful\nWe will now retrieve the AMR")
         #rule_name = "create_table_dictionary"
@@ -83,4 +114,4 @@ if __name__ == '__main__':
 
     else:
         # The request was not successful
-        print(f'Request failed with status code {my_response.status_code}')
\ No newline at end of file
+        print(f'Request failed with status code {session_manager.status_code}')
\ No newline at end of file
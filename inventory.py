@@ -0,0 +1,673 @@
+import argparse
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+from urllib.parse import unquote, urlsplit
+
+import audit_snapshot
+import authorization_v2
+import bulk_executor
+import config_cache
+import metrics
+import mx_client
+import mx_logging
+import reconcile
+
+"""
+Description:
+This Python script keeps a local mirror of the site tree of one or more MXs in SQLite, so the scripts can ask whether
+a site, server group or db service exists, or where an IP address is used, without touching the MX.
+
+The provisioning functions build their URL from the site, server group and service names of a row, and used to find
+out that one of them does not exist only when the POST failed.  The mirror holds one table per MX collection, each
+keyed by its MX and names and stored WITHOUT ROWID, so every lookup is a B-tree search:
+    sites           /conf/sites
+    server_groups   /conf/serverGroups/{site}
+    protected_ips   /conf/serverGroups/{site}/{server group}/protectedIPs   (also indexed by IP)
+    server_ips      /conf/serverGroups/{site}/{server group}/servers        (also indexed by IP)
+    db_services     /conf/dbServices/{site}/{server group}
+    db_connections  /conf/dbServices/{site}/{server group}/{service}/dbConnections   (also indexed by IP)
+refresh() crawls the tree with FETCH_CONCURRENCY collection GETs in flight, fetching a collection as soon as its parent
+lists it.  After the first crawl, refresh() only fetches the collections that are past their time to live (the
+config_cache.ENDPOINT_TTLS of their path), or that were written to through mx_client while the mirror was open; a
+collection whose content did not change (same digest) keeps its rows and its subtree.  A site, server group or db
+service that disappeared takes its whole subtree with it.
+
+guard() wraps the task of a bulk provisioning script (--inventory): a row whose site, server group or db service the
+mirror knows to be missing fails without an API call.  A parent the mirror has not fetched (or could not) is never
+reported missing, and a parent missing from a collection fetched before the run (still within its time to live) is
+looked up on the MX again, once per collection and run, before the row is failed.
+
+Usage:
+$ python inventory.py refresh inventory.db --mx 10.0.0.1:8083 [--force]
+$ python inventory.py find-ip inventory.db 192.168.1.24
+$ python inventory.py ls inventory.db 10.0.0.1:8083 DC01 "MS SQL Server Group"
+$ python inventory.py status inventory.db
+    mirror = inventory.Inventory("inventory.db")
+    mirror.refresh([("10.0.0.1", "8083")])
+    mirror.exists("10.0.0.1:8083", "server_groups", "DC01", "MS SQL Server Group")
+
+Developer note: This is code from my personal lab for my professional development. This should be considered example
+code only.
+
+Revision History:
+-----------------
+2026-10-18:
+    Initial creation of the script.
+2026-10-18:
+    guard() fetches a collection older than the run again before trusting that it lacks a parent.  Writes mark their
+    collections stale in memory; the marks are flushed by refresh() and close().
+2026-10-18:
+    A write below a server group marks all of its collections stale, e.g. its servers after a protected IP POST.
+"""
+
+logger = logging.getLogger(__name__)
+
+# Global variables
+# Number of collection GETs in flight during a refresh.
+FETCH_CONCURRENCY = 8
+# The names that key the collections, outermost first.
+KEY_COLUMNS = ('site', 'server_group', 'service')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS collections (
+    mx TEXT NOT NULL,
+    path TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    site TEXT,
+    server_group TEXT,
+    service TEXT,
+    fetched_at REAL,
+    digest TEXT,
+    stale INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    PRIMARY KEY (mx, path)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS collections_by_key ON collections (mx, site, server_group, service);
+CREATE TABLE IF NOT EXISTS sites (
+    mx TEXT NOT NULL, site TEXT NOT NULL,
+    PRIMARY KEY (mx, site)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS server_groups (
+    mx TEXT NOT NULL, site TEXT NOT NULL, server_group TEXT NOT NULL,
+    PRIMARY KEY (mx, site, server_group)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS protected_ips (
+    mx TEXT NOT NULL, site TEXT NOT NULL, server_group TEXT NOT NULL, ip TEXT NOT NULL, gateway_group TEXT,
+    comment TEXT,
+    PRIMARY KEY (mx, site, server_group, ip)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS protected_ips_by_ip ON protected_ips (ip);
+CREATE TABLE IF NOT EXISTS server_ips (
+    mx TEXT NOT NULL, site TEXT NOT NULL, server_group TEXT NOT NULL, ip TEXT NOT NULL, os_type TEXT,
+    PRIMARY KEY (mx, site, server_group, ip)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS server_ips_by_ip ON server_ips (ip);
+CREATE TABLE IF NOT EXISTS db_services (
+    mx TEXT NOT NULL, site TEXT NOT NULL, server_group TEXT NOT NULL, service TEXT NOT NULL,
+    PRIMARY KEY (mx, site, server_group, service)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS db_connections (
+    mx TEXT NOT NULL, site TEXT NOT NULL, server_group TEXT NOT NULL, service TEXT NOT NULL, connection TEXT NOT NULL,
+    ip TEXT,
+    PRIMARY KEY (mx, site, server_group, service, connection)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS db_connections_by_ip ON db_connections (ip);
+"""
+
+
+def _value(item: Any, *names: str) -> Any:
+    if not isinstance(item, dict):
+        return item
+    for name in names:
+        if item.get(name) is not None:
+            return item[name]
+    return None
+
+
+class Collection(NamedTuple):
+    """
+    A kind of MX collection, mirrored in the table of the same name.  path is formatted with the names of its parent,
+    columns are the table columns after the key columns (the first one names the item), item() returns their values
+    for an item of the MX response, and children are the kinds of collection below every item.
+    """
+    path: str
+    columns: Tuple[str, ...]
+    item: Callable[[Any], Tuple]
+    children: Tuple[str, ...] = ()
+
+    @property
+    def depth(self) -> int:
+        """The number of names keying a collection of this kind, e.g. 2 (site, server group) for protected_ips."""
+        return self.path.count("{")
+
+
+COLLECTIONS: Dict[str, Collection] = {
+    'sites': Collection("/conf/sites", ('site',), lambda item: (_value(item, 'name'),), ('server_groups',)),
+    'server_groups': Collection("/conf/serverGroups/{0}", ('server_group',), lambda item: (_value(item, 'name'),),
+                                ('protected_ips', 'server_ips', 'db_services')),
+    'protected_ips': Collection("/conf/serverGroups/{0}/{1}/protectedIPs", ('ip', 'gateway_group', 'comment'),
+                                lambda item: (_value(item, 'ip', 'ip-address'),
+                                              _value(item, 'gateway-group', 'gatewayGroup'), _value(item, 'comment'))),
+    'server_ips': Collection("/conf/serverGroups/{0}/{1}/servers", ('ip', 'os_type'),
+                             lambda item: (_value(item, 'ip', 'ip-address'), _value(item, 'OS-type', 'os-type'))),
+    'db_services': Collection("/conf/dbServices/{0}/{1}", ('service',), lambda item: (_value(item, 'name'),),
+                              ('db_connections',)),
+    'db_connections': Collection("/conf/dbServices/{0}/{1}/{2}/dbConnections", ('connection', 'ip'),
+                                 lambda item: (_value(item, 'display-name', 'name', 'connection_name'),
+                                               _value(item, 'ip-address', 'server-ip', 'ip'))),
+}
+# The kind of collection that lists the object named by a key of each length, e.g. a server group for 2 names.
+_OBJECT_KINDS = {1: 'sites', 2: 'server_groups', 3: 'db_services'}
+_LABELS = {'sites': "Site", 'server_groups': "Server group", 'db_services': "DB service"}
+# The kinds of collection below an object named by a key of each length, for "inventory.py ls".
+_LISTINGS = {0: ('sites',), 1: ('server_groups',), 2: ('protected_ips', 'server_ips', 'db_services'),
+             3: ('db_connections',)}
+
+
+def _lineage(kind: str) -> Tuple[str, ...]:
+    # The kinds of collection from the sites down to kind.
+    for parent, collection in COLLECTIONS.items():
+        if kind in collection.children:
+            return _lineage(parent) + (kind,)
+    return (kind,)
+
+
+class _Fetch(NamedTuple):
+    mx: str
+    kind: str
+    key: Tuple[str, ...]
+
+    @property
+    def path(self) -> str:
+        return COLLECTIONS[self.kind].path.format(*self.key)
+
+
+def mx_name(host: str, port: Any) -> str:
+    """
+    The name of an MX in the mirror.
+
+    :return: "host:port"
+    """
+    return f"{host}:{port}"
+
+
+def _match(mx: str, key: Sequence[str], table: str = "") -> Tuple[str, Tuple]:
+    # The WHERE clause selecting the rows of an MX whose names start with key.
+    prefix = f"{table}." if table else ""
+    columns = ("mx",) + KEY_COLUMNS[:len(key)]
+    return " AND ".join(f"{prefix}{column} = ?" for column in columns), (mx,) + tuple(key)
+
+
+# The open mirrors, told about every write made through mx_client by this process.
+_open_mirrors: List["Inventory"] = []
+_open_mirrors_lock = threading.Lock()
+
+
+def _mark_written(method: str, url: str, status_code: int) -> None:
+    if status_code >= 300 or "/conf/" not in url:
+        return
+    split = urlsplit(url)
+    path = unquote(split.path).partition(reconcile.API_PATH)[2].rstrip("/")
+    with _open_mirrors_lock:
+        mirrors = list(_open_mirrors)
+    segments = path.strip("/").split("/")
+    for mirror in mirrors:
+        if len(segments) >= 4 and segments[1] in config_cache.SERVER_GROUP_ROOTS:
+            # A write below a server group may change any of its collections (a protected IP POST also adds a server
+            # group IP): the whole server group, and the listing it is in.
+            mirror.mark_stale(mx_name(split.hostname, split.port), [path.rsplit("/", 1)[0]],
+                              [(segments[2], segments[3])])
+        else:
+            # The written URL may be a collection itself (a collection PUT), or an object of its parent collection.
+            mirror.mark_stale(mx_name(split.hostname, split.port), [path, path.rsplit("/", 1)[0]])
+
+
+mx_client.add_write_listener(_mark_written)
+
+
+class Inventory:
+    """
+    The SQLite mirror of the site tree of MXs.  The connection is shared by the threads of the process under a lock;
+    the GETs of a refresh run outside of it.
+    """
+
+    def __init__(self, path: str, ttl: Optional[float] = None, concurrency: int = FETCH_CONCURRENCY):
+        """
+        :param path: The SQLite database file, created if needed
+        :param ttl: Time to live of every collection in seconds (default: config_cache.ttl_for() of its path)
+        :param concurrency: The maximum number of collection GETs in flight during a refresh
+        """
+        self.path = path
+        self.ttl = ttl
+        self.concurrency = max(1, int(concurrency))
+        self._lock = threading.RLock()
+        # Collections written to through mx_client, not yet flagged stale in the database, as (mx, path).  Kept under
+        # their own lock so the bulk workers' writes never wait for SQLite.
+        self._written: Set[Tuple[str, str]] = set()
+        # Server groups written below, as (mx, site, server group): all their collections are flagged.
+        self._written_server_groups: Set[Tuple[str, str, str]] = set()
+        self._written_lock = threading.Lock()
+        # Per collection, serializes the live re-fetches of verify().
+        self._refetch_locks: Dict[Tuple[str, str], threading.Lock] = defaultdict(threading.Lock)
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(_SCHEMA)
+        with _open_mirrors_lock:
+            _open_mirrors.append(self)
+
+    def close(self) -> None:
+        with _open_mirrors_lock:
+            if self in _open_mirrors:
+                _open_mirrors.remove(self)
+        with self._lock:
+            self._flush_stale()
+            self._connection.close()
+
+    def __enter__(self) -> "Inventory":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _ttl(self, path: str) -> float:
+        return config_cache.ttl_for(path) if self.ttl is None else self.ttl
+
+    def mxs(self) -> List[str]:
+        """
+        :return: The MXs in the mirror, as "host:port"
+        """
+        with self._lock:
+            return [mx for (mx,) in self._connection.execute("SELECT DISTINCT mx FROM collections ORDER BY mx")]
+
+    def mark_stale(self, mx: str, paths: Iterable[str], server_groups: Iterable[Tuple[str, str]] = ()) -> None:
+        """
+        Marks collections to be fetched on the next refresh, whatever their age.  Called for every successful write
+        made through mx_client while the mirror is open; the marks are kept in memory and written to the database by
+        the next refresh() or close().
+
+        :param mx: The MX, as "host:port"
+        :param paths: The collection paths below /SecureSphere/api/v1, e.g. /conf/serverGroups/DC01
+        :param server_groups: (site, server group) whose collections are all marked: protected IPs, servers, db
+                              services and their db connections
+        :return: None
+        """
+        with self._written_lock:
+            self._written.update((mx, path) for path in paths)
+            self._written_server_groups.update((mx, site, server_group) for site, server_group in server_groups)
+
+    def _flush_stale(self) -> None:
+        with self._written_lock:
+            written, self._written = self._written, set()
+            server_groups, self._written_server_groups = self._written_server_groups, set()
+        if written or server_groups:
+            with self._lock, self._connection:
+                self._connection.executemany("UPDATE collections SET stale = 1 WHERE mx = ? AND path = ?", written)
+                for mx, site, server_group in server_groups:
+                    where, params = _match(mx, (site, server_group))
+                    self._connection.execute(f"UPDATE collections SET stale = 1 WHERE {where}", params)
+
+    def refresh(self, mxs: Iterable[Tuple[str, Any]], force: bool = False,
+                kinds: Optional[Sequence[str]] = None) -> Counter:
+        """
+        Brings the mirror of MXs up to date, crawling them on first use.  The caller must be logged in to every MX.
+
+        :param mxs: The (host, port) of the MXs
+        :param force: Fetch every collection again, whatever its age
+        :param kinds: Only fetch these kinds of collection (default: all), e.g. ('sites', 'server_groups')
+        :return: A Counter of the collections "unchanged", "changed", "gone" (404), "failed", and "dropped" (whose
+                 parent disappeared while they were fetched)
+        """
+        started = time.time()
+        names = list(dict.fromkeys(mx_name(host, port) for host, port in mxs))
+        self._flush_stale()
+        with self._lock, self._connection:
+            self._connection.executemany("INSERT OR IGNORE INTO collections (mx, path, kind) VALUES (?, ?, ?)",
+                                         [(mx, COLLECTIONS['sites'].path, 'sites') for mx in names])
+            placeholders = ", ".join("?" * len(names))
+            records = self._connection.execute(
+                f"SELECT mx, kind, site, server_group, service, path, fetched_at, stale FROM collections "
+                f"WHERE mx IN ({placeholders})", names).fetchall()
+        due = []
+        for mx, kind, site, server_group, service, path, fetched_at, stale in records:
+            if kinds is not None and kind not in kinds:
+                continue
+            if stale or fetched_at is None or force or fetched_at < started - self._ttl(path):
+                due.append(_Fetch(mx, kind, (site, server_group, service)[:COLLECTIONS[kind].depth]))
+
+        def fetch(job):
+            host, port = job.mx.rsplit(":", 1)
+            try:
+                return job, reconcile.get_collection(host, port, job.path), None
+            except Exception as e:
+                return job, None, e
+
+        counts: Counter = Counter()
+        mx_client.ensure_pool_size(self.concurrency)
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="inventory") as executor:
+            pending = {executor.submit(fetch, job) for job in due}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    outcome, children = self._apply(*future.result())
+                    counts[outcome] += 1
+                    pending.update(executor.submit(fetch, job) for job in children
+                                   if kinds is None or job.kind in kinds)
+        logger.info("Refreshed the inventory of %s in %.2fs: %s", ", ".join(names), time.time() - started,
+                    dict(counts))
+        return counts
+
+    def _apply(self, job: _Fetch, items: Optional[List[Any]], error: Optional[Exception]) -> Tuple[str, List[_Fetch]]:
+        collection = COLLECTIONS[job.kind]
+        with self._lock, self._connection:
+            connection = self._connection
+            if not connection.execute("SELECT 1 FROM collections WHERE mx = ? AND path = ?",
+                                      (job.mx, job.path)).fetchone():
+                return "dropped", []
+            if error is not None:
+                logger.warning("Unable to refresh %s of %s: %s", job.path, job.mx, error)
+                connection.execute("UPDATE collections SET error = ? WHERE mx = ? AND path = ?",
+                                   (str(error), job.mx, job.path))
+                return "failed", []
+            if items is None:
+                if not job.key:
+                    connection.execute("UPDATE collections SET error = ? WHERE mx = ? AND path = ?",
+                                       ("404 Not Found", job.mx, job.path))
+                    return "failed", []
+                # The parent object is gone: so is its subtree, and the collection that listed it is out of date.
+                parent_kind = _OBJECT_KINDS[len(job.key)]
+                where, values = _match(job.mx, job.key)
+                connection.execute(f"DELETE FROM {parent_kind} WHERE {where}", values)
+                self._delete_subtree(job.mx, job.key)
+                connection.execute("UPDATE collections SET stale = 1 WHERE mx = ? AND path = ?",
+                                   (job.mx, COLLECTIONS[parent_kind].path.format(*job.key[:-1])))
+                return "gone", []
+            rows = {}
+            for item in items:
+                values = collection.item(item)
+                if values[0] is not None:
+                    rows[str(values[0])] = (job.mx,) + job.key + (str(values[0]),) + values[1:]
+            digest = hashlib.sha256(audit_snapshot.canonical(sorted(rows.values()))).hexdigest()
+            previous, = connection.execute("SELECT digest FROM collections WHERE mx = ? AND path = ?",
+                                           (job.mx, job.path)).fetchone()
+            connection.execute("UPDATE collections SET fetched_at = ?, digest = ?, stale = 0, error = NULL "
+                               "WHERE mx = ? AND path = ?", (time.time(), digest, job.mx, job.path))
+            if digest == previous:
+                return "unchanged", []
+            where, values = _match(job.mx, job.key)
+            name_column = collection.columns[0]
+            old = {name for (name,) in connection.execute(f"SELECT {name_column} FROM {job.kind} WHERE {where}",
+                                                          values)}
+            connection.execute(f"DELETE FROM {job.kind} WHERE {where}", values)
+            width = 1 + len(job.key) + len(collection.columns)
+            connection.executemany(f"INSERT INTO {job.kind} VALUES ({', '.join('?' * width)})", rows.values())
+            for name in old - set(rows):
+                self._delete_subtree(job.mx, job.key + (name,))
+            children = [_Fetch(job.mx, kind, job.key + (name,)) for name in rows for kind in collection.children]
+            key_columns = ", ".join(KEY_COLUMNS)
+            for child in children:
+                key = (child.key + (None,) * len(KEY_COLUMNS))[:len(KEY_COLUMNS)]
+                connection.execute(f"INSERT OR IGNORE INTO collections (mx, path, kind, {key_columns}) "
+                                   f"VALUES (?, ?, ?, ?, ?, ?)", (child.mx, child.path, child.kind) + key)
+            # Only the new children need fetching now; the others have their own age.
+            return "changed", [child for child in children if child.key[-1] not in old]
+
+    def _delete_subtree(self, mx: str, key: Tuple[str, ...]) -> None:
+        # Deletes everything below the object named by key (not the object itself).
+        where, values = _match(mx, key)
+        for kind, collection in COLLECTIONS.items():
+            if collection.depth >= len(key):
+                self._connection.execute(f"DELETE FROM {kind} WHERE {where}", values)
+        self._connection.execute(f"DELETE FROM collections WHERE {where}", values)
+
+    def exists(self, mx: str, kind: str, *key: str) -> bool:
+        """
+        Whether the mirror has an object, e.g. exists("10.0.0.1:8083", "server_groups", "DC01", "MS SQL Server Group").
+
+        :param mx: The MX, as "host:port"
+        :param kind: The kind of collection listing the object
+        :param key: The names of its parents, then its own name (IP address, connection name...)
+        :return: True if the object is in the mirror
+        """
+        return self.get(mx, kind, *key) is not None
+
+    def get(self, mx: str, kind: str, *key: str) -> Optional[Dict[str, Any]]:
+        """
+        The row of an object.
+
+        :return: The row as a dictionary (mx, the names and the columns of its kind), or None if it is not mirrored
+        """
+        collection = COLLECTIONS[kind]
+        parents, name = key[:collection.depth], key[collection.depth]
+        where, values = _match(mx, parents)
+        with self._lock:
+            cursor = self._connection.execute(f"SELECT * FROM {kind} WHERE {where} AND {collection.columns[0]} = ?",
+                                              values + (str(name),))
+            row = cursor.fetchone()
+            return dict(zip([column[0] for column in cursor.description], row)) if row else None
+
+    def items(self, mx: str, kind: str, *parents: str) -> List[Dict[str, Any]]:
+        """
+        The mirrored items of a collection, e.g. items("10.0.0.1:8083", "protected_ips", "DC01", "MS SQL Server Group").
+
+        :return: A list of rows as dictionaries, in name order
+        """
+        where, values = _match(mx, parents)
+        with self._lock:
+            cursor = self._connection.execute(
+                f"SELECT * FROM {kind} WHERE {where} ORDER BY {COLLECTIONS[kind].columns[0]}", values)
+            names = [column[0] for column in cursor.description]
+            return [dict(zip(names, row)) for row in cursor]
+
+    def fetched(self, mx: str, kind: str, *parents: str) -> bool:
+        """
+        Whether a collection was fetched and has not been written to since, so that an object it does not list does not
+        exist on the MX (as of the fetch).
+        """
+        return self._fetched_at(mx, kind, *parents) is not None
+
+    def _fetched_at(self, mx: str, kind: str, *parents: str) -> Optional[float]:
+        # When the collection was fetched, or None if it never was or has been written to since.
+        path = COLLECTIONS[kind].path.format(*parents)
+        with self._written_lock:
+            if (mx, path) in self._written:
+                return None
+        with self._lock:
+            record = self._connection.execute("SELECT fetched_at, stale FROM collections WHERE mx = ? AND path = ?",
+                                              (mx, path)).fetchone()
+        return record[0] if record is not None and not record[1] else None
+
+    def find_ip(self, ip: str) -> List[Dict[str, Any]]:
+        """
+        Where an IP address is used: the protected IPs, server group IPs and db connections that have it, on every MX.
+
+        :param ip: The IP address
+        :return: A list of rows as dictionaries, each with the kind of collection it comes from
+        """
+        found = []
+        with self._lock:
+            for kind in ('protected_ips', 'server_ips', 'db_connections'):
+                cursor = self._connection.execute(f"SELECT * FROM {kind} WHERE ip = ? ORDER BY mx", (ip,))
+                names = [column[0] for column in cursor.description]
+                found.extend(dict(zip(names, row), kind=kind) for row in cursor)
+        return found
+
+    def missing(self, mx: str, kind: str, *key: str) -> Optional[str]:
+        """
+        Checks that an object and its parents exist, as far as the mirror knows, e.g.
+        missing("10.0.0.1:8083", "db_services", "DC01", "MS SQL Server Group", "MS SQL Service").
+
+        :return: A message naming the first object known to be missing, or None
+        """
+        for depth, kind in enumerate(_lineage(kind)):
+            if self.fetched(mx, kind, *key[:depth]) and not self.exists(mx, kind, *key[:depth + 1]):
+                return f"{_LABELS.get(kind, kind)} {'/'.join(key[:depth + 1])} does not exist on {mx} (inventory)"
+        return None
+
+    def verify(self, mx: str, kind: str, *key: str, since: float) -> Optional[str]:
+        """
+        Like missing(), but only trusts the collections fetched at or after since: a collection fetched before (and not
+        listing the object) is fetched again, live and once, before the object is reported missing.
+
+        :param since: The time (time.time()) before which a fetch is not proof that an object is missing
+        :return: A message naming the first object known to be missing, or None
+        """
+        for depth, level in enumerate(_lineage(kind)):
+            parents = key[:depth]
+            if self.exists(mx, level, *key[:depth + 1]):
+                continue
+            fetched_at = self._fetched_at(mx, level, *parents)
+            if fetched_at is not None and fetched_at < since:
+                with self._refetch_locks[(mx, COLLECTIONS[level].path.format(*parents))]:
+                    fetched_at = self._fetched_at(mx, level, *parents)
+                    if fetched_at is not None and fetched_at < since:
+                        self._refetch(_Fetch(mx, level, tuple(parents)))
+                if self.exists(mx, level, *key[:depth + 1]):
+                    continue
+                fetched_at = self._fetched_at(mx, level, *parents)
+            if fetched_at is None or fetched_at < since:
+                # Never fetched, written to since, or the live fetch failed: not known to be missing.
+                return None
+            return f"{_LABELS.get(level, level)} {'/'.join(key[:depth + 1])} does not exist on {mx} (inventory)"
+        return None
+
+    def _refetch(self, job: _Fetch) -> str:
+        host, port = job.mx.rsplit(":", 1)
+        try:
+            items, error = reconcile.get_collection(host, port, job.path), None
+        except Exception as e:
+            items, error = None, e
+        outcome, _ = self._apply(job, items, error)
+        logger.debug("Fetched %s of %s again: %s", job.path, job.mx, outcome)
+        return outcome
+
+    def status(self) -> List[Dict[str, Any]]:
+        """
+        The state of the mirror of every MX.
+
+        :return: A list of dictionaries: mx, the number of collections, fetched, stale and failed, the oldest fetch,
+                 and the row count of every table
+        """
+        summary = []
+        with self._lock:
+            for mx in self.mxs():
+                collections, fetched, stale, failed, oldest = self._connection.execute(
+                    "SELECT COUNT(*), COUNT(fetched_at), SUM(stale), COUNT(error), MIN(fetched_at) FROM collections "
+                    "WHERE mx = ?", (mx,)).fetchone()
+                entry = {"mx": mx, "collections": collections, "fetched": fetched, "stale": stale or 0,
+                         "failed": failed, "oldest_fetch": oldest}
+                for kind in COLLECTIONS:
+                    entry[kind] = self._connection.execute(f"SELECT COUNT(*) FROM {kind} WHERE mx = ?",
+                                                           (mx,)).fetchone()[0]
+                summary.append(entry)
+        return summary
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Adds the --inventory option to a script.
+
+    :param parser: The script's argument parser
+    :return: None
+    """
+    parser.add_argument("--inventory", metavar="DB",
+                        help="inventory mirror (see inventory.py); rows whose parent objects it knows to be missing "
+                             "fail without an API call")
+
+
+def guard(mirror: Inventory, task: Callable[[int, Dict[str, Any]], Any], kind: str,
+          columns: Sequence[str]) -> Callable[[int, Dict[str, Any]], Any]:
+    """
+    Wraps the task of a bulk provisioning script so that a row whose parent object the mirror knows to be missing
+    fails without an API call.  The mirror of each MX is refreshed (down to kind) before its first row is checked, and a
+    parent missing from a collection fetched before the run is checked against the MX again (Inventory.verify()).
+
+    :param mirror: The Inventory
+    :param task: The task, called with (rownum, row)
+    :param kind: The kind of the parent object, e.g. "server_groups"
+    :param columns: The CSV columns naming the parent object, e.g. ('site', 'server_group_name')
+    :return: The guarded task
+    """
+    lineage = _lineage(kind)
+    started = time.time()
+    refreshed = set()
+    locks: Dict[Tuple[str, str], threading.Lock] = defaultdict(threading.Lock)
+    locks_lock = threading.Lock()
+
+    def guarded(rownum, row):
+        mx = bulk_executor.mx_key(row)
+        with locks_lock:
+            lock = locks[mx]
+        with lock:
+            if mx not in refreshed:
+                mirror.refresh([mx], kinds=lineage)
+                refreshed.add(mx)
+        problem = mirror.verify(mx_name(*mx), kind, *(str(row[column]) for column in columns), since=started)
+        if problem:
+            logger.error("Skipping row %d: %s", rownum, problem, extra={"rownum": rownum})
+            return problem
+        return task(rownum, row)
+
+    return guarded
+
+
+def _print_rows(rows: List[Dict[str, Any]]) -> None:
+    for row in rows:
+        print("  " + "  ".join(f"{name}={value}" for name, value in row.items() if value is not None))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Local SQLite mirror of the site tree of MXs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    refresh_parser = commands.add_parser("refresh", help="crawl the MXs, or fetch what is stale since the last crawl")
+    find_parser = commands.add_parser("find-ip", help="where an IP address is used")
+    ls_parser = commands.add_parser("ls", help="the sites of an MX, or the contents of a site, server group or service")
+    commands.add_parser("status", help="the state of the mirror of every MX")
+    for command_parser in commands.choices.values():
+        command_parser.add_argument("db", metavar="DB", help="the SQLite database of the mirror")
+        mx_logging.add_arguments(command_parser)
+        metrics.add_arguments(command_parser)
+    refresh_parser.add_argument("--mx", action="append", metavar="HOST:PORT",
+                                help="MX to mirror (repeatable; default: every MX already in the mirror)")
+    refresh_parser.add_argument("--force", action="store_true", help="fetch every collection again")
+    refresh_parser.add_argument("--ttl", type=float, help="time to live of every collection, in seconds")
+    refresh_parser.add_argument("--concurrency", type=int, default=FETCH_CONCURRENCY,
+                                help="collection GETs in flight at once")
+    find_parser.add_argument("ip")
+    ls_parser.add_argument("mx", metavar="HOST:PORT")
+    ls_parser.add_argument("names", nargs="*", metavar="NAME", help="site [server group [service]]")
+    args = parser.parse_args()
+    mx_logging.configure(args.log_level, args.log_format)
+    metrics.write_at_exit(args.metrics_json, args.metrics_prom)
+    with Inventory(args.db, getattr(args, "ttl", None), getattr(args, "concurrency", FETCH_CONCURRENCY)) as mirror:
+        if args.command == "refresh":
+            mxs = [tuple(mx.rsplit(":", 1)) for mx in (args.mx or mirror.mxs())]
+            if not mxs:
+                parser.error("the mirror is empty: name the MXs to crawl with --mx")
+            for host, port in mxs:
+                session_manager = authorization_v2.get_session_manager(host, port)
+                if session_manager.get_cookie() is None:
+                    print(f'Login to {host}:{port} failed with status code {session_manager.status_code}')
+                    raise SystemExit(1)
+            counts = mirror.refresh(mxs, args.force)
+            print(", ".join(f"{outcome}: {counts[outcome]}" for outcome in ("changed", "unchanged", "gone", "failed")))
+            raise SystemExit(1 if counts["failed"] else 0)
+        if args.command == "find-ip":
+            found = mirror.find_ip(args.ip)
+            print(f"{args.ip}: {len(found)} found")
+            _print_rows(found)
+            raise SystemExit(0 if found else 1)
+        if args.command == "ls":
+            if len(args.names) > 3:
+                parser.error("ls takes at most a site, a server group and a service")
+            for kind in _LISTINGS[len(args.names)]:
+                print(f"{kind}:")
+                _print_rows(mirror.items(args.mx, kind, *args.names))
+            raise SystemExit(0)
+        for entry in mirror.status():
+            print(f"{entry.pop('mx')}: " + ", ".join(f"{name}={value}" for name, value in entry.items()))
@@ -0,0 +1,121 @@
+import codecs
+import json
+from typing import Any, IO, Iterable, Iterator
+
+"""
+Description:
+This Python script provides an incremental JSON parser for large MX API responses.
+
+iter_array_items() reads a JSON array from an iterable of byte chunks (e.g. requests' Response.iter_content()) and yields
+one element at a time as soon as it has been received, so a response of tens of MB never has to be held in memory as a
+whole.  Each element is decoded with the standard json module, so only the buffer of the element being parsed is kept.
+
+If the document is an object rather than an array, the elements of its first array value are yielded, which covers
+the MX's {"name": [...]} collection responses; that case is parsed after the whole body has been read.
+
+Developer note: This is code from my personal lab for my professional development. This should be considered example
+code only.
+
+Revision History:
+-----------------
+2026-10-17:
+    Initial creation of the script.
+"""
+
+_WHITESPACE = " \t\n\r"
+_decoder = json.JSONDecoder()
+
+
+def iter_array_items(chunks: Iterable[bytes], encoding: str = "utf-8") -> Iterator[Any]:
+    """
+    Incrementally parses a JSON array and yields its elements.
+
+    :param chunks: An iterable of byte (or str) chunks making up the JSON document
+    :param encoding: The encoding of byte chunks
+    :return: An iterator of the decoded array elements
+    :raises ValueError: If the document is not valid JSON
+    """
+    decode = codecs.getincrementaldecoder(encoding)().decode
+    chunks = iter(chunks)
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def more() -> bool:
+        nonlocal buffer, pos, eof
+        for chunk in chunks:
+            text = decode(chunk) if isinstance(chunk, bytes) else chunk
+            if text:
+                # Drop what has already been parsed before growing the buffer.
+                buffer = buffer[pos:] + text
+                pos = 0
+                return True
+        eof = True
+        return False
+
+    def skip(characters: str) -> bool:
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in characters:
+                pos += 1
+            if pos < len(buffer) or not more():
+                return pos < len(buffer)
+
+    if not skip(_WHITESPACE):
+        return
+    if buffer[pos] != "[":
+        # Not an array: fall back to parsing the whole document.
+        while more():
+            pass
+        document = json.loads(buffer[pos:])
+        if isinstance(document, dict):
+            lists = [value for value in document.values() if isinstance(value, list)]
+            document = lists[0] if lists else [document]
+        yield from document
+        return
+    pos += 1
+
+    first = True
+    while True:
+        if not skip(_WHITESPACE):
+            raise ValueError("Unexpected end of JSON array")
+        if buffer[pos] == "]":
+            return
+        if not first:
+            if buffer[pos] != ",":
+                raise ValueError(f"Expected ',' or ']' in JSON array, found {buffer[pos]!r}")
+            pos += 1
+            if not skip(_WHITESPACE):
+                raise ValueError("Unexpected end of JSON array")
+        first = False
+        while True:
+            try:
+                item, end = _decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if not eof and more():
+                    continue
+                raise
+            # A number or literal is only complete once the ',' or ']' after it has been received, e.g. "-3." may
+            # continue as "-3.5" in the next chunk.
+            if not isinstance(item, (dict, list, str)) and buffer[end:].lstrip(_WHITESPACE)[:1] not in (",", "]") \
+                    and not eof and more():
+                continue
+            break
+        pos = end
+        yield item
+
+
+def write_ndjson(items: Iterable[Any], file: IO[str]) -> int:
+    """
+    Writes items as newline-delimited JSON, one per line, as they are produced.
+
+    :param items: The items to write
+    :param file: A text file open for writing
+    :return: The number of items written
+    """
+    count = 0
+    for item in items:
+        file.write(json.dumps(item, separators=(",", ":")))
+        file.write("\n")
+        count += 1
+    return count
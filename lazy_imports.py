@@ -0,0 +1,77 @@
+import importlib.util
+import sys
+import threading
+from types import ModuleType
+
+"""
+Description:
+This Python script provides lazy imports for the heavy optional dependencies of this repository.
+
+The scripts are run thousands of times a day for one-off changes, so interpreter start and import time dominate a
+single-row run.  pandas and numpy alone take about 300 ms to import, and only the --preflight path uses them.
+lazy_module() returns the module object right away and defers executing it until one of its attributes is first used:
+    pd = lazy_imports.lazy_module("pandas")   # costs nothing
+    pd.read_csv(...)                          # pandas is imported here
+A dependency that is not installed raises ImportError at that first use, with a message naming the feature that needs
+it, instead of failing every script at start.
+
+Module-level annotations are evaluated when the function or class is defined, so annotations naming a lazy module's
+types must be strings ("pd.DataFrame").
+
+Developer note: This is code from my personal lab for my professional development. This should be considered example
+code only.
+
+Revision History:
+-----------------
+2026-10-18:
+    Initial creation of the script.
+"""
+
+_lock = threading.Lock()
+
+
+class _MissingModule(ModuleType):
+    """
+    Stands in for a module that is not installed, and raises ImportError when it is used.
+    """
+
+    def __init__(self, name: str, needed_for: str):
+        super().__init__(name)
+        self._needed_for = needed_for
+
+    def __getattr__(self, attribute: str):
+        raise ImportError(f"{self.__name__} is required for {self._needed_for}: pip install {self.__name__}")
+
+
+def lazy_module(name: str, needed_for: str = "this feature") -> ModuleType:
+    """
+    Returns a module that is only executed when one of its attributes is first used.
+
+    :param name: The module's import name, e.g. "pandas"
+    :param needed_for: What the module is used for, for the ImportError raised if it is not installed
+    :return: The module (already imported, lazily loaded, or a stand-in raising ImportError on use)
+    """
+    with _lock:
+        module = sys.modules.get(name)
+        if module is not None:
+            return module
+        spec = importlib.util.find_spec(name)
+        if spec is None or spec.loader is None:
+            return _MissingModule(name, needed_for)
+        loader = importlib.util.LazyLoader(spec.loader)
+        spec.loader = loader
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        loader.exec_module(module)
+        return module
+
+
+def is_loaded(name: str) -> bool:
+    """
+    Whether a module has actually been executed, as opposed to imported lazily and not used yet.
+
+    :param name: The module's import name
+    :return: True if the module is in sys.modules and has been executed
+    """
+    module = sys.modules.get(name)
+    return module is not None and type(module).__name__ != "_LazyModule"
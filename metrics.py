@@ -0,0 +1,255 @@
+import argparse
+import atexit
+import bisect
+import json
+import re
+import sys
+import threading
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import request_policy
+
+"""
+Description:
+This Python script collects the metrics of the MX API calls made through mx_client.
+
+Every request attempt is recorded by endpoint, i.e. its path with the site tree names and object names replaced by
+{} (for example /conf/serverGroups/{}/{}/protectedIPs/{}), so the number of series stays small:
+    mx_requests_total{method, endpoint, status}     status codes, "error" when no response was received
+    mx_request_duration_seconds{method, endpoint}   latency histogram (LATENCY_BUCKETS)
+    mx_request_bytes_total{method, endpoint}        request body bytes sent
+    mx_response_bytes_total{method, endpoint}       response body bytes received
+    mx_retries_total{host}                          retries made by request_policy
+    mx_concurrency_limit{host}                      request_policy's current adaptive concurrency limit
+They are rendered in the Prometheus text exposition format by render_prometheus(), and as a JSON summary (with
+p50/p95/p99 estimated from the histogram) by summary().  The scripts' --metrics-json and --metrics-prom options write
+them when the script exits.  Set ENABLED = False to skip the recording altogether.
+
+Developer note: This is code from my personal lab for my professional development. This should be considered example
+code only.
+
+Revision History:
+-----------------
+2026-10-17:
+    Initial creation of the script.
+"""
+
+# Global variables
+ENABLED = True
+# Upper bounds of the latency histogram buckets, in seconds.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Path segments that are API resources; every other segment is an object name and becomes {}.
+RESOURCE_SEGMENTS = frozenset({
+    "auth", "session", "administration", "version", "conf", "serverGroups", "protectedIPs", "servers", "dbServices",
+    "dbConnections", "agentsMonitoringRules", "jsonar", "dbauditreports", "sites", "policies", "dbAuditPolicies",
+})
+_API_PREFIX = re.compile(r"^/SecureSphere/api/v\d+")
+
+
+class Histogram:
+    """
+    Cumulative-bucket latency histogram.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        # counts[i] is the number of observations in (buckets[i-1], buckets[i]]; the last one is +Inf.
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimates a quantile by linear interpolation inside its bucket, as Prometheus' histogram_quantile() does.
+        """
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if cumulative + count >= rank and count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                if i == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[i] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+
+class _EndpointStats:
+    def __init__(self):
+        self.statuses: Dict[str, int] = {}
+        self.latency = Histogram()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+
+_lock = threading.Lock()
+_endpoints: Dict[Tuple[str, str], _EndpointStats] = {}
+
+
+def endpoint_of(url: str) -> str:
+    """
+    The endpoint of a URL: its API path with object names replaced by {}.
+
+    :param url: The full MX API URL
+    :return: The endpoint, e.g. /conf/dbServices/{}/{}/{}/dbConnections/{}
+    """
+    path = _API_PREFIX.sub("", urlsplit(url).path)
+    segments = [s if s in RESOURCE_SEGMENTS else "{}" for s in path.strip("/").split("/") if s]
+    return "/" + "/".join(segments)
+
+
+def record_request(method: str, url: str, status_code: Optional[int], latency: float, bytes_sent: int = 0,
+                   bytes_received: int = 0) -> None:
+    """
+    Records one request attempt.
+
+    :param method: The HTTP method
+    :param url: The full MX API URL
+    :param status_code: The response status code, or None if no response was received
+    :param latency: Seconds from sending the request to receiving the response headers
+    :param bytes_sent: Request body size
+    :param bytes_received: Response body size
+    :return: None
+    """
+    if not ENABLED:
+        return
+    key = (method.upper(), endpoint_of(url))
+    status = str(status_code) if status_code is not None else "error"
+    with _lock:
+        stats = _endpoints.get(key)
+        if stats is None:
+            stats = _endpoints[key] = _EndpointStats()
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+        stats.latency.observe(latency)
+        stats.bytes_sent += bytes_sent
+        stats.bytes_received += bytes_received
+
+
+def reset() -> None:
+    """
+    Clears every recorded metric.
+
+    :return: None
+    """
+    with _lock:
+        _endpoints.clear()
+
+
+def summary() -> Dict:
+    """
+    The metrics as a JSON-serializable summary.
+
+    :return: {"endpoints": [...], "hosts": [...]} with per-endpoint counts, status codes, latency and bytes, and per
+             MX host retries and concurrency limit
+    """
+    endpoints = []
+    with _lock:
+        for (method, endpoint), stats in sorted(_endpoints.items()):
+            latency = stats.latency
+            endpoints.append({
+                "method": method, "endpoint": endpoint, "requests": latency.count, "status_codes": dict(stats.statuses),
+                "latency_seconds": {"mean": round(latency.sum / latency.count, 6) if latency.count else 0.0,
+                                    "p50": round(latency.quantile(0.50), 6), "p95": round(latency.quantile(0.95), 6),
+                                    "p99": round(latency.quantile(0.99), 6)},
+                "bytes_sent": stats.bytes_sent, "bytes_received": stats.bytes_received})
+    hosts = [{"host": policy.host, "retries": policy.retries, "concurrency_limit": round(policy.limiter.limit, 2),
+              "breaker": policy.breaker.state} for policy in request_policy.policies()]
+    return {"endpoints": endpoints, "hosts": hosts}
+
+
+def _labels(**labels: str) -> str:
+    escaped = (f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+               for k, v in labels.items())
+    return "{" + ",".join(escaped) + "}"
+
+
+def render_prometheus() -> str:
+    """
+    The metrics in the Prometheus text exposition format.
+
+    :return: The exposition text
+    """
+    lines: List[str] = []
+    with _lock:
+        items = sorted(_endpoints.items())
+        lines += ["# HELP mx_requests_total MX API request attempts by status code.",
+                  "# TYPE mx_requests_total counter"]
+        for (method, endpoint), stats in items:
+            for status, count in sorted(stats.statuses.items()):
+                lines.append(f"mx_requests_total{_labels(method=method, endpoint=endpoint, status=status)} {count}")
+        lines += ["# HELP mx_request_duration_seconds MX API request latency.",
+                  "# TYPE mx_request_duration_seconds histogram"]
+        for (method, endpoint), stats in items:
+            cumulative = 0
+            for bound, count in zip(stats.latency.buckets + (float("inf"),), stats.latency.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"mx_request_duration_seconds_bucket"
+                             f"{_labels(method=method, endpoint=endpoint, le=le)} {cumulative}")
+            labels = _labels(method=method, endpoint=endpoint)
+            lines.append(f"mx_request_duration_seconds_sum{labels} {stats.latency.sum}")
+            lines.append(f"mx_request_duration_seconds_count{labels} {stats.latency.count}")
+        for name, attribute, help_text in (("mx_request_bytes_total", "bytes_sent", "Request body bytes sent."),
+                                           ("mx_response_bytes_total", "bytes_received",
+                                            "Response body bytes received.")):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for (method, endpoint), stats in items:
+                lines.append(f"{name}{_labels(method=method, endpoint=endpoint)} {getattr(stats, attribute)}")
+    policies = request_policy.policies()
+    lines += ["# HELP mx_retries_total Retries made by the request policy.", "# TYPE mx_retries_total counter"]
+    lines += [f"mx_retries_total{_labels(host=p.host)} {p.retries}" for p in policies]
+    lines += ["# HELP mx_concurrency_limit Current adaptive concurrency limit.", "# TYPE mx_concurrency_limit gauge"]
+    lines += [f"mx_concurrency_limit{_labels(host=p.host)} {p.limiter.limit:g}" for p in policies]
+    return "\n".join(lines) + "\n"
+
+
+def write(json_path: Optional[str] = None, prometheus_path: Optional[str] = None) -> None:
+    """
+    Writes the JSON summary and/or the Prometheus text to files ("-" for stderr).
+
+    :param json_path: The JSON summary file, or None
+    :param prometheus_path: The Prometheus text file, or None
+    :return: None
+    """
+    for path, render in ((json_path, lambda: json.dumps(summary(), indent=2) + "\n"),
+                         (prometheus_path, render_prometheus)):
+        if not path:
+            continue
+        if path == "-":
+            sys.stderr.write(render())
+        else:
+            with open(path, "w") as f:
+                f.write(render())
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Adds the --metrics-json and --metrics-prom options.
+
+    :param parser: The script's argument parser
+    :return: None
+    """
+    parser.add_argument("--metrics-json", metavar="FILE", help="write a JSON summary of the API metrics at exit "
+                                                               "('-' for stderr)")
+    parser.add_argument("--metrics-prom", metavar="FILE", help="write the API metrics in Prometheus text format at "
+                                                               "exit ('-' for stderr)")
+
+
+def write_at_exit(json_path: Optional[str] = None, prometheus_path: Optional[str] = None) -> None:
+    """
+    Writes the metrics when the process exits, if any path is given.
+
+    :param json_path: The JSON summary file, or None
+    :param prometheus_path: The Prometheus text file, or None
+    :return: None
+    """
+    if json_path or prometheus_path:
+        atexit.register(write, json_path, prometheus_path)
@@ -0,0 +1,548 @@
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import secrets
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+"""
+Description:
+This Python script is a local stand-in for the SecureSphere MX API, for load testing and benchmarking the scripts of
+this repository without a production MX.
+
+It serves, over HTTPS with a throw-away self-signed certificate (or plain HTTP with --http):
+    /auth/session                                                           POST (login), DELETE
+    /administration/version                                                 GET (keepalive)
+    /conf/sites                                                             GET
+    /conf/serverGroups/{site}                                               GET
+    /conf/dbServices/{site}/{server group}                                  GET
+    /conf/serverGroups/{site}/{server group}/protectedIPs[/{ip}]             GET, POST, PUT, DELETE
+    /conf/serverGroups/{site}/{server group}/servers[/{ip}]                  GET, PUT
+    /conf/dbServices/{site}/{server group}/{service}/dbConnections[/{name}]  GET, POST, PUT, DELETE
+    /conf/agentsMonitoringRules[/{name}]                                     GET, POST, PUT, DELETE
+    /conf/jsonar/dbauditreports/ and /conf/dbauditreports/                   GET
+all under /SecureSphere/api/v1, keeping the created objects in memory.  Creating a protected IP also creates its
+server group IP, as on a real MX.  A PUT on the protectedIPs collection replaces the server group's protected IP list,
+and a PUT on the servers collection updates the server group IPs it lists.  The sites, server groups and db services
+listed are those that have objects.  GETs carry an ETag and answer If-None-Match with 304; a PUT with If-Match is
+answered 412 when the ETag of the resource changed.
+
+Behaviour knobs:
+    --latency/--jitter    added service time per request, in seconds
+    --error-rate          fraction of requests answered with --error-status (and Retry-After: --retry-after)
+    --session-ttl         seconds after which a session cookie is rejected with 401
+    --audit-reports       number of report configurations served by dbauditreports
+    --no-collection-put   answer PUTs on the protectedIPs/servers collections with 405, as an older MX would
+    --serialize-sessions  serve the requests of each session one at a time, as an MX that throttles a session would
+Counters (requests per endpoint, status codes, connections accepted, peak open connections) are served as JSON by
+GET /mock/stats, and POST /mock/reset clears them along with the stored objects (sessions are kept).
+
+Usage:
+$ python mock_mx.py --port 8083 --latency 0.02 --error-rate 0.01
+
+Developer note: This is code from my personal lab for my professional development. This should be considered example
+code only.
+
+Revision History:
+-----------------
+2026-10-17:
+    Initial creation of the script.
+2026-10-17:
+    Added PUT on the protectedIPs and servers collections, and --no-collection-put.
+2026-10-18:
+    Added the site, server group and db service listings.
+2026-10-18:
+    Added --serialize-sessions.
+2026-10-18:
+    A PUT with If-Match is answered 412 when the resource changed.
+"""
+
+# Global variables
+API_PATH = "/SecureSphere/api/v1"
+DEFAULT_PORT = 8083
+DEFAULT_AUDIT_REPORTS = 1000
+
+_ROUTES = (
+    ("sites", re.compile(r"^/conf/sites/?$")),
+    ("serverGroups", re.compile(r"^/conf/serverGroups/([^/]+)/?$")),
+    ("dbServices", re.compile(r"^/conf/dbServices/([^/]+)/([^/]+)/?$")),
+    ("protectedIPs", re.compile(r"^/conf/serverGroups/([^/]+)/([^/]+)/protectedIPs(?:/([^/]+))?/?$")),
+    ("servers", re.compile(r"^/conf/serverGroups/([^/]+)/([^/]+)/servers(?:/([^/]+))?/?$")),
+    ("dbConnections", re.compile(r"^/conf/dbServices/([^/]+)/([^/]+)/([^/]+)/dbConnections(?:/([^/]+))?/?$")),
+    ("agentsMonitoringRules", re.compile(r"^/conf/agentsMonitoringRules(?:/([^/]+))?/?$")),
+    ("dbauditreports", re.compile(r"^/conf/(?:jsonar/)?dbauditreports/?$")),
+    ("version", re.compile(r"^/administration/version/?$")),
+    ("session", re.compile(r"^/auth/session/?$")),
+)
+
+
+class MockMXState:
+    """
+    The objects, sessions and counters of a mock MX.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, error_status: int = 503,
+                 retry_after: Optional[float] = None, session_ttl: Optional[float] = None,
+                 audit_reports: int = DEFAULT_AUDIT_REPORTS, collection_put: bool = True,
+                 serialize_sessions: bool = False):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.session_ttl = session_ttl
+        self.audit_reports = audit_reports
+        self.collection_put = collection_put
+        self.serialize_sessions = serialize_sessions
+        self.lock = threading.Lock()
+        # JSESSIONID -> lock held while one of its requests is served, with serialize_sessions.
+        self.session_locks: Dict[str, threading.Lock] = {}
+        # JSESSIONID -> expiry time (monotonic).  Kept across reset(), so clients stay logged in.
+        self.sessions: Dict[str, float] = {}
+        self.open_connections = 0
+        self.reset()
+
+    def reset(self) -> None:
+        with self.lock:
+            # (site, server group) -> ip -> protected IP
+            self.protected_ips: Dict[Tuple[str, str], Dict[str, Dict]] = {}
+            # (site, server group) -> ip -> server group IP
+            self.servers: Dict[Tuple[str, str], Dict[str, Dict]] = {}
+            # (site, server group, service) -> name -> db connection
+            self.db_connections: Dict[Tuple[str, str, str], Dict[str, Dict]] = {}
+            self.amrs: Dict[str, Dict] = {}
+            self.requests: Dict[str, int] = {}
+            self.status_codes: Dict[str, int] = {}
+            self.bytes_received = 0
+            self.bytes_sent = 0
+            self.logins = 0
+            self.connections = 0
+            self.peak_connections = self.open_connections
+            self._audit_report_body: Optional[bytes] = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {"requests": dict(self.requests), "status_codes": dict(self.status_codes),
+                    "bytes_received": self.bytes_received, "bytes_sent": self.bytes_sent, "logins": self.logins,
+                    "connections": self.connections, "open_connections": self.open_connections,
+                    "peak_connections": self.peak_connections}
+
+    def audit_report_body(self) -> bytes:
+        with self.lock:
+            if self._audit_report_body is None:
+                reports = [{"reportId": i, "reportName": f"Audit report {i}", "reportFormat": "CSV",
+                            "policies": [f"Audit policy {i % 17}"], "columns": ["User", "Source IP", "Query"],
+                            "filters": {"timeFrame": "last 24 hours", "dbUser": f"user{i % 97}"}}
+                           for i in range(self.audit_reports)]
+                self._audit_report_body = json.dumps(reports).encode()
+            return self._audit_report_body
+
+
+class MockMXHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "MockMX/1.0"
+
+    def setup(self) -> None:
+        super().setup()
+        state = self.server.state
+        with state.lock:
+            state.connections += 1
+            state.open_connections += 1
+            state.peak_connections = max(state.peak_connections, state.open_connections)
+
+    def finish(self) -> None:
+        try:
+            super().finish()
+        finally:
+            state = self.server.state
+            with state.lock:
+                state.open_connections -= 1
+
+    def log_message(self, format: str, *args) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self) -> None:
+        self._handle("GET")
+
+    def do_POST(self) -> None:
+        self._handle("POST")
+
+    def do_PUT(self) -> None:
+        self._handle("PUT")
+
+    def do_DELETE(self) -> None:
+        self._handle("DELETE")
+
+    def _handle(self, method: str) -> None:
+        state: MockMXState = self.server.state
+        length = int(self.headers.get("Content-Length") or 0)
+        raw_body = self.rfile.read(length) if length else b""
+        split = urlsplit(self.path)
+        if split.path.startswith("/mock/"):
+            return self._handle_mock(method, split.path)
+        path = split.path[len(API_PATH):] if split.path.startswith(API_PATH) else split.path
+        endpoint, groups = "unknown", ()
+        for name, pattern in _ROUTES:
+            match = pattern.match(path)
+            if match:
+                endpoint, groups = name, tuple(unquote(g) if g is not None else None for g in match.groups())
+                break
+        with state.lock:
+            key = f"{method} {endpoint}"
+            state.requests[key] = state.requests.get(key, 0) + 1
+            state.bytes_received += len(raw_body)
+            session_lock = None
+            if state.serialize_sessions and endpoint != "session":
+                session_lock = state.session_locks.setdefault(self._cookies().get("JSESSIONID", ""), threading.Lock())
+        if session_lock is None:
+            return self._serve(method, endpoint, groups, split, path, raw_body)
+        with session_lock:
+            return self._serve(method, endpoint, groups, split, path, raw_body)
+
+    def _serve(self, method: str, endpoint: str, groups: Tuple, split, path: str, raw_body: bytes) -> None:
+        state: MockMXState = self.server.state
+        if state.latency or state.jitter:
+            time.sleep(max(0.0, state.latency + random.uniform(-state.jitter, state.jitter)))
+        if state.error_rate and random.random() < state.error_rate:
+            headers = {"Retry-After": str(state.retry_after)} if state.retry_after is not None else {}
+            return self._send(state.error_status, {"errors": [{"description": "Injected error"}]}, headers)
+        if endpoint == "session":
+            return self._session(method)
+        if not self._authenticated():
+            return self._send(401, {"errors": [{"description": "Session is not valid"}]})
+        try:
+            body = json.loads(raw_body) if raw_body else {}
+        except ValueError:
+            return self._send(400, {"errors": [{"description": "Malformed JSON body"}]})
+        query = {k: v[0] for k, v in parse_qs(split.query).items()}
+        if endpoint == "unknown":
+            return self._send(404, {"errors": [{"description": f"No such resource: {path}"}]})
+        if endpoint == "version":
+            return self._send(200, {"serverVersion": "14.7.0.10"})
+        if endpoint == "dbauditreports":
+            return self._send_bytes(200, state.audit_report_body())
+        if method == "PUT" and self.headers.get("If-Match"):
+            # A conditional collection PUT: 412 if the collection changed since the GET that returned the ETag.
+            status, current = getattr(self, f"_{endpoint}")("GET", groups, {}, query)
+            if status == 200 and self.headers["If-Match"] != '"' + hashlib.sha256(
+                    json.dumps(current).encode()).hexdigest()[:32] + '"':
+                return self._send(412, {"errors": [{"description": "The collection was modified"}]})
+        status, payload = getattr(self, f"_{endpoint}")(method, groups, body, query)
+        self._send(status, payload)
+
+    def _session(self, method: str):
+        state: MockMXState = self.server.state
+        if method == "DELETE":
+            with state.lock:
+                state.sessions.pop(self._cookies().get("JSESSIONID", ""), None)
+            return self._send(200, {})
+        if method != "POST" or not self.headers.get("Authorization", "").startswith("Basic "):
+            return self._send(401, {"errors": [{"description": "Missing Basic Authorization"}]})
+        session_id = secrets.token_hex(16).upper()
+        with state.lock:
+            state.logins += 1
+            state.sessions[session_id] = time.monotonic() + state.session_ttl if state.session_ttl else float("inf")
+        cookies = [f"JSESSIONID={session_id}; Path=/; Secure; HttpOnly",
+                   f"SSOSESSIONID={secrets.token_hex(16).upper()}; Path=/; Secure; HttpOnly"]
+        self._send(200, {"session-id": f"JSESSIONID={session_id}"}, cookies=cookies)
+
+    def _cookies(self) -> Dict[str, str]:
+        return dict(part.strip().partition("=")[::2] for part in self.headers.get("Cookie", "").split(";")
+                    if "=" in part)
+
+    def _authenticated(self) -> bool:
+        state: MockMXState = self.server.state
+        cookies = self._cookies()
+        with state.lock:
+            expires_at = state.sessions.get(cookies.get("JSESSIONID", ""))
+            if expires_at is None:
+                return False
+            if time.monotonic() >= expires_at:
+                del state.sessions[cookies["JSESSIONID"]]
+                return False
+            return True
+
+    def _sites(self, method, groups, body, query):
+        state: MockMXState = self.server.state
+        if method != "GET":
+            return 405, {}
+        with state.lock:
+            keys = list(state.protected_ips) + list(state.servers) + list(state.db_connections)
+            return 200, {"sites": sorted({key[0] for key in keys})}
+
+    def _serverGroups(self, method, groups, body, query):
+        state: MockMXState = self.server.state
+        (site,) = groups
+        if method != "GET":
+            return 405, {}
+        with state.lock:
+            keys = list(state.protected_ips) + list(state.servers) + list(state.db_connections)
+            names = sorted({key[1] for key in keys if key[0] == site})
+            if not names:
+                return 404, {"errors": [{"description": f"Site {site} does not exist"}]}
+            return 200, {"server-groups": [{"name": name} for name in names]}
+
+    def _dbServices(self, method, groups, body, query):
+        state: MockMXState = self.server.state
+        site, server_group = groups
+        if method != "GET":
+            return 405, {}
+        with state.lock:
+            names = sorted({key[2] for key in state.db_connections if key[:2] == (site, server_group)})
+            return 200, {"db-services": [{"name": name} for name in names]}
+
+    def _protectedIPs(self, method, groups, body, query):
+        state: MockMXState = self.server.state
+        site, server_group, ip = groups
+        with state.lock:
+            ips = state.protected_ips.setdefault((site, server_group), {})
+            servers = state.servers.setdefault((site, server_group), {})
+            if ip is None:
+                if method == "GET":
+                    return 200, {"protected-ips": list(ips.values())}
+                if method != "PUT" or not state.collection_put:
+                    return 405, {}
+                replaced = {item["ip"]: {"ip": item["ip"], "gateway-group": item.get("gateway-group"),
+                                         "comment": item.get("comment")} for item in body.get("protected-ips", [])}
+                for removed in set(ips) - set(replaced):
+                    servers.pop(removed, None)
+                for added in set(replaced) - set(ips):
+                    servers.setdefault(added, {"ip": added, "OS-type": None})
+                ips.clear()
+                ips.update(replaced)
+                return 200, {}
+            if method == "GET":
+                return (200, ips[ip]) if ip in ips else (404, {})
+            if method == "POST":
+                if ip in ips:
+                    return 409, {"errors": [{"description": f"Protected IP {ip} already exists"}]}
+                ips[ip] = {"ip": ip, "gateway-group": query.get("gatewayGroup"), "comment": body.get("comment")}
+                servers.setdefault(ip, {"ip": ip, "OS-type": None})
+                return 200, {}
+            if ip not in ips:
+                return 404, {"errors": [{"description": f"Protected IP {ip} does not exist"}]}
+            if method == "PUT":
+                ips[ip].update({"gateway-group": query.get("gatewayGroup", ips[ip]["gateway-group"]),
+                                "comment": body.get("comment", ips[ip]["comment"])})
+                return 200, {}
+            del ips[ip]
+            servers.pop(ip, None)
+            return 200, {}
+
+    def _servers(self, method, groups, body, query):
+        state: MockMXState = self.server.state
+        site, server_group, ip = groups
+        with state.lock:
+            servers = state.servers.setdefault((site, server_group), {})
+            if ip is None:
+                if method == "GET":
+                    return 200, {"servers": list(servers.values())}
+                if method != "PUT" or not state.collection_put:
+                    return 405, {}
+                items = body.get("servers", [])
+                unknown = [item["ip"] for item in items if item.get("ip") not in servers]
+                if unknown:
+                    return 404, {"errors": [{"description": f"Server group IP {unknown[0]} does not exist"}]}
+                for item in items:
+                    servers[item["ip"]]["OS-type"] = item.get("OS-type", servers[item["ip"]]["OS-type"])
+                return 200, {}
+            if ip not in servers:
+                return 404, {"errors": [{"description": f"Server group IP {ip} does not exist"}]}
+            if method == "GET":
+                return 200, servers[ip]
+            if method == "PUT":
+                servers[ip]["OS-type"] = body.get("OS-type", servers[ip]["OS-type"])
+                return 200, {}
+            return 405, {}
+
+    def _dbConnections(self, method, groups, body, query):
+        state: MockMXState = self.server.state
+        site, server_group, service, name = groups
+        with state.lock:
+            connections = state.db_connections.setdefault((site, server_group, service), {})
+            if name is None:
+                if method != "GET":
+                    return 405, {}
+                return 200, {"connections": [{k: v for k, v in c.items() if k != "password"}
+                                             for c in connections.values()]}
+            if method == "GET":
+                return (200, connections[name]) if name in connections else (404, {})
+            if method == "POST":
+                if name in connections:
+                    return 409, {"errors": [{"description": f"Connection {name} already exists"}]}
+                connections[name] = dict(body, **{"display-name": name})
+                return 200, {}
+            if name not in connections:
+                return 404, {"errors": [{"description": f"Connection {name} does not exist"}]}
+            if method == "PUT":
+                connections[name].update(body)
+                return 200, {}
+            del connections[name]
+            return 200, {}
+
+    def _agentsMonitoringRules(self, method, groups, body, query):
+        state: MockMXState = self.server.state
+        (name,) = groups
+        with state.lock:
+            if name is None:
+                return (200, {"rules": [{"name": n} for n in state.amrs]}) if method == "GET" else (405, {})
+            if method == "GET":
+                return (200, state.amrs[name]) if name in state.amrs else (404, {})
+            if method == "POST":
+                if name in state.amrs:
+                    return 409, {"errors": [{"description": f"Rule {name} already exists"}]}
+                state.amrs[name] = dict(body, name=name)
+                return 200, {}
+            if name not in state.amrs:
+                return 404, {"errors": [{"description": f"Rule {name} does not exist"}]}
+            if method == "PUT":
+                state.amrs[name].update(body)
+                return 200, {}
+            del state.amrs[name]
+            return 200, {}
+
+    def _handle_mock(self, method: str, path: str) -> None:
+        state: MockMXState = self.server.state
+        if path.rstrip("/") == "/mock/stats" and method == "GET":
+            return self._send(200, state.stats(), count=False)
+        if path.rstrip("/") == "/mock/reset" and method == "POST":
+            state.reset()
+            return self._send(200, {}, count=False)
+        self._send(404, {}, count=False)
+
+    def _send(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None, cookies=(),
+              count: bool = True) -> None:
+        self._send_bytes(status, json.dumps(payload).encode(), headers, cookies, count)
+
+    def _send_bytes(self, status: int, body: bytes, headers: Optional[Dict[str, str]] = None, cookies=(),
+                    count: bool = True) -> None:
+        state: MockMXState = self.server.state
+        if status == 200 and self.command == "GET" and count:
+            etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+            headers = dict(headers or {}, ETag=etag)
+            if self.headers.get("If-None-Match") == etag:
+                status, body = 304, b""
+        if count:
+            with state.lock:
+                state.status_codes[str(status)] = state.status_codes.get(str(status), 0) + 1
+                state.bytes_sent += len(body)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        for cookie in cookies:
+            self.send_header("Set-Cookie", cookie)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MockMXServer(ThreadingHTTPServer):
+    """
+    A threaded mock MX.  serve_forever() it from a thread, or use start()/stop().
+    """
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, state: Optional[MockMXState] = None,
+                 tls: bool = True, certfile: Optional[str] = None, keyfile: Optional[str] = None,
+                 verbose: bool = False):
+        """
+        :param host: The address to listen on
+        :param port: The port to listen on, or 0 for any free port
+        :param state: The MockMXState, or None for the defaults
+        :param tls: Serve HTTPS.  Without certfile/keyfile a self-signed certificate is generated with openssl.
+        :param certfile: PEM certificate file
+        :param keyfile: PEM private key file
+        :param verbose: Log every request to stderr
+        """
+        super().__init__((host, port), MockMXHandler)
+        self.state = state or MockMXState()
+        self.verbose = verbose
+        self.tls = tls
+        self._thread: Optional[threading.Thread] = None
+        if tls:
+            if certfile is None:
+                certfile, keyfile = make_self_signed_cert(tempfile.mkdtemp(prefix="mock_mx."))
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(certfile, keyfile)
+            # The handshake is done by the handler thread on first read, not by the accepting thread.
+            self.socket = context.wrap_socket(self.socket, server_side=True, do_handshake_on_connect=False)
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def start(self) -> "MockMXServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="mock-mx", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def make_self_signed_cert(directory: str) -> Tuple[str, str]:
+    """
+    Generates a self-signed certificate for localhost with the openssl command line tool.
+
+    :param directory: The directory the cert.pem and key.pem files are written to
+    :return: (certfile, keyfile)
+    :raises RuntimeError: If openssl is not available or fails
+    """
+    certfile = os.path.join(directory, "cert.pem")
+    keyfile = os.path.join(directory, "key.pem")
+    try:
+        subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                        "-subj", "/CN=localhost", "-keyout", keyfile, "-out", certfile],
+                       check=True, capture_output=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise RuntimeError(f"Unable to generate a self-signed certificate with openssl: {e}. "
+                           f"Pass --certfile/--keyfile or use --http.")
+    return certfile, keyfile
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run a local mock of the SecureSphere MX API.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="port to listen on (0 for any free port)")
+    parser.add_argument("--http", action="store_true", help="serve plain HTTP instead of HTTPS")
+    parser.add_argument("--certfile", help="PEM certificate (default: a generated self-signed one)")
+    parser.add_argument("--keyfile", help="PEM private key")
+    parser.add_argument("--latency", type=float, default=0.0, help="service time added to every request, in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random +/- variation of the latency, in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with an error")
+    parser.add_argument("--error-status", type=int, default=503, help="status code of the injected errors")
+    parser.add_argument("--retry-after", type=float, help="Retry-After seconds sent with the injected errors")
+    parser.add_argument("--session-ttl", type=float, help="seconds after which a session expires (default: never)")
+    parser.add_argument("--audit-reports", type=int, default=DEFAULT_AUDIT_REPORTS,
+                        help="number of DB Audit report configurations served")
+    parser.add_argument("--no-collection-put", action="store_true",
+                        help="reject PUTs on the protectedIPs/servers collections, as an older MX would")
+    parser.add_argument("--serialize-sessions", action="store_true",
+                        help="serve the requests of each session one at a time, as a throttling MX would")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+    mock_state = MockMXState(args.latency, args.jitter, args.error_rate, args.error_status, args.retry_after,
+                             args.session_ttl, args.audit_reports, not args.no_collection_put, args.serialize_sessions)
+    server = MockMXServer(args.host, args.port, mock_state, not args.http, args.certfile, args.keyfile, args.verbose)
+    print(f"Mock MX listening on {'http' if args.http else 'https'}://{args.host}:{server.port}{API_PATH}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,321 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+import metrics
+import request_policy
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+logger = logging.getLogger(__name__)
+
+"""
+Description:
+This Python script provides the shared HTTP client used by every MX API call in this repository.
+
+All of the scripts used to call requests.post/put/get directly, which opens a new TCP connection and performs a full
+TLS handshake to the MX for every CSV row.  This module keeps one requests.Session per process with a tuned connection
+pool, so connections to the MX are kept alive and reused across calls.  The MX session cookie is set on the shared
+session once, after login, instead of being passed in the headers of every request.
+
+Every request goes through the MX host's request_policy.HostPolicy (rate limit, adaptive concurrency, retries with
+backoff and circuit breaker).  Set USE_REQUEST_POLICY = False to send requests directly.
+
+Usage:
+    import mx_client
+    mx_client.set_cookie(authorization_v2.get_cookie(response, debug))
+    response = mx_client.post(url, json=body, headers=headers)
+
+Developer note: This is code from my personal lab for my professional development. This should be considered example
+code only.
+
+Revision History:
+-----------------
+2026-10-17:
+    Initial creation of the script.
+2026-10-17:
+    Requests are sent through request_policy.
+2026-10-17:
+    verify is passed with every request, so a CA bundle set in the environment does not re-enable certificate checks.
+2026-10-17:
+    Every request attempt is recorded in metrics and logged at DEBUG level; the DEBUG flag is replaced by the log level.
+2026-10-18:
+    Requests to an MX with a session pool (set_session_pool_factory()) are sent with the cookie of one of its sessions.
+    The pool is built outside the global lock, and a pool that failed to start is tried again after SESSION_POOL_RETRY.
+2026-10-18:
+    request_policy is told whether the method is idempotent, so a POST that may have been applied is not sent again.
+"""
+
+# Global variables
+# Number of distinct MX hosts to keep a connection pool for.
+POOL_CONNECTIONS = 10
+# Number of keep-alive connections kept open per MX host.  Should be >= the number of worker threads.
+POOL_MAXSIZE = 32
+# Block (instead of opening throw-away connections) when every pooled connection to a host is in use.
+POOL_BLOCK = True
+# The MX ships with a self-signed certificate.
+VERIFY_SSL = False
+# (connect, read) timeouts in seconds.
+TIMEOUT = (10, 120)
+USE_REQUEST_POLICY = True
+# Seconds before the pool of an MX is built again after the factory failed (returned None or raised).
+SESSION_POOL_RETRY = 60.0
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+# Re-login callbacks keyed by MX host (None is the fallback for every host).  See register_reauth().
+_reauth_handlers: Dict[Optional[str], Callable[[Optional[str]], Optional[str]]] = {}
+# Callbacks notified of every write request.  See add_write_listener().
+_write_listeners: List[Callable[[str, str, int], None]] = []
+# Builds the session pool of an MX, and the pools built or being built so far, as futures of the pool (None for an MX
+# without one) with the time until which the result stands.  See set_session_pool_factory().
+_session_pool_factory: Optional[Callable[[str, Optional[int]], Any]] = None
+_session_pools: Dict[Tuple[str, Optional[int]], Tuple[Future, float]] = {}
+_session_pools_lock = threading.Lock()
+
+
+def _build_session() -> requests.Session:
+    """
+    Builds a requests.Session with a keep-alive connection pool mounted for http and https.
+
+    :return: A new, configured session
+    :rtype: <class 'requests.sessions.Session'>
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, pool_block=POOL_BLOCK)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.verify = VERIFY_SSL
+    session.headers.update({"Content-Type": "application/json", "Connection": "keep-alive"})
+    return session
+
+
+def get_session() -> requests.Session:
+    """
+    Returns the process-wide shared session, creating it on first use.
+
+    :return: The shared session
+    :rtype: <class 'requests.sessions.Session'>
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def ensure_pool_size(maxsize: int) -> None:
+    """
+    Grows the per-host connection pool so that maxsize worker threads never wait for a connection.
+
+    :param maxsize: (int) The number of concurrent requests per MX host
+    :return: None
+    """
+    global POOL_MAXSIZE
+    with _session_lock:
+        if maxsize <= POOL_MAXSIZE:
+            return
+        POOL_MAXSIZE = maxsize
+        if _session is not None:
+            adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, pool_block=POOL_BLOCK)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+
+
+def set_cookie(cookie: str, host: Optional[str] = None) -> None:
+    """
+    Sets the MX session cookies on the shared session once, so they are sent with every following request.
+
+    :param cookie: (str) The cookie string returned by authorization_v2.get_cookie(),
+                   e.g. "JSESSIONID=...; SSOSESSIONID=..."
+    :param host: (str) Optional MX host the cookies belong to.  When omitted the cookies are sent to every host.
+    :return: None
+    """
+    session = get_session()
+    for name, value in parse_cookie(cookie).items():
+        session.cookies.set(name, value, domain=host or "")
+
+
+def parse_cookie(cookie: str) -> Dict[str, str]:
+    """
+    Splits a "name=value; name=value" cookie string into a dictionary.
+
+    :param cookie: (str) The cookie string
+    :return: (dict) The cookie names and values
+    """
+    cookies = {}
+    for part in cookie.split(";"):
+        name, sep, value = part.strip().partition("=")
+        if sep and name:
+            cookies[name] = value
+    return cookies
+
+
+def register_reauth(handler: Callable[[Optional[str]], Optional[str]], host: Optional[str] = None) -> None:
+    """
+    Registers a callback used to log in again when the MX answers 401 (expired JSESSIONID/SSOSESSIONID).
+
+    The callback receives the Cookie header the rejected request was sent with and returns the new cookie string,
+    or None if the login failed.  authorization_v2.MXSessionManager registers itself here.
+
+    :param handler: The re-login callback
+    :param host: (str) The MX host the callback applies to.  When omitted it applies to every host.
+    :return: None
+    """
+    _reauth_handlers[host] = handler
+
+
+def add_write_listener(listener: Callable[[str, str, int], None]) -> None:
+    """
+    Registers a callback notified after every POST/PUT/DELETE request, e.g. to invalidate cached configuration.
+
+    :param listener: Callback receiving the method, the URL and the response status code
+    :return: None
+    """
+    _write_listeners.append(listener)
+
+
+def set_session_pool_factory(factory: Optional[Callable[[str, Optional[int]], Any]]) -> None:
+    """
+    Registers the function building the session pool of an MX, called with its host and port on the first request to
+    it.  It returns the pool, or None to use the MX's single session.  A pool has a send(attempt) method, which picks
+    one of its sessions and returns attempt(cookie); the request is sent with that cookie.  See session_pool.
+
+    :param factory: The pool factory, or None to stop pooling
+    :return: None
+    """
+    global _session_pool_factory
+    with _session_pools_lock:
+        _session_pool_factory = factory
+        _session_pools.clear()
+
+
+def _session_pool(host: str, port: Optional[int]) -> Any:
+    factory = _session_pool_factory
+    if factory is None:
+        return None
+    key = (host, port)
+    # The pool is built outside the lock: starting it logs in every session, and requests to the other MXs (or to this
+    # MX, once it is built) must not wait for that.  Concurrent first requests to the MX share one future.
+    with _session_pools_lock:
+        entry = _session_pools.get(key)
+        building = entry is None or time.monotonic() >= entry[1]
+        if building:
+            entry = _session_pools[key] = (Future(), float("inf"))
+    future = entry[0]
+    if building:
+        try:
+            pool = factory(host, port)
+        except Exception as e:
+            logger.error("Unable to start the session pool of %s:%s: %s", host, port, e)
+            pool = None
+        if pool is None:
+            # Use the single session for now, and try again later instead of for the rest of the process.
+            with _session_pools_lock:
+                if _session_pools.get(key) is entry:
+                    _session_pools[key] = (future, time.monotonic() + SESSION_POOL_RETRY)
+        future.set_result(pool)
+    return future.result()
+
+
+def close() -> None:
+    """
+    Closes the shared session and all of its pooled connections.
+
+    :return: None
+    """
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def request(method: str, url: str, reauth: bool = True, **kwargs) -> requests.Response:
+    """
+    Sends a request over the shared, pooled session.
+
+    :param method: (str) The HTTP method
+    :param url: (str) The full MX API URL
+    :param reauth: (bool) Log in again and retry once if the MX answers 401.  Disabled for the login call itself.
+    :param kwargs: Any other keyword arguments accepted by requests.Session.request()
+    :return: The response
+    :rtype: <class 'requests.models.Response'>
+    """
+    kwargs.setdefault("timeout", TIMEOUT)
+    # Passed per request: requests lets REQUESTS_CA_BUNDLE/CURL_CA_BUNDLE override session.verify = False.
+    kwargs.setdefault("verify", VERIFY_SSL)
+    split = urlsplit(url)
+    host = split.hostname
+    headers = kwargs.get("headers") or {}
+    # The login and keepalive calls carry their own cookie (or none), and never go through a pool.
+    pool = _session_pool(host, split.port) if reauth and "Cookie" not in headers else None
+    if pool is not None:
+        response = pool.send(lambda cookie: _send(host, method, url, dict(kwargs, headers=dict(headers, Cookie=cookie))))
+    else:
+        response = _send(host, method, url, kwargs)
+    if response.status_code == 401 and reauth and pool is None:
+        handler = _reauth_handlers.get(host) or _reauth_handlers.get(None)
+        if handler is not None and handler(response.request.headers.get("Cookie")) is not None:
+            logger.debug("%s %s: logged in again after 401", method, url)
+            response = _send(host, method, url, kwargs)
+    if method.upper() != "GET":
+        for listener in _write_listeners:
+            listener(method, url, response.status_code)
+    return response
+
+
+def _send(host: str, method: str, url: str, kwargs: dict) -> requests.Response:
+    if not USE_REQUEST_POLICY:
+        return _attempt(method, url, kwargs)
+    return request_policy.get_policy(host).send(lambda: _attempt(method, url, kwargs),
+                                                method.upper() in request_policy.IDEMPOTENT_METHODS)
+
+
+def _attempt(method: str, url: str, kwargs: dict) -> requests.Response:
+    """
+    Sends a request once, recording it in metrics and at DEBUG level.
+    """
+    start = time.perf_counter()
+    try:
+        response = get_session().request(method, url, **kwargs)
+    except requests.RequestException as e:
+        latency = time.perf_counter() - start
+        metrics.record_request(method, url, None, latency)
+        logger.debug("%s %s -> %s after %.3fs", method, url, type(e).__name__,
+                     extra={"method": method, "url": url, "latency": latency})
+        raise
+    latency = time.perf_counter() - start
+    if kwargs.get("stream"):
+        # The body has not been read yet; count what the MX announced.
+        received = int(response.headers.get("Content-Length") or 0)
+    else:
+        received = len(response.content)
+    body = response.request.body
+    metrics.record_request(method, url, response.status_code, latency, len(body) if body else 0, received)
+    logger.debug("%s %s -> %d in %.3fs", method, url, response.status_code, latency,
+                 extra={"method": method, "url": url, "status_code": response.status_code, "latency": latency})
+    return response
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+def put(url: str, **kwargs) -> requests.Response:
+    return request("PUT", url, **kwargs)
+
+
+def delete(url: str, **kwargs) -> requests.Response:
+    return request("DELETE", url, **kwargs)
@@ -0,0 +1,476 @@
+import argparse
+import itertools
+import json
+import logging
+import os
+import queue
+import signal
+import socketserver
+import sys
+import threading
+import time
+from typing import IO, Any, Callable, Dict, Hashable, Iterator, NamedTuple, Optional, Set, Tuple
+
+import authorization_v2
+import bulk_executor
+import config_cache
+import get_amr
+import metrics
+import mx_logging
+import preflight
+import provision_pipeline
+
+"""
+Description:
+This Python script runs the MX API calls of this repository as a long-running worker, fed by a stream of NDJSON jobs.
+
+Every one-off change used to start a new process, log in to the MX and open a cold connection.  The daemon keeps one
+warm session per MX (authorization_v2 session managers with their keepalive thread) and the pooled connections of
+mx_client for as long as it runs, and takes jobs from one of three sources:
+    stdin           one job per line; the results are written to stdout
+    --socket PATH   a local Unix socket; each connection sends jobs and reads back the results of its own jobs
+    --tail FILE     a .jsonl file that is followed like tail -f; the results are written to stdout (or --results)
+A job is a JSON object with its operation, an optional id echoed in its result, and the columns the operation needs,
+named as in the CSV files:
+    {"id": "CHG-1", "op": "protected_ip", "MX-IP": "10.0.0.1", "MX-port": "8083", "site": "Default Site", ...}
+The operations (OPERATIONS) are the stages of provision_pipeline, which call the same functions as the CSV scripts:
+    protected_ip    create a protected IP             (create_protected__ip_list_v2.py)
+    server_os       update a server group IP's OS     (update_os_connection__ip_list_v2.py)
+    db_connection   create a db connection            (create_db_connection_v2.py)
+    amr             get an agent monitoring rule      (get_amr.py), with the column rule_name
+Every job gets one result line, as soon as it completes:
+    {"id": "CHG-1", "op": "protected_ip", "ok": true, "status_code": 200, "message": "", "elapsed_ms": 41.2}
+An amr result also carries the rule, in "result".  A line that is not a valid job is answered at once, with ok false.
+
+Jobs run concurrently, --concurrency at a time, through bulk_executor.run_numbered(); jobs on the same server group
+(and lookups of the same rule) run one after the other in arrival order, so an OS update sent after the create of its
+protected IP waits for it.  The first job for an MX logs in to it; when the login fails, the jobs for that MX fail
+without being sent for LOGIN_RETRY_INTERVAL seconds, and the next job after that tries again.  On SIGTERM or
+SIGINT (and at the end of stdin) the daemon stops taking jobs, finishes the ones it has and exits.
+
+Usage:
+$ python mx_daemon.py < jobs.jsonl > results.jsonl
+$ python mx_daemon.py --socket /run/mx_daemon.sock
+$ python mx_daemon.py --tail /var/spool/changes.jsonl --results results.jsonl
+
+Developer note: This is code from my personal lab for my professional development. This should be considered example
+code only.
+
+Revision History:
+-----------------
+2026-10-18:
+    Initial creation of the script.
+"""
+
+logger = logging.getLogger(__name__)
+
+# Global variables
+BASIC_AUTHORIZATION = 'Basic YWR'
+# Seconds the jobs for an MX fail fast after a failed login, before the next job tries to log in again.
+LOGIN_RETRY_INTERVAL = 30.0
+# Seconds between checks of a tailed file for new lines.
+TAIL_INTERVAL = 0.5
+# Jobs queued ahead of the workers, per worker.
+QUEUE_DEPTH_PER_WORKER = 2
+# Marks the end of the jobs.
+_END_OF_JOBS = object()
+
+
+class Operation(NamedTuple):
+    """
+    A job type: the columns it needs and the call it makes.  send returns the response of the API call.
+    """
+    name: str
+    columns: Tuple[str, ...]
+    send: Callable[[Dict[str, Any], Dict[str, str]], Any]
+
+
+def _get_amr(job: Dict[str, Any], headers: Dict[str, str]):
+    return config_cache.get(get_amr.rule_url(job['rule_name'], job['MX-IP'], job['MX-port']), headers=headers)
+
+
+OPERATIONS: Dict[str, Operation] = {stage.name: Operation(stage.name, stage.csv_columns, stage.send)
+                                    for stage in provision_pipeline.STAGES}
+OPERATIONS["amr"] = Operation("amr", ('MX-IP', 'MX-port', 'rule_name'), _get_amr)
+
+
+def order_key(job: Dict[str, Any]) -> Hashable:
+    """
+    Order key that serializes the jobs on the same server group, and the lookups of the same rule.
+
+    :param job: A job
+    :return: The key
+    """
+    if job['op'] == "amr":
+        return bulk_executor.mx_key(job) + ("amr", job['rule_name'])
+    return bulk_executor.server_group_key(job)
+
+
+def parse_job(line: str) -> Dict[str, Any]:
+    """
+    Parses and checks one NDJSON job.
+
+    :param line: The line
+    :return: The job, with the optional columns it does not set filled with None
+    :raises ValueError: If the line is not a valid job
+    """
+    job = json.loads(line)
+    if not isinstance(job, dict):
+        raise ValueError("a job must be a JSON object")
+    operation = OPERATIONS.get(job.get('op'))
+    if operation is None:
+        raise ValueError(f"unknown op {job.get('op')!r}; expected one of {', '.join(OPERATIONS)}")
+    missing = [column for column in operation.columns
+               if job.get(column) in (None, "") and column not in preflight.OPTIONAL_COLUMNS]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    for column in operation.columns:
+        job.setdefault(column, None)
+    return job
+
+
+class Client:
+    """
+    Where the results of one source's jobs go: a stream written one line at a time, and the number of its jobs still
+    running, so the source can wait for them before it closes.
+    """
+
+    def __init__(self, stream: IO[str]):
+        self.stream = stream
+        self.pending = 0
+        self._lock = threading.Lock()
+        self._done = threading.Condition(self._lock)
+
+    def submitted(self) -> None:
+        with self._lock:
+            self.pending += 1
+
+    def reply(self, result: Dict[str, Any], job_done: bool = True) -> None:
+        line = json.dumps(result, ensure_ascii=False) + "\n"
+        with self._lock:
+            try:
+                self.stream.write(line)
+                self.stream.flush()
+            except (OSError, ValueError) as e:
+                # The client went away; its remaining jobs still run.
+                logger.warning("Unable to send the result of job %s: %s", result.get("id"), e)
+            if job_done:
+                self.pending -= 1
+                self._done.notify_all()
+
+    def wait(self) -> None:
+        with self._lock:
+            while self.pending:
+                self._done.wait()
+
+
+class Daemon:
+    """
+    Runs the jobs submitted by any number of sources on one pool of workers, with one warm session per MX.
+    """
+
+    def __init__(self, headers: Dict[str, str], concurrency: int = bulk_executor.DEFAULT_CONCURRENCY,
+                 debug: bool = False):
+        """
+        :param headers: The headers of the API calls
+        :param concurrency: The maximum number of jobs in flight at once
+        :param debug: Whether to enable debug mode or not.
+        """
+        self.headers = headers
+        self.concurrency = max(1, int(concurrency))
+        self.debug = debug
+        self._jobs: queue.Queue = queue.Queue(maxsize=self.concurrency * QUEUE_DEPTH_PER_WORKER)
+        self._numbers = itertools.count(1)
+        # Job number -> (Client, job) until the job's result is sent
+        self._clients: Dict[int, Tuple[Client, Dict[str, Any]]] = {}
+        # Job number -> the result data of an amr job
+        self._outputs: Dict[int, Any] = {}
+        self._lock = threading.Lock()
+        # (MX-IP, MX-port) -> time of the last failed login
+        self._login_failed: Dict[Tuple[str, str], float] = {}
+        self._managers: Dict[Tuple[str, str], authorization_v2.MXSessionManager] = {}
+        # The MXs whose keepalive thread runs
+        self._kept_alive: Set[Tuple[str, str]] = set()
+        self._login_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closing = False
+
+    def start(self) -> None:
+        """
+        Starts the workers.
+
+        :return: None
+        """
+        self._thread = threading.Thread(target=self._run, name="mx-daemon", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        """
+        Stops taking jobs, waits for the submitted ones and stops the session keepalives.
+
+        :return: None
+        """
+        with self._lock:
+            self._closing = True
+        if self._thread is not None:
+            self._jobs.put(_END_OF_JOBS)
+            self._thread.join()
+            self._thread = None
+        for manager in self._managers.values():
+            manager.stop_keepalive()
+
+    def submit(self, line: str, client: Client) -> None:
+        """
+        Queues one NDJSON job; its result is sent to the client when it completes.  Blocks while the queue is full.
+
+        :param line: The line
+        :param client: Where the result goes
+        :return: None
+        """
+        if not line.strip():
+            return
+        try:
+            job = parse_job(line)
+        except ValueError as e:
+            self._refuse(line, client, f"invalid job: {e}")
+            return
+        number = next(self._numbers)
+        with self._lock:
+            if self._closing:
+                job = None
+            else:
+                client.submitted()
+                self._clients[number] = (client, job)
+        if job is None:
+            self._refuse(line, client, "the daemon is stopping")
+            return
+        self._jobs.put((number, job))
+
+    @staticmethod
+    def _refuse(line: str, client: Client, message: str) -> None:
+        job_id, op = None, None
+        try:
+            job = json.loads(line)
+            job_id, op = job.get("id"), job.get("op")
+        except (ValueError, AttributeError):
+            pass
+        client.reply({"id": job_id, "op": op, "ok": False, "status_code": None, "message": message,
+                      "elapsed_ms": 0.0}, job_done=False)
+
+    def _numbered_jobs(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        while True:
+            item = self._jobs.get()
+            if item is _END_OF_JOBS:
+                return
+            yield item
+
+    def _run(self) -> None:
+        bulk_executor.run_numbered(self._numbered_jobs(), self._run_job, self.concurrency, order_key,
+                                   self._on_result, keep_results=False)
+
+    def _logged_in(self, key: Tuple[str, str]) -> Optional[str]:
+        """
+        Makes sure the daemon has a session on an MX.
+
+        :return: None, or why the job can't be sent
+        """
+        with self._login_lock:
+            failed_at = self._login_failed.get(key)
+            if failed_at is not None and time.monotonic() - failed_at < LOGIN_RETRY_INTERVAL:
+                return f"Login to MX {key[0]}:{key[1]} failed"
+            manager = self._managers.get(key)
+            if manager is None:
+                manager = authorization_v2.get_session_manager(*key, basic_authorization=BASIC_AUTHORIZATION,
+                                                               debug=self.debug)
+                self._managers[key] = manager
+        # The manager serializes its own logins, and answers from memory while its session is valid.
+        try:
+            cookie = manager.get_cookie()
+            reason = str(manager.status_code)
+        except Exception as e:
+            cookie, reason = None, f"{type(e).__name__}: {e}"
+        if cookie is None:
+            with self._login_lock:
+                self._login_failed[key] = time.monotonic()
+            return f"Login to MX {key[0]}:{key[1]} failed ({reason})"
+        with self._login_lock:
+            self._login_failed.pop(key, None)
+            if key not in self._kept_alive:
+                logger.info("Logged in to MX %s:%s", *key, extra={"mx": f"{key[0]}:{key[1]}"})
+                manager.start_keepalive()
+                self._kept_alive.add(key)
+        return None
+
+    def _run_job(self, number: int, job: Dict[str, Any]):
+        error = self._logged_in(bulk_executor.mx_key(job))
+        if error is not None:
+            return error
+        response = OPERATIONS[job['op']].send(job, self.headers)
+        if job['op'] == "amr" and response.status_code == 200:
+            with self._lock:
+                self._outputs[number] = response.json()
+        return response
+
+    def _on_result(self, job: Dict[str, Any], result: bulk_executor.RowResult) -> None:
+        with self._lock:
+            client, _ = self._clients.pop(result.rownum)
+            output = self._outputs.pop(result.rownum, None)
+        line = {"id": job.get("id"), "op": job['op'], "ok": result.ok, "status_code": result.status_code,
+                "message": result.message.strip(), "elapsed_ms": round(result.elapsed * 1000, 1)}
+        if output is not None:
+            line["result"] = output
+        logger.debug("Job %s (%s) done: %s", job.get("id"), job['op'], "ok" if result.ok else "failed",
+                     extra={"job_id": job.get("id"), "op": job['op'], "status_code": result.status_code})
+        client.reply(line)
+
+
+def serve_stream(daemon: Daemon, jobs: IO[str], results: IO[str]) -> None:
+    """
+    Runs the jobs of a stream until it ends, and waits for their results.
+
+    :param daemon: The started Daemon
+    :param jobs: The stream the jobs are read from, one per line
+    :param results: The stream the results are written to
+    :return: None
+    """
+    client = Client(results)
+    for line in jobs:
+        daemon.submit(line, client)
+    client.wait()
+
+
+def iter_tail(path: str, from_start: bool = False, interval: float = TAIL_INTERVAL,
+              stop: Optional[threading.Event] = None) -> Iterator[str]:
+    """
+    Follows a file like tail -f, yielding each complete line as it is appended.  A truncated or replaced (rotated)
+    file is read again from its start.
+
+    :param path: The file
+    :param from_start: Read the lines already in the file first, instead of only the new ones
+    :param interval: Seconds between checks for new lines
+    :param stop: Optional Event that ends the iteration
+    :return: An iterator of lines
+    """
+    stop = stop or threading.Event()
+    while not os.path.exists(path):
+        if stop.wait(interval):
+            return
+    f = open(path, encoding="utf-8")
+    try:
+        if not from_start:
+            f.seek(0, os.SEEK_END)
+        partial = ""
+        while not stop.is_set():
+            line = f.readline()
+            if line:
+                if line.endswith("\n"):
+                    yield partial + line
+                    partial = ""
+                else:
+                    # The writer is half way through the line.
+                    partial += line
+                continue
+            try:
+                replaced = os.stat(path).st_ino != os.fstat(f.fileno()).st_ino
+                truncated = os.stat(path).st_size < f.tell()
+            except FileNotFoundError:
+                replaced, truncated = False, False
+            if replaced or truncated:
+                logger.info("%s was %s; reading it from the start", path, "replaced" if replaced else "truncated")
+                f.close()
+                f = open(path, encoding="utf-8")
+                partial = ""
+                continue
+            stop.wait(interval)
+    finally:
+        f.close()
+
+
+class _TextWriter:
+    """
+    Lets a Client write its text lines to a socket's binary stream.
+    """
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def write(self, text: str) -> None:
+        self.wfile.write(text.encode("utf-8"))
+
+    def flush(self) -> None:
+        self.wfile.flush()
+
+
+class _JobHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        client = Client(_TextWriter(self.wfile))
+        for line in self.rfile:
+            self.server.mx_daemon.submit(line.decode("utf-8", errors="replace"), client)
+        client.wait()
+
+
+class JobServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    A Unix socket server feeding a Daemon.  Each connection sends NDJSON jobs and reads back their results.
+    """
+    daemon_threads = True
+
+    def __init__(self, path: str, mx_daemon: Daemon):
+        if os.path.exists(path):
+            os.unlink(path)
+        self.mx_daemon = mx_daemon
+        super().__init__(path, _JobHandler)
+        # Only the user running the daemon may send it jobs.
+        os.chmod(path, 0o600)
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+
+def _terminate(signum, frame):
+    raise KeyboardInterrupt
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run MX API jobs read as NDJSON from stdin, a Unix socket or a "
+                                                 "followed file, with warm sessions to every MX.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--socket", metavar="PATH", help="take jobs on this Unix socket instead of stdin")
+    source.add_argument("--tail", metavar="FILE", help="follow this .jsonl file for jobs instead of reading stdin")
+    parser.add_argument("--from-start", action="store_true",
+                        help="with --tail, also run the jobs already in the file")
+    parser.add_argument("--results", metavar="FILE", help="append the results to FILE instead of writing to stdout")
+    parser.add_argument("--concurrency", type=int, default=bulk_executor.DEFAULT_CONCURRENCY,
+                        help="jobs sent at the same time")
+    mx_logging.add_arguments(parser)
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    # stdout carries the results: the log, and anything the API functions print, go to stderr.
+    results_stream = open(args.results, "a", encoding="utf-8") if args.results else sys.stdout
+    sys.stdout = sys.stderr
+    mx_logging.configure(args.log_level, args.log_format, stream=sys.stderr)
+    metrics.write_at_exit(args.metrics_json, args.metrics_prom)
+    signal.signal(signal.SIGTERM, _terminate)
+    headers: Dict[str, str] = {"Content-Type": "application/json", "Authorization": BASIC_AUTHORIZATION}
+    daemon = Daemon(headers, args.concurrency)
+    daemon.start()
+    try:
+        if args.socket:
+            with JobServer(args.socket, daemon) as server:
+                logger.info("Taking jobs on %s", args.socket)
+                server.serve_forever()
+        elif args.tail:
+            logger.info("Following %s for jobs", args.tail)
+            serve_stream(daemon, iter_tail(args.tail, args.from_start), results_stream)
+        else:
+            serve_stream(daemon, sys.stdin, results_stream)
+    except KeyboardInterrupt:
+        logger.info("Stopping: finishing the jobs already taken")
+    finally:
+        daemon.close()
+        if results_stream is not sys.__stdout__:
+            results_stream.close()
@@ -0,0 +1,313 @@
+import argparse
+from typing import Any, Dict, FrozenSet, Iterator, List, NamedTuple, Sequence, Tuple
+
+import lazy_imports
+
+# pandas and numpy are only imported when a check runs; see lazy_imports.
+np = lazy_imports.lazy_module("numpy", "the pre-flight check")
+pd = lazy_imports.lazy_module("pandas", "the pre-flight check")
+
+"""
+Description:
+This Python script provides the pre-flight check of the input CSV file, run before anything is sent to the MX.
+
+A bad row used to be found only when the MX rejected it, one failed API call per row, and a duplicate row (the sample
+input.csv has 192.168.1.24 on both SQL-124 and SQL-125) cost a failing create.  check() validates the whole file at
+once with pandas column operations instead of a per-row loop, so a million-row file is checked in seconds:
+- every column an operation needs is present and not empty (OPTIONAL_COLUMNS may be empty);
+- IP addresses (IP_COLUMNS), MX hosts (HOST_COLUMNS) and ports (PORT_COLUMNS) are well formed;
+- for each operation, rows with the same key (its journal key columns, e.g. MX, site, server group and IP address) are
+  either exact duplicates, of which only the first is kept, or conflicting (the same IP with a different OS-type, or
+  the same connection name of a db service with a different IP), in which case none of them is sent.
+The result is a Plan: the clean, deduplicated rows for the executor, the issues found (with their file line numbers),
+and the row count of every MX/site/server group.
+
+Usage:
+    plan = preflight.run("input.csv", [preflight.Operation("protected_ip", csv_columns, journal_key_columns)])
+    preflight.print_report(plan)
+    results = bulk_executor.run_per_mx(plan.records(), task)
+
+Developer note: This is code from my personal lab for my professional development. This should be considered example
+code only.
+
+Revision History:
+-----------------
+2026-10-17:
+    Initial creation of the script.
+2026-10-18:
+    pandas and numpy are imported lazily, on the first check.
+"""
+
+# Global variables
+# Columns that may be left empty.
+OPTIONAL_COLUMNS = frozenset({'comment', 'named-instance', 'domain-name'})
+# Columns holding the IP address of a database server.
+IP_COLUMNS = ('ip-address',)
+# Columns holding the IP address or host name of an MX.
+HOST_COLUMNS = ('MX-IP',)
+# Columns holding a TCP port.  They are handed to the executor as int, as csv_reader does.
+PORT_COLUMNS = ('MX-port', 'port')
+# The columns rows are grouped by in the plan summary.
+GROUP_COLUMNS = ('MX-IP', 'MX-port', 'site', 'server_group_name')
+# Rows converted to dictionaries at a time by Plan.records().
+RECORDS_CHUNK_SIZE = 10000
+
+_OCTET = r"(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)"
+_IPV4 = rf"{_OCTET}(?:\.{_OCTET}){{3}}"
+_IPV6 = r"[0-9A-Fa-f]{0,4}(?::[0-9A-Fa-f]{0,4}){2,7}"
+_HOST_NAME = r"(?=.{1,253}$)[A-Za-z0-9](?:[A-Za-z0-9-]{0,61}[A-Za-z0-9])?(?:\.[A-Za-z0-9](?:[A-Za-z0-9-]{0,61}[A-Za-z0-9])?)*"
+# The line of the file a row was read from; the header is line 1.
+LINE = 'line'
+
+
+class Operation(NamedTuple):
+    """
+    The columns one API operation uses, and the columns that identify its object (its journal key).
+    """
+    name: str
+    csv_columns: Sequence[str]
+    key_columns: Sequence[str]
+
+
+class Plan(NamedTuple):
+    """
+    The outcome of check().
+
+    rows: the rows to send, in file order, with their LINE
+    issues: one row per problem found (LINE, severity "error" or "duplicate", column, problem, value)
+    groups: the number of rows to send per GROUP_COLUMNS
+    duplicate_stages: for rows sent for some operations only, the names of the operations another row already sends,
+                      keyed by the row's 1-based position in rows (its rownum in bulk_executor)
+    read: the number of rows in the file
+    """
+    rows: "pd.DataFrame"
+    issues: "pd.DataFrame"
+    groups: "pd.DataFrame"
+    duplicate_stages: Dict[int, FrozenSet[str]]
+    read: int
+
+    @property
+    def ok(self) -> bool:
+        return not (self.issues['severity'] == 'error').any()
+
+    def records(self) -> Iterator[Dict[str, Any]]:
+        """
+        The rows to send as dictionaries, typed like csv_reader.iter_rows(): ports are int and empty cells are None.
+
+        :return: An iterator of dictionaries, one per row
+        """
+        columns = [c for c in self.rows.columns if c != LINE]
+        for start in range(0, len(self.rows), RECORDS_CHUNK_SIZE):
+            chunk = self.rows.iloc[start:start + RECORDS_CHUNK_SIZE]
+            converted = {}
+            for column in columns:
+                values = chunk[column].astype(object)
+                values = values.where(values != '', None)
+                if column in PORT_COLUMNS:
+                    numbers = pd.to_numeric(chunk[column], errors='coerce')
+                    valid = numbers.notna()
+                    values[valid] = numbers[valid].astype('int64').astype(object)
+                converted[column] = values.tolist()
+            for values in zip(*(converted[c] for c in columns)):
+                yield dict(zip(columns, values))
+
+
+def load(filename: str, columns: Sequence[str]) -> "pd.DataFrame":
+    """
+    Reads the columns of a CSV file as text, with the file line number of each row in LINE.
+
+    :param filename: The CSV file to read.  The first line must be the header.
+    :param columns: The columns to keep
+    :return: A DataFrame of strings; empty cells are ""
+    :raises ValueError: If a column is not in the file
+    """
+    header = pd.read_csv(filename, nrows=0, encoding='utf-8-sig').columns
+    missing = [c for c in columns if c not in header]
+    if missing:
+        raise ValueError(f"{filename} is missing the column(s): {', '.join(missing)}")
+    frame = pd.read_csv(filename, usecols=list(columns), dtype=str, keep_default_na=False, na_filter=False,
+                        skip_blank_lines=True, encoding='utf-8-sig')
+    frame = frame[list(columns)]
+    frame.insert(0, LINE, np.arange(2, len(frame) + 2))
+    return frame
+
+
+def _factorize(frame: "pd.DataFrame", column: str) -> Tuple["np.ndarray", "pd.Index"]:
+    codes, uniques = pd.factorize(frame[column])
+    return codes, pd.Index(uniques, dtype=object)
+
+
+def _group_ids(code_arrays: Sequence["np.ndarray"]) -> "np.ndarray":
+    """
+    Numbers the distinct combinations of several factorized columns: rows get the same id when all their codes match.
+    """
+    ids = code_arrays[0]
+    for codes in code_arrays[1:]:
+        ids = pd.factorize(ids.astype(np.int64) * (int(codes.max(initial=0)) + 1) + codes)[0]
+    return ids
+
+
+def _first_of_group(ids: "np.ndarray") -> "np.ndarray":
+    """
+    For each row, the position of the first row with the same group id.
+    """
+    _, first, inverse = np.unique(ids, return_index=True, return_inverse=True)
+    return first[inverse]
+
+
+def check(frame: "pd.DataFrame", operations: Sequence[Operation]) -> Plan:
+    """
+    Validates and deduplicates the rows for one or more operations.
+
+    A row with an invalid or missing value, or a key that conflicts with another row's for any operation, is not sent.
+    A row that only repeats an earlier row for every operation is dropped.  A row that repeats an earlier row for some
+    operations only (e.g. a second db connection on the same protected IP) is sent, and those operations are listed in
+    Plan.duplicate_stages.
+
+    Each column is factorized once, so the text checks run on its distinct values only, and the duplicate and conflict
+    checks compare integer codes.
+
+    :param frame: The DataFrame returned by load()
+    :param operations: The operations the rows are sent for, e.g. the stages of provision_pipeline
+    :return: The Plan
+    """
+    issues: List["pd.DataFrame"] = []
+    columns = list(dict.fromkeys(c for operation in operations for c in operation.csv_columns))
+    factorized = {column: _factorize(frame, column) for column in columns}
+    rejected = np.zeros(len(frame), dtype=bool)
+
+    def add_issues(mask, severity, column, problem):
+        if mask.any():
+            issues.append(pd.DataFrame({LINE: frame[LINE].to_numpy()[mask], 'severity': severity, 'column': column,
+                                        'problem': problem if isinstance(problem, str) else problem[mask],
+                                        'value': frame[column].to_numpy()[mask]}))
+
+    def per_value(column, test):
+        # Runs test on the distinct values of the column and maps the result back to the rows.
+        codes, uniques = factorized[column]
+        return test(uniques.to_series(index=range(len(uniques)))).to_numpy(dtype=bool)[codes]
+
+    def is_blank(values):
+        return values.str.strip() == ''
+
+    for column in columns:
+        if column not in OPTIONAL_COLUMNS:
+            blank = per_value(column, is_blank)
+            add_issues(blank, 'error', column, 'missing value')
+            rejected |= blank
+    for column_list, pattern, problem in ((IP_COLUMNS, f"{_IPV4}|{_IPV6}", 'invalid IP address'),
+                                          (HOST_COLUMNS, f"{_IPV4}|{_IPV6}|{_HOST_NAME}", 'invalid host')):
+        for column in (c for c in column_list if c in factorized):
+            invalid = ~per_value(column, lambda values: is_blank(values) | values.str.fullmatch(pattern))
+            add_issues(invalid, 'error', column, problem)
+            rejected |= invalid
+    for column in (c for c in PORT_COLUMNS if c in factorized):
+        def is_port(values):
+            numbers = pd.to_numeric(values.str.strip(), errors='coerce')
+            return is_blank(values) | (numbers.between(1, 65535) & (numbers % 1 == 0))
+        invalid = ~per_value(column, is_port)
+        add_issues(invalid, 'error', column, 'invalid port')
+        rejected |= invalid
+
+    # Duplicates and conflicts are looked for among the rows that are valid so far.
+    valid = np.flatnonzero(~rejected)
+    duplicate = np.zeros((len(valid), len(operations)), dtype=bool)
+    for i, operation in enumerate(operations):
+        ids = _group_ids([factorized[c][0][valid] for c in operation.key_columns])
+        first = _first_of_group(ids)
+        values = [c for c in operation.csv_columns if c not in operation.key_columns]
+        # differs[:, j]: some row of the group has another value in column values[j] than the group's first row
+        differs = np.zeros((len(valid), len(values)), dtype=bool)
+        for j, column in enumerate(values):
+            codes = factorized[column][0][valid]
+            group_differs = np.bincount(ids, weights=codes != codes[first], minlength=ids.max(initial=-1) + 1) > 0
+            differs[:, j] = group_differs[ids]
+        conflicting = differs.any(axis=1)
+        if conflicting.any():
+            names = np.array(values, dtype=object)
+            problem = np.full(len(frame), '', dtype=object)
+            problem[valid[conflicting]] = [f"conflicting {operation.name} (different {', '.join(names[flags])})"
+                                           for flags in differs[conflicting]]
+            mask = np.zeros(len(frame), dtype=bool)
+            mask[valid[conflicting]] = True
+            add_issues(mask, 'error', operation.key_columns[-1], problem)
+            rejected[valid[conflicting]] = True
+        duplicate[:, i] = (first != np.arange(len(valid))) & ~conflicting
+
+    keep = ~rejected[valid]
+    valid, duplicate = valid[keep], duplicate[keep]
+    dropped = duplicate.all(axis=1)
+    if dropped.any():
+        first = valid[_first_of_group(_group_ids([factorized[c][0][valid] for c in columns]))]
+        problem = np.full(len(frame), '', dtype=object)
+        problem[valid[dropped]] = ['duplicate of line ' + str(line) for line in frame[LINE].to_numpy()[first[dropped]]]
+        mask = np.zeros(len(frame), dtype=bool)
+        mask[valid[dropped]] = True
+        add_issues(mask, 'duplicate', operations[0].key_columns[-1], problem)
+
+    rows = frame.iloc[valid[~dropped]].reset_index(drop=True)
+    partial = duplicate[~dropped]
+    names = np.array([operation.name for operation in operations], dtype=object)
+    duplicate_stages = {int(position) + 1: frozenset(names[partial[position]])
+                        for position in np.flatnonzero(partial.any(axis=1))}
+
+    group_columns = [c for c in GROUP_COLUMNS if c in rows.columns]
+    groups = (rows.groupby(group_columns, sort=True).size().reset_index(name='rows') if group_columns
+              else pd.DataFrame({'rows': [len(rows)]}))
+    issue_frame = (pd.concat(issues, ignore_index=True).sort_values(LINE, kind='stable', ignore_index=True) if issues
+                   else pd.DataFrame(columns=[LINE, 'severity', 'column', 'problem', 'value']))
+    return Plan(rows, issue_frame, groups, duplicate_stages, len(frame))
+
+
+def run(filename: str, operations: Sequence[Operation]) -> Plan:
+    """
+    Loads and checks a CSV file.
+
+    :param filename: The CSV file to read
+    :param operations: The operations the rows are sent for
+    :return: The Plan
+    """
+    columns = list(dict.fromkeys(c for operation in operations for c in operation.csv_columns))
+    return check(load(filename, columns), operations)
+
+
+def print_report(plan: Plan, limit: int = 20) -> None:
+    """
+    Prints the totals of the pre-flight check, the first issues and the rows per MX/site/server group.
+
+    :param plan: The Plan returned by check()
+    :param limit: The maximum number of issues listed
+    :return: None
+    """
+    errors = plan.issues[plan.issues['severity'] == 'error']
+    print(f"\nPre-flight: {plan.read} rows read, {len(plan.rows)} to send, "
+          f"{(plan.issues['severity'] == 'duplicate').sum()} duplicates dropped, "
+          f"{errors[LINE].nunique()} rows rejected")
+    if len(plan.issues):
+        by_problem = plan.issues['problem'].str.replace(r" \(.*\)| of line \d+", "", regex=True).value_counts()
+        print("Issues: " + ", ".join(f"{problem}: {count}" for problem, count in by_problem.items()))
+        for issue in plan.issues.head(limit).itertuples(index=False):
+            print(f"  line {getattr(issue, LINE)}: {issue.severity} {issue.column}={issue.value!r} {issue.problem}")
+        if len(plan.issues) > limit:
+            print(f"  ... and {len(plan.issues) - limit} more")
+    if plan.duplicate_stages:
+        print(f"Rows sharing an object with an earlier row: {len(plan.duplicate_stages)}")
+    print(f"Groups: {len(plan.groups)}")
+    for group in plan.groups.head(limit).itertuples(index=False):
+        print("  " + " / ".join(str(value) for value in group[:-1]) + f": {group[-1]} rows")
+    if len(plan.groups) > limit:
+        print(f"  ... and {len(plan.groups) - limit} more")
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Adds the --preflight and --preflight-only options.
+
+    :param parser: The script's argument parser
+    :return: None
+    """
+    parser.add_argument("--preflight", action="store_true",
+                        help="validate and deduplicate the input file before anything is sent; only the clean rows "
+                             "are sent")
+    parser.add_argument("--preflight-only", action="store_true",
+                        help="validate the input file, print the pre-flight report and exit")
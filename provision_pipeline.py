@@ -0,0 +1,304 @@
+import argparse
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from typing import Any, Callable, Collection, Dict, Hashable, Iterable, List, Mapping, NamedTuple, Optional, Set, Tuple
+
+import bulk_executor
+import create_db_connection_v2
+import create_protected__ip_list_v2
+import csv_reader
+import metrics
+import mx_logging
+import preflight
+import run_journal
+import session_pool
+import update_os_connection__ip_list_v2
+
+"""
+Description:
+This Python script onboards the databases of the input CSV file in a single pass.
+
+Onboarding used to take three runs over the same file: create_protected__ip_list_v2.py, then
+update_os_connection__ip_list_v2.py, then create_db_connection_v2.py.  This script reads the CSV once, logs in once to
+each MX, and runs the three stages of every row as a small dependency graph (STAGES):
+    protected_ip   creates the protected IP and its server group IP
+    server_os      updates the OS-type of the server group IP            (needs protected_ip)
+    db_connection  creates the db connection (alias)                      (needs protected_ip)
+A row's stages run in that order in one worker, and the rows run concurrently through bulk_executor.run_per_mx(), so
+row 2's protected IP never waits for row 1's db connection.  When a stage fails, the stages that need it are skipped
+(and journaled as failed, for --retry-failed), and each row gets one combined outcome.  A create answered with 409
+finds its object already on the MX ("exists"): it is journaled as succeeded, and the stages that need it go ahead.
+A stage whose object an earlier row of the run already created or found is not sent again ("duplicate"); if the
+earlier row failed to, the stage counts as failed here too.
+
+Each stage is journaled under the same operation as its standalone script, so --resume and --retry-failed work per
+stage, and across this script and the three others.
+
+Usage:
+$ python provision_pipeline.py [--concurrency N] [--ordered] [--resume | --retry-failed] [--preflight | --preflight-only] [--sessions N [--accounts FILE]]
+
+Developer note: This is code from my personal lab for my professional development. This should be considered example
+code only.
+
+Revision History:
+-----------------
+2026-10-17:
+    Initial creation of the script.
+2026-10-17:
+    Added --preflight and --preflight-only; a stage another row already sends is recorded as a duplicate.
+2026-10-18:
+    Added --sessions and --accounts: the requests are spread over a pool of MX sessions (session_pool).
+2026-10-18:
+    A 409 on a create no longer skips the stages that need it; skipped stages are journaled as failed; a stage's object
+    is sent once per run.
+2026-10-18:
+    A duplicate stage whose earlier row failed counts as failed, so the stages that need it are skipped.
+2026-10-18:
+    A create answered with 409 is journaled as succeeded, so --retry-failed no longer resends it on every run.
+"""
+
+logger = logging.getLogger(__name__)
+
+# Important filename variable
+input_csv_filename = "input.csv"
+# The status code of a create whose object is already on the MX.
+EXISTS_STATUS = 409
+
+
+def _create_protected_ip(row: Dict[str, Any], headers: Dict[str, str]):
+    return create_protected__ip_list_v2.create_protected_ip_list(
+        row['MX-IP'], row['MX-port'], row['site'], row['server_group_name'], row['ip-address'],
+        row['gateway_group_name'], {'comment': row['comment']}, headers)
+
+
+def _update_server_os(row: Dict[str, Any], headers: Dict[str, str]):
+    return update_os_connection__ip_list_v2.update_server_group_iplist(
+        row['MX-IP'], row['MX-port'], row['site'], row['server_group_name'], row['ip-address'],
+        {'OS-type': row['OS-type']}, headers)
+
+
+def _create_db_connection(row: Dict[str, Any], headers: Dict[str, str]):
+    body = {column: row[column] for column in create_db_connection_v2.csv_columns}
+    return create_db_connection_v2.create_db_connection(
+        row['MX-IP'], row['MX-port'], row['site'], row['server_group_name'], row['service_name'],
+        row['connection_name'], body, headers)
+
+
+class Stage(NamedTuple):
+    """
+    One API call of a row's onboarding.
+    """
+    name: str
+    depends_on: Tuple[str, ...]
+    csv_columns: Tuple[str, ...]
+    journal_key_columns: Tuple[str, ...]
+    send: Callable[[Dict[str, Any], Dict[str, str]], Any]
+
+
+# In dependency order.  The names are the journal operations of the standalone scripts.
+STAGES: Tuple[Stage, ...] = (
+    Stage("protected_ip", (), create_protected__ip_list_v2.csv_columns,
+          create_protected__ip_list_v2.journal_key_columns, _create_protected_ip),
+    Stage("server_os", ("protected_ip",), update_os_connection__ip_list_v2.csv_columns,
+          update_os_connection__ip_list_v2.journal_key_columns, _update_server_os),
+    Stage("db_connection", ("protected_ip",), create_db_connection_v2.csv_columns,
+          create_db_connection_v2.journal_key_columns, _create_db_connection),
+)
+# The columns of the CSV file the stages use
+csv_columns = tuple(dict.fromkeys(column for stage in STAGES for column in stage.csv_columns))
+
+
+def protected_ip_key(row: Dict[str, Any]) -> Hashable:
+    """
+    Order key that serializes the rows sharing a protected IP, so its later rows run after it has been created.
+
+    :param row: A dictionary representing one row of the input CSV file
+    :return: The protected IP's journal key columns, as a tuple
+    """
+    return tuple(row.get(column) for column in create_protected__ip_list_v2.journal_key_columns)
+
+
+def read_csv(debug: bool):
+    """
+    Lazily reads the rows of the input CSV file, keeping only the columns the stages use.
+
+    :param debug: A boolean flag indicating whether to enable debugging
+    :return: An iterator of dictionaries, one per row of the input CSV file
+    """
+    if debug:
+        logger.debug("Reading %s columns: %s", input_csv_filename, csv_columns)
+    return csv_reader.iter_rows(input_csv_filename, columns=csv_columns)
+
+
+def run_pipeline(rows: Iterable[Dict[str, Any]], headers: Dict[str, str],
+                 concurrency: int = bulk_executor.DEFAULT_CONCURRENCY,
+                 order_key: Optional[Callable[[Dict[str, Any]], Hashable]] = None,
+                 debug: bool = False,
+                 journals: Optional[Mapping[str, run_journal.RunJournal]] = None,
+                 resume: bool = False, retry_failed: bool = False,
+                 stage_counts: Optional[Counter] = None,
+                 duplicate_stages: Optional[Mapping[int, Collection[str]]] = None) -> List[bulk_executor.RowResult]:
+    """
+    Runs every stage of every row, partitioned by MX.
+
+    :param rows: An iterable of dictionaries, one per CSV row.  It is consumed lazily.
+    :param headers: The headers of the API calls
+    :param concurrency: The maximum number of rows in flight at once, per MX
+    :param order_key: Optional function; rows with equal keys are run sequentially, in input order
+    :param debug: Whether to enable debug mode or not.
+    :param journals: Optional stage name to RunJournal; each stage's outcome is recorded in its journal
+    :param resume: Skip the stages the journal records as already succeeded
+    :param retry_failed: Only run the stages the journal records as failed
+    :param stage_counts: Optional Counter, incremented with (stage name, "ok"/"exists"/"failed"/"skipped"/"done"/
+                         "duplicate")
+    :param duplicate_stages: Optional rownum to the stages an earlier row already sends (preflight.Plan.duplicate_stages);
+                             those stages are not sent again, and fail if the earlier row's failed.  Use an order_key
+                             that runs such rows after the earlier one.
+    :return: A list of RowResult, one per row, sorted by rownum.  A row is ok when none of its stages failed.
+    """
+    journals = journals or {}
+    duplicate_stages = duplicate_stages or {}
+    succeeded: Dict[str, Set[str]] = {}
+    failed: Dict[str, Set[str]] = {}
+    for name, journal in journals.items():
+        if resume or retry_failed:
+            succeeded[name] = journal.keys(ok=True)
+        if retry_failed:
+            failed[name] = journal.keys(ok=False)
+    counts = stage_counts if stage_counts is not None else Counter()
+    counts_lock = threading.Lock()
+    # Stage name to the keys of the objects this run already created or found, so the later rows naming the same
+    # object neither send it again nor record a 409 for it.
+    satisfied: Dict[str, Set[Hashable]] = {stage.name: set() for stage in STAGES}
+
+    def stage_key(stage, row):
+        return tuple(str(row.get(column)) for column in stage.journal_key_columns)
+
+    def already_done(stage, row):
+        journal = journals.get(stage.name)
+        if journal is None:
+            return False
+        key = journal.key(row)
+        if retry_failed:
+            return key not in failed[stage.name]
+        return resume and key in succeeded[stage.name]
+
+    def run_row(rownum, row):
+        statuses: Dict[str, str] = {}
+        messages = []
+        for stage in STAGES:
+            blocking = [name for name in stage.depends_on if statuses[name] in ("failed", "skipped")]
+            if blocking:
+                statuses[stage.name] = "skipped"
+                # Journaled as failed, so --retry-failed sends it once its dependency is there.
+                if stage.name in journals:
+                    journals[stage.name].record(row, bulk_executor.RowResult(
+                        rownum, False, None, f"skipped: {', '.join(blocking)} failed", 0.0))
+            elif already_done(stage, row):
+                statuses[stage.name] = "done"
+            elif stage_key(stage, row) in satisfied[stage.name]:
+                statuses[stage.name] = "duplicate"
+            elif stage.name in duplicate_stages.get(rownum, ()):
+                # The earlier row that sends this object did not create or find it; its failure is already journaled.
+                statuses[stage.name] = "failed"
+                messages.append(f"{stage.name} failed: the earlier row sending the same object failed")
+            else:
+                logger.debug("Row %d: %s", rownum, stage.name)
+                start = time.perf_counter()
+                try:
+                    response = stage.send(row, headers)
+                    result = bulk_executor.RowResult(rownum, response.status_code == 200, response.status_code,
+                                                     "" if response.status_code == 200 else response.text,
+                                                     time.perf_counter() - start)
+                except Exception as e:
+                    result = bulk_executor.RowResult(rownum, False, None, f"{type(e).__name__}: {e}",
+                                                     time.perf_counter() - start)
+                if stage.name in journals:
+                    # A 409 found the object on the MX, which is all the stage is for: journaled as succeeded, so that
+                    # --retry-failed does not send it again.
+                    exists = result.status_code == EXISTS_STATUS
+                    journals[stage.name].record(row, result._replace(ok=True) if exists else result)
+                if result.ok:
+                    statuses[stage.name] = "ok"
+                elif result.status_code == EXISTS_STATUS:
+                    # Already on the MX: not created by this run, but the stages that need it can go ahead.
+                    statuses[stage.name] = "exists"
+                else:
+                    statuses[stage.name] = "failed"
+                    messages.append(f"{stage.name} failed ({result.status_code}): {result.message}")
+                if statuses[stage.name] != "failed":
+                    with counts_lock:
+                        satisfied[stage.name].add(stage_key(stage, row))
+            with counts_lock:
+                counts[(stage.name, statuses[stage.name])] += 1
+        skipped = [name for name, status in statuses.items() if status == "skipped"]
+        if skipped:
+            messages.append(f"skipped: {', '.join(skipped)}")
+        return "; ".join(messages) if messages else True
+
+    return bulk_executor.run_per_mx(rows, run_row, concurrency, order_key, debug)
+
+
+def print_stage_summary(stage_counts: Counter) -> None:
+    """
+    Prints how many rows each stage sent, skipped, found already done or left to an earlier row.
+
+    :param stage_counts: The Counter filled by run_pipeline()
+    :return: None
+    """
+    for stage in STAGES:
+        counts = ", ".join(f"{status}: {stage_counts[(stage.name, status)]}"
+                           for status in ("ok", "exists", "failed", "skipped", "done", "duplicate"))
+        print(f"  {stage.name:<14} {counts}")
+
+
+if __name__ == '__main__':
+    """Onboard the databases of a CSV file: protected IP's, server group IP OS's and db connections in one pass.
+
+    Usage:
+    $ python provision_pipeline.py [--concurrency N] [--ordered] [--resume | --retry-failed] [--preflight | --preflight-only] [--sessions N [--accounts FILE]]
+    """
+    parser = argparse.ArgumentParser(description="Create the protected IP's, update the server group IP OS's and "
+                                                 "create the db connections of the input CSV file in one pass.")
+    bulk_executor.add_arguments(parser)
+    preflight.add_arguments(parser)
+    session_pool.add_arguments(parser)
+    mx_logging.add_arguments(parser)
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    mx_logging.configure(args.log_level, args.log_format)
+    metrics.write_at_exit(args.metrics_json, args.metrics_prom)
+    debug = False
+    session_pool.configure(args.accounts, args.sessions, debug=debug)
+    data = read_csv(debug)
+    duplicate_stages: Dict[int, Collection[str]] = {}
+    if args.preflight or args.preflight_only:
+        preflight_plan = preflight.run(input_csv_filename, [preflight.Operation(stage.name, stage.csv_columns,
+                                                                                stage.journal_key_columns)
+                                                            for stage in STAGES])
+        preflight.print_report(preflight_plan)
+        if args.preflight_only:
+            raise SystemExit(0 if preflight_plan.ok else 1)
+        data = preflight_plan.records()
+        duplicate_stages = preflight_plan.duplicate_stages
+    headers: Dict[str, str] = {"Content-Type": "application/json", "Authorization": "Basic Y="}
+    print("\nWe will now begin onboarding the databases: Protected IP's, Server Group IP OS's and db connections")
+
+    order_key = bulk_executor.server_group_key if args.ordered else None
+    if duplicate_stages and order_key is None:
+        # A row that shares its protected IP with an earlier row must not overtake it.
+        order_key = protected_ip_key
+    journal_path = args.journal or run_journal.default_path(input_csv_filename)
+    stage_counts: Counter = Counter()
+    with ExitStack() as stack:
+        journals = {stage.name: stack.enter_context(run_journal.RunJournal(journal_path, stage.name,
+                                                                             stage.journal_key_columns))
+                    for stage in STAGES}
+        start = time.perf_counter()
+        results = run_pipeline(data, headers, args.concurrency, order_key, debug, journals, args.resume,
+                               args.retry_failed, stage_counts, duplicate_stages)
+    bulk_executor.print_summary(results, "Onboarded rows", time.perf_counter() - start)
+    print_stage_summary(stage_counts)
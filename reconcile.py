@@ -0,0 +1,276 @@
+import argparse
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Optional, Sequence, Tuple
+
+import authorization_v2
+import bulk_executor
+import mx_client
+
+"""
+Description:
+This Python script provides the reconcile (diff) mode of the provisioning scripts.
+
+Instead of sending every CSV row to the MX, the current state of every server group (or db service) named in the file
+is fetched with one collection GET per group, and compared with the rows.  Only the differences become API calls:
+a create for an object the MX does not have, an update for an object whose fields differ (for example a changed
+OS-type or comment), and, when asked for, a delete for an object on the MX that is not in the file.  print_plan() shows
+the calls before anything is sent, which is all a dry run does.
+
+Each plan_*() function returns a list of Action, and run_plan() sends them through bulk_executor.run_per_mx() with one
+handler function per operation.
+
+Developer note: This is code from my personal lab for my professional development. This should be considered example
+code only.
+
+Revision History:
+-----------------
+2026-10-17:
+    Initial creation of the script.
+"""
+
+logger = logging.getLogger(__name__)
+
+# Global variables
+API_PATH = "/SecureSphere/api/v1"
+# Number of collection GETs in flight while the current state is fetched.
+FETCH_CONCURRENCY = 8
+# Fields that the MX never returns, so they can't be compared.
+UNCOMPARABLE_FIELDS = ('password',)
+
+
+class Action(NamedTuple):
+    """
+    One API call of a reconcile plan.  rownum is the CSV row the action came from, or 0 for a delete of an object that
+    is on the MX but not in the file.
+    """
+    op: str
+    rownum: int
+    row: Dict[str, Any]
+    reason: str
+
+
+def add_arguments(parser: argparse.ArgumentParser, deletable: Optional[str] = None) -> None:
+    """
+    Adds the --reconcile, --dry-run and (when deletable is given) --delete-extra options to a script.
+
+    :param parser: The script's argument parser
+    :param deletable: What --delete-extra deletes, e.g. "protected IP's"
+    :return: None
+    """
+    parser.add_argument("--reconcile", action="store_true",
+                        help="only send the rows that differ from what the MX already has")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="print the planned API calls of --reconcile without sending them")
+    if deletable is not None:
+        parser.add_argument("--delete-extra", action="store_true",
+                            help=f"with --reconcile, also delete {deletable} that are on the MX but not in the file")
+
+
+def get_collection(host: str, port: str, path: str) -> Optional[List[Any]]:
+    """
+    GETs a collection from the MX, e.g. /conf/serverGroups/{site}/{server_group}/protectedIPs.
+
+    The MX wraps collections in an object with a single list, e.g. {"protected-ips": [...]}; the list is returned.
+
+    :param host: The MX host
+    :param port: The MX port
+    :param path: The path below /SecureSphere/api/v1
+    :return: The list of items, or None if the parent object does not exist (404)
+    :raises RuntimeError: If the MX returns any other error
+    """
+    response = mx_client.get(f"https://{host}:{port}{API_PATH}{path}")
+    if response.status_code == 404:
+        return None
+    if response.status_code != 200:
+        raise RuntimeError(f"GET {path} failed with status code {response.status_code}: {response.text}")
+    data = response.json()
+    if isinstance(data, dict):
+        lists = [value for value in data.values() if isinstance(value, list)]
+        return lists[0] if lists else []
+    return data
+
+
+def _field(item: Any, *names: str) -> Any:
+    if not isinstance(item, dict):
+        return item
+    for name in names:
+        if name in item:
+            return item[name]
+    return None
+
+
+def fetch_state(rows: Sequence[Dict[str, Any]], group_key: Callable[[Dict[str, Any]], Tuple],
+                group_path: Callable[[Tuple], str], item_id: Callable[[Any], Hashable],
+                debug: bool = False) -> Dict[Tuple, Optional[Dict[Hashable, Any]]]:
+    """
+    Fetches the current items of every group the rows belong to, FETCH_CONCURRENCY groups at a time.
+
+    :param rows: The CSV rows
+    :param group_key: Function returning a row's group, starting with (MX-IP, MX-port)
+    :param group_path: Function returning the collection path of a group
+    :param item_id: Function returning the identity of an item of the collection
+    :param debug: Whether to enable debug mode or not.
+    :return: A dictionary of group to {item id: item}.  A group that could not be fetched maps to None.
+    """
+    groups = list(dict.fromkeys(group_key(row) for row in rows))
+    for mx in dict.fromkeys(group[:2] for group in groups):
+        authorization_v2.get_session_manager(*mx, debug=debug).get_cookie()
+
+    def fetch(group):
+        try:
+            items = get_collection(group[0], group[1], group_path(group))
+        except Exception as e:
+            logger.warning("Unable to read the current state of %s, every row will be sent: %s", group_path(group), e)
+            return group, None
+        return group, {item_id(item): item for item in items or []}
+
+    with ThreadPoolExecutor(max_workers=FETCH_CONCURRENCY) as executor:
+        return dict(executor.map(fetch, groups))
+
+
+def diff(rows: Sequence[Dict[str, Any]], group_key: Callable[[Dict[str, Any]], Tuple],
+         row_id: Callable[[Dict[str, Any]], Hashable], state: Dict[Tuple, Optional[Dict[Hashable, Any]]],
+         fields: Dict[str, Sequence[str]], create: bool = True, delete_extra: bool = False,
+         row_from_item: Optional[Callable[[Tuple, Any], Dict[str, Any]]] = None) -> List[Action]:
+    """
+    Compares the CSV rows with the current state and returns the actions needed to make the MX match the file.
+
+    :param rows: The CSV rows
+    :param group_key: Function returning a row's group
+    :param row_id: Function returning the identity of a row, comparable with the item ids of the state
+    :param state: The dictionary returned by fetch_state()
+    :param fields: CSV column to the MX field name(s) it is compared with
+    :param create: Whether rows missing on the MX become creates (False: updates)
+    :param delete_extra: Whether items on the MX that are not in the file become deletes
+    :param row_from_item: Function building the row of a delete from a group and an MX item
+    :return: The list of Action, creates and updates in file order followed by deletes
+    """
+    actions: List[Action] = []
+    seen: Dict[Tuple, set] = {}
+    for rownum, row in enumerate(rows, start=1):
+        group = group_key(row)
+        current = state.get(group)
+        identity = row_id(row)
+        seen.setdefault(group, set()).add(identity)
+        if current is None or identity not in current:
+            actions.append(Action("create" if create else "update", rownum, row, "not on the MX"))
+            continue
+        changed = [column for column, names in fields.items()
+                   if column not in UNCOMPARABLE_FIELDS and row.get(column) is not None
+                   and _field(current[identity], *names) is not None
+                   and str(row[column]) != str(_field(current[identity], *names))]
+        if changed:
+            actions.append(Action("update", rownum, row, "changed " + ", ".join(changed)))
+    if delete_extra and row_from_item is not None:
+        for group, current in state.items():
+            for identity, item in (current or {}).items():
+                if identity not in seen.get(group, ()):
+                    actions.append(Action("delete", 0, row_from_item(group, item), "not in the file"))
+    return actions
+
+
+def print_plan(actions: Sequence[Action], title: str, verbose: bool = False) -> None:
+    """
+    Prints the number of API calls a plan will make, and with verbose every call.
+
+    :param actions: The plan
+    :param title: What is being reconciled, e.g. "Protected IP's"
+    :param verbose: Whether to print every action
+    :return: None
+    """
+    counts = {op: sum(1 for a in actions if a.op == op) for op in ("create", "update", "delete")}
+    print(f"\n{title} plan: {counts['create']} create, {counts['update']} update, {counts['delete']} delete "
+          f"({len(actions)} API calls)")
+    if verbose:
+        for a in actions:
+            where = f"row {a.rownum}" if a.rownum else "MX only"
+            shown = {k: v for k, v in a.row.items() if k not in UNCOMPARABLE_FIELDS}
+            print(f"  {a.op:<6} {where}: {shown} ({a.reason})")
+
+
+def run_plan(actions: Sequence[Action], handlers: Dict[str, Callable[[int, Dict[str, Any]], Any]],
+             concurrency: int = bulk_executor.DEFAULT_CONCURRENCY,
+             order_key: Optional[Callable[[Dict[str, Any]], Hashable]] = None,
+             debug: bool = False,
+             on_result: Optional[Callable[[Dict[str, Any], bulk_executor.RowResult], None]] = None
+             ) -> List[bulk_executor.RowResult]:
+    """
+    Sends a plan with bulk_executor.run_per_mx(), calling handlers[action.op](rownum, row) for each action.
+
+    :param actions: The plan
+    :param handlers: Operation ("create", "update", "delete") to the per-row function
+    :param concurrency: The maximum number of calls in flight at once, per MX
+    :param order_key: Optional function; rows with equal keys are run sequentially, in plan order
+    :param debug: Whether to enable debug mode or not.
+    :param on_result: Optional function called with (row, RowResult) as each action completes
+    :return: A list of RowResult, one per action, with rownum set to the action's CSV row
+    """
+    def task(index, row):
+        action = actions[index - 1]
+        return handlers[action.op](action.rownum, row)
+
+    def report(row, result):
+        on_result(row, result._replace(rownum=actions[result.rownum - 1].rownum))
+
+    results = bulk_executor.run_per_mx((a.row for a in actions), task, concurrency, order_key, debug,
+                                       report if on_result is not None else None)
+    return [r._replace(rownum=actions[r.rownum - 1].rownum) for r in results]
+
+
+def _mx_group(row: Dict[str, Any], *columns: str) -> Tuple:
+    return bulk_executor.mx_key(row) + tuple(row.get(c) for c in columns)
+
+
+def plan_protected_ips(rows: Sequence[Dict[str, Any]], delete_extra: bool = False, debug: bool = False) -> List[Action]:
+    """
+    Plans the protected IP's of create_protected__ip_list_v2.py.  A changed comment or gateway group is an update.
+    """
+    def group_key(row):
+        return _mx_group(row, 'site', 'server_group_name')
+
+    def row_from_item(group, item):
+        return {'MX-IP': group[0], 'MX-port': group[1], 'site': group[2], 'server_group_name': group[3],
+                'ip-address': _field(item, 'ip', 'ip-address'),
+                'gateway_group_name': _field(item, 'gateway-group', 'gatewayGroup', 'gateway_group_name'),
+                'comment': _field(item, 'comment')}
+
+    state = fetch_state(rows, group_key, lambda g: f"/conf/serverGroups/{g[2]}/{g[3]}/protectedIPs",
+                        lambda item: _field(item, 'ip', 'ip-address'), debug)
+    fields = {'comment': ('comment',), 'gateway_group_name': ('gateway-group', 'gatewayGroup')}
+    return diff(rows, group_key, lambda row: row['ip-address'], state, fields, True, delete_extra, row_from_item)
+
+
+def plan_server_os(rows: Sequence[Dict[str, Any]], debug: bool = False) -> List[Action]:
+    """
+    Plans the OS updates of update_os_connection__ip_list_v2.py.  Only servers whose OS-type differs are updated;
+    servers are created along with their protected IP, so there are no creates or deletes.
+    """
+    def group_key(row):
+        return _mx_group(row, 'site', 'server_group_name')
+
+    state = fetch_state(rows, group_key, lambda g: f"/conf/serverGroups/{g[2]}/{g[3]}/servers",
+                        lambda item: _field(item, 'ip', 'ip-address'), debug)
+    fields = {'OS-type': ('OS-type', 'os-type', 'osType')}
+    return diff(rows, group_key, lambda row: row['ip-address'], state, fields, create=False)
+
+
+def plan_db_connections(rows: Sequence[Dict[str, Any]], delete_extra: bool = False,
+                        debug: bool = False) -> List[Action]:
+    """
+    Plans the db connections (aliases) of create_db_connection_v2.py.  Fields are compared when the MX returns them
+    in the connection list; passwords are never compared.
+    """
+    def group_key(row):
+        return _mx_group(row, 'site', 'server_group_name', 'service_name')
+
+    def row_from_item(group, item):
+        return {'MX-IP': group[0], 'MX-port': group[1], 'site': group[2], 'server_group_name': group[3],
+                'service_name': group[4], 'connection_name': _field(item, 'display-name', 'name', 'connection_name')}
+
+    state = fetch_state(rows, group_key,
+                        lambda g: f"/conf/dbServices/{g[2]}/{g[3]}/{g[4]}/dbConnections",
+                        lambda item: _field(item, 'display-name', 'name', 'connection_name'), debug)
+    fields = {column: (column,) for column in ('ip-address', 'user-name', 'named-instance', 'domain-name', 'port')}
+    return diff(rows, group_key, lambda row: row['connection_name'], state, fields, True, delete_extra,
+                row_from_item)
@@ -0,0 +1,289 @@
+import logging
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+"""
+Description:
+This Python script provides the request policy applied to every MX API call made through mx_client.
+
+Each MX host gets its own HostPolicy, made of:
+- an optional token bucket that caps the request rate (RATE_LIMIT requests per second, bursts of RATE_BURST); off by
+  default, since the AIMD limiter already backs off when the MX pushes back;
+- an AIMD concurrency limiter: the number of requests in flight grows by one per round of fast, successful calls
+  and is halved when the MX answers 429/503, times out, or slows down past LATENCY_TARGET;
+- retries with jittered exponential backoff on retryable status codes and connection errors, honouring Retry-After.
+  A POST (or PATCH) may have been applied when its connection failed, timed out or got a 502/504, and is only retried
+  when the MX turned it away without processing it: 429, a 503 with Retry-After, or a connection never established;
+- a circuit breaker that pauses all calls to the host for BREAKER_COOLDOWN seconds after BREAKER_THRESHOLD
+  consecutive failures, then lets a single probe through before closing again.
+
+Together they let a bulk run go as fast as the MX can sustain, instead of turning a busy window into lost rows.
+
+Developer note: This is code from my personal lab for my professional development. This should be considered example
+code only.
+
+Revision History:
+-----------------
+2026-10-17:
+    Initial creation of the script.
+2026-10-17:
+    Added policies(); the breaker logs through logging instead of print().
+2026-10-18:
+    RATE_LIMIT defaults to None (no cap).  Non-idempotent requests are only retried when the MX rejected them outright.
+"""
+
+logger = logging.getLogger(__name__)
+
+# Global variables
+# Requests per second per MX, and the burst allowed above it.  None disables the rate limit.
+RATE_LIMIT: Optional[float] = None
+RATE_BURST = 100
+# Bounds of the adaptive per-MX concurrency limit.
+MIN_CONCURRENCY = 1
+INITIAL_CONCURRENCY = 16
+MAX_CONCURRENCY = 64
+# A response slower than this (seconds) counts as a sign of overload.
+LATENCY_TARGET = 2.0
+# Retries after the first attempt, and the backoff between them (seconds).
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+RETRYABLE_STATUS_CODES = frozenset({429, 502, 503, 504})
+# Methods that can be sent twice without a second effect.
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+# Status codes that mean the MX is overloaded, as opposed to a broken row.
+OVERLOAD_STATUS_CODES = frozenset({429, 503})
+# Consecutive failures that open the breaker, and how long it stays open (seconds).
+BREAKER_THRESHOLD = 10
+BREAKER_COOLDOWN = 30.0
+
+
+class TokenBucket:
+    """
+    Blocking token bucket rate limiter.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class AIMDLimiter:
+    """
+    Concurrency limit with additive increase and multiplicative decrease.
+    """
+
+    def __init__(self, initial: int = INITIAL_CONCURRENCY, minimum: int = MIN_CONCURRENCY,
+                 maximum: int = MAX_CONCURRENCY):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, overloaded: bool, latency: float) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if overloaded or latency > LATENCY_TARGET:
+                # Halve at most once per round trip, so one burst of errors is one decrease.
+                if now - self._last_decrease > latency:
+                    self.limit = max(float(self.minimum), self.limit / 2)
+                    self._last_decrease = now
+            else:
+                self.limit = min(float(self.maximum), self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+
+class CircuitBreaker:
+    """
+    Pauses a host after repeated failures.  States: closed, open (every call waits), half-open (one probe call).
+    """
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._condition = threading.Condition()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if self._probing else "open"
+
+    def before_call(self) -> None:
+        """
+        Blocks while the breaker is open.  After the cooldown one caller is let through as the probe.
+        """
+        with self._condition:
+            while self.opened_at is not None:
+                remaining = self.opened_at + self.cooldown - time.monotonic()
+                if remaining <= 0 and not self._probing:
+                    self._probing = True
+                    return
+                self._condition.wait(timeout=remaining if remaining > 0 else None)
+
+    def record(self, ok: bool) -> None:
+        with self._condition:
+            if ok:
+                self.failures = 0
+                self.opened_at = None
+                self._probing = False
+                self._condition.notify_all()
+                return
+            self.failures += 1
+            if self._probing or self.failures >= self.threshold:
+                if self.opened_at is None or self._probing:
+                    logger.warning("Circuit breaker open: pausing calls for %.0fs after %d consecutive failures",
+                                   self.cooldown, self.failures,
+                                   extra={"cooldown": self.cooldown, "failures": self.failures})
+                self.opened_at = time.monotonic()
+                self._probing = False
+                self._condition.notify_all()
+
+
+class HostPolicy:
+    """
+    Rate limit, adaptive concurrency, retries and circuit breaker for one MX host.
+    """
+
+    def __init__(self, host: str):
+        self.host = host
+        self.bucket = TokenBucket(RATE_LIMIT, RATE_BURST) if RATE_LIMIT else None
+        self.limiter = AIMDLimiter()
+        self.breaker = CircuitBreaker()
+        self.retries = 0
+
+    def send(self, call: Callable[[], requests.Response], idempotent: bool = True) -> requests.Response:
+        """
+        Sends a request under the policy, retrying it when the MX answers with a retryable status code or the
+        connection fails.
+
+        :param call: Function that sends the request once and returns the response
+        :param idempotent: False for a request that must not be sent twice (POST); it is only retried when the MX
+                           certainly did not process it
+        :return: The last response
+        :raises requests.RequestException: If the last attempt failed without a response
+        """
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            if self.bucket is not None:
+                self.bucket.acquire()
+            self.limiter.acquire()
+            start = time.monotonic()
+            response = None
+            error: Optional[requests.RequestException] = None
+            try:
+                response = call()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            except Exception:
+                # Not a transport failure, but a probe must still report back or the breaker would never reopen.
+                self.breaker.record(False)
+                raise
+            finally:
+                latency = time.monotonic() - start
+                overloaded = error is not None or (response is not None and
+                                                   response.status_code in OVERLOAD_STATUS_CODES)
+                self.limiter.release(overloaded, latency)
+            retryable = error is not None or response.status_code in RETRYABLE_STATUS_CODES
+            self.breaker.record(not retryable)
+            if retryable and not idempotent and not rejected(response, error):
+                if error is not None:
+                    raise error
+                return response
+            if not retryable or attempt >= MAX_RETRIES:
+                if error is not None:
+                    raise error
+                return response
+            attempt += 1
+            self.retries += 1
+            time.sleep(backoff(attempt, response))
+
+
+def rejected(response: Optional[requests.Response], error: Optional[requests.RequestException]) -> bool:
+    """
+    Whether a failed attempt was turned away before the MX processed it, so that even a POST can be sent again.
+
+    :param response: The response of the attempt, if any
+    :param error: The transport error of the attempt, if any
+    :return: True for a 429, a 503 with Retry-After, or a connection that was never established
+    """
+    if error is not None:
+        return isinstance(error, requests.ConnectTimeout)
+    return response.status_code == 429 or (response.status_code == 503 and "Retry-After" in response.headers)
+
+
+def backoff(attempt: int, response: Optional[requests.Response] = None) -> float:
+    """
+    Seconds to wait before a retry: the MX's Retry-After if it sent one, otherwise full-jitter exponential backoff.
+
+    :param attempt: The retry number, starting at 1
+    :param response: The response that is being retried, if any
+    :return: The delay in seconds
+    """
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            return min(BACKOFF_MAX, float(retry_after))
+        except ValueError:
+            pass
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+_policies: Dict[str, HostPolicy] = {}
+_policies_lock = threading.Lock()
+
+
+def get_policy(host: str) -> HostPolicy:
+    """
+    Returns the HostPolicy of an MX host, creating it on first use.
+
+    :param host: The MX host
+    :return: The host's policy
+    """
+    with _policies_lock:
+        policy = _policies.get(host)
+        if policy is None:
+            policy = _policies[host] = HostPolicy(host)
+        return policy
+
+
+def policies() -> List[HostPolicy]:
+    """
+    The policies of every MX host called so far.
+
+    :return: A list of HostPolicy
+    """
+    with _policies_lock:
+        return list(_policies.values())
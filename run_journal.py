@@ -0,0 +1,260 @@
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Set, Tuple
+
+"""
+Description:
+This Python script provides the result journal of the bulk provisioning scripts.
+
+Every row a bulk run sends is recorded in a SQLite database with its outcome, keyed by the operation and a stable
+identity of the row (MX, site, server group and IP address or connection name), so a run that died halfway can be
+resumed without resending the whole CSV:
+    --resume        skips the rows that already succeeded
+    --retry-failed  sends only the rows that failed
+
+A row that succeeded once stays succeeded: rows of the CSV that share a key (the same IP on two server groups' rows,
+say) are one object, and the 409 of the second row must not undo the first row's create.  Only reset() forgets a
+success, when the object is deleted again.
+
+Results are handed to a writer thread through a queue and committed in batches, so recording them does not slow down
+the worker threads that send the requests.
+
+Usage:
+    with RunJournal("input.csv.journal.db", "protected_ip", key_columns) as journal:
+        numbered_rows = journal.filter_numbered(enumerate(rows, start=1), resume=True)
+        results = bulk_executor.run_per_mx_numbered(numbered_rows, task, on_result=journal.record)
+
+Developer note: This is code from my personal lab for my professional development. This should be considered example
+code only.
+
+Revision History:
+-----------------
+2026-10-17:
+    Initial creation of the script.
+2026-10-18:
+    The journal keeps whether a row ever succeeded (succeeded column), so a later failure of a row with the same key
+    no longer erases the success.  Added reset().
+2026-10-18:
+    Added filter_numbered(), which keeps the rows' numbers in the file, so the results of --resume and --retry-failed
+    runs report the CSV row numbers.
+"""
+
+# Global variables
+# Results committed per transaction.
+BATCH_SIZE = 500
+# Longest time a result waits before it is committed, in seconds.
+FLUSH_INTERVAL = 1.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    operation   TEXT    NOT NULL,
+    row_key     TEXT    NOT NULL,
+    rownum      INTEGER,
+    ok          INTEGER NOT NULL,
+    succeeded   INTEGER NOT NULL DEFAULT 0,
+    status_code INTEGER,
+    message     TEXT,
+    attempts    INTEGER NOT NULL DEFAULT 1,
+    updated_at  REAL    NOT NULL,
+    PRIMARY KEY (operation, row_key)
+)
+"""
+
+# ok is the outcome of the last attempt; succeeded is sticky until reset().
+_UPSERT = """
+INSERT INTO results (operation, row_key, rownum, ok, succeeded, status_code, message, attempts, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, 1, ?)
+ON CONFLICT (operation, row_key) DO UPDATE SET
+    rownum = excluded.rownum, ok = excluded.ok, succeeded = MAX(results.succeeded, excluded.succeeded),
+    status_code = excluded.status_code, message = excluded.message, attempts = results.attempts + 1,
+    updated_at = excluded.updated_at
+"""
+
+_RESET = """
+INSERT INTO results (operation, row_key, rownum, ok, succeeded, status_code, message, attempts, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, 1, ?)
+ON CONFLICT (operation, row_key) DO UPDATE SET
+    rownum = excluded.rownum, ok = excluded.ok, succeeded = excluded.succeeded, status_code = excluded.status_code,
+    message = excluded.message, attempts = results.attempts + 1, updated_at = excluded.updated_at
+"""
+
+_STOP = object()
+
+
+def default_path(input_csv_filename: str) -> str:
+    """
+    The journal file used for an input CSV file when none is given.
+
+    :param input_csv_filename: The input CSV file
+    :return: The journal file name
+    """
+    return f"{input_csv_filename}.journal.db"
+
+
+class RunJournal:
+    """
+    Durable per-row journal of one operation (e.g. "protected_ip") of a bulk run.
+    """
+
+    def __init__(self, path: str, operation: str, key_columns: Sequence[str], batch_size: int = BATCH_SIZE,
+                 flush_interval: float = FLUSH_INTERVAL):
+        """
+        :param path: The SQLite database file
+        :param operation: The operation the rows are journaled under
+        :param key_columns: The CSV columns that identify a row
+        :param batch_size: Results committed per transaction
+        :param flush_interval: Longest time a result waits before it is committed, in seconds
+        """
+        self.path = path
+        self.operation = operation
+        self.key_columns = tuple(key_columns)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        with self._connect() as connection:
+            connection.execute(_SCHEMA)
+            columns = {column for (_, column, *_) in connection.execute("PRAGMA table_info(results)")}
+            if "succeeded" not in columns:
+                # Journals written before the column existed: their last outcome is all that is known.
+                connection.execute("ALTER TABLE results ADD COLUMN succeeded INTEGER NOT NULL DEFAULT 0")
+                connection.execute("UPDATE results SET succeeded = ok")
+        self._queue: queue.Queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write, name="run-journal-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def key(self, row: Dict[str, Any]) -> str:
+        """
+        The stable identity of a row.
+
+        :param row: A dictionary representing one row of the input CSV file
+        :return: The key columns' values joined with "|"
+        """
+        return "|".join(str(row.get(column)) for column in self.key_columns)
+
+    def keys(self, ok: bool) -> Set[str]:
+        """
+        The keys of the rows that succeeded at least once (ok=True), or that were attempted and never succeeded
+        (ok=False), since their last reset().
+
+        :param ok: Which outcome to return
+        :return: A set of row keys
+        """
+        connection = self._connect()
+        try:
+            cursor = connection.execute("SELECT row_key FROM results WHERE operation = ? AND succeeded = ?",
+                                        (self.operation, int(ok)))
+            return {key for (key,) in cursor}
+        finally:
+            connection.close()
+
+    def filter_rows(self, rows: Iterable[Dict[str, Any]], resume: bool = False,
+                    retry_failed: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily filters the rows of a run according to the journal.
+
+        :param rows: The rows of the input CSV file
+        :param resume: Skip the rows that already succeeded
+        :param retry_failed: Only keep the rows that failed
+        :return: An iterator of the rows to send
+        """
+        if retry_failed:
+            failed = self.keys(ok=False)
+            return (row for row in rows if self.key(row) in failed)
+        if resume:
+            succeeded = self.keys(ok=True)
+            return (row for row in rows if self.key(row) not in succeeded)
+        return iter(rows)
+
+    def filter_numbered(self, numbered_rows: Iterable[Tuple[int, Dict[str, Any]]], resume: bool = False,
+                        retry_failed: bool = False) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Same as filter_rows(), for rows numbered before filtering, so the rows sent keep their rownum in the file.
+
+        :param numbered_rows: An iterable of (rownum, row) tuples, e.g. enumerate(rows, start=1)
+        :param resume: Skip the rows that already succeeded
+        :param retry_failed: Only keep the rows that failed
+        :return: An iterator of the (rownum, row) tuples to send
+        """
+        if retry_failed:
+            failed = self.keys(ok=False)
+            return ((rownum, row) for rownum, row in numbered_rows if self.key(row) in failed)
+        if resume:
+            succeeded = self.keys(ok=True)
+            return ((rownum, row) for rownum, row in numbered_rows if self.key(row) not in succeeded)
+        return iter(numbered_rows)
+
+    def record(self, row: Dict[str, Any], result) -> None:
+        """
+        Queues the outcome of a row for the writer thread.  Safe to call from any thread.
+
+        :param row: A dictionary representing one row of the input CSV file
+        :param result: The bulk_executor.RowResult of the row
+        :return: None
+        """
+        self._queue.put((_UPSERT, (self.operation, self.key(row), result.rownum, int(result.ok), int(result.ok),
+                                   result.status_code, (result.message or "")[:2000], time.time())))
+
+    def reset(self, row: Dict[str, Any], result) -> None:
+        """
+        Queues the outcome of a row like record(), and forgets that the row ever succeeded, e.g. after the object it
+        created was deleted, so that --resume sends it again.
+
+        :param row: A dictionary representing one row of the input CSV file
+        :param result: The bulk_executor.RowResult of the row
+        :return: None
+        """
+        self._queue.put((_RESET, (self.operation, self.key(row), result.rownum, int(result.ok), int(result.ok),
+                                  result.status_code, (result.message or "")[:2000], time.time())))
+
+    def _write(self) -> None:
+        connection = self._connect()
+        try:
+            batch = []
+            deadline: Optional[float] = None
+            while True:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+                if item is not None and item is not _STOP:
+                    batch.append(item)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+                if batch and (item is None or item is _STOP or len(batch) >= self.batch_size):
+                    with connection:
+                        # In queue order, one executemany() per run of items with the same statement.
+                        start = 0
+                        for end in range(1, len(batch) + 1):
+                            if end == len(batch) or batch[end][0] is not batch[start][0]:
+                                connection.executemany(batch[start][0], [item[1] for item in batch[start:end]])
+                                start = end
+                    batch = []
+                    deadline = None
+                if item is _STOP:
+                    return
+        finally:
+            connection.close()
+
+    def close(self) -> None:
+        """
+        Commits every queued result and stops the writer thread.
+
+        :return: None
+        """
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+
+    def __enter__(self) -> "RunJournal":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,407 @@
+import argparse
+import base64
+import logging
+import os
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import authorization_v2
+import mx_client
+
+"""
+Description:
+This Python script spreads the requests to an MX over a pool of sessions, logged in with several service accounts or
+several times with one account.
+
+The MX serializes, or throttles, the heavy activity of a single session, so past a point adding worker threads
+(--concurrency) does not make a run faster.  A SessionPool logs in --sessions times with each account of --accounts
+(by default, the script's own account) and mx_client sends every request to the pool's session with the least
+outstanding requests:
+- every session is an authorization_v2.MXSessionManager of its own (cached across runs under its own name), logged
+  in again on 401 without affecting the others;
+- a session that fails UNHEALTHY_AFTER requests in a row (connection errors, 5xx, 429, or 401 after logging in again)
+  is taken out of rotation, and logged in again after a cooldown that doubles up to MAX_COOLDOWN while it keeps
+  failing; if every session is out, requests still go to the least failing one, so an MX outage is left to
+  request_policy;
+- a maintenance thread keeps the sessions alive, one at a time: a session due for keepalive (or re-login) first stops
+  receiving new requests, finishes its outstanding ones (at most DRAIN_TIMEOUT seconds), is refreshed and goes back
+  in rotation, so the run never stops.  rolling_relogin() does the same for every session, e.g. after a password
+  change.
+
+The accounts file holds one account per line, as the Basic Authorization header value ("Basic dXNlcjpwYXNz") or as
+user:password, and must not be readable by other users.
+
+Usage:
+$ python create_protected__ip_list_v2.py --sessions 4 [--accounts accounts.txt]
+    session_pool.add_arguments(parser)
+    session_pool.configure(args.accounts, args.sessions)
+
+Developer note: This is code from my personal lab for my professional development. This should be considered example
+code only.
+
+Revision History:
+-----------------
+2026-10-18:
+    Initial creation of the script.
+"""
+
+logger = logging.getLogger(__name__)
+
+# Global variables
+# Consecutive failed requests after which a session is taken out of rotation.
+UNHEALTHY_AFTER = 3
+# Seconds an unhealthy session stays out of rotation before it is logged in again; doubled while it keeps failing.
+COOLDOWN = 5.0
+MAX_COOLDOWN = 120.0
+# Longest time a draining session is given to finish its outstanding requests, in seconds.
+DRAIN_TIMEOUT = 30.0
+# How often the maintenance thread checks the sessions, in seconds.
+MAINTENANCE_INTERVAL = 5.0
+# Logins in flight at once when a pool starts.
+LOGIN_CONCURRENCY = 8
+
+ACTIVE = "active"
+DRAINING = "draining"
+UNHEALTHY = "unhealthy"
+
+
+class PooledSession:
+    """
+    One session of a SessionPool, with its outstanding requests and health.  Guarded by the pool's lock.
+    """
+
+    def __init__(self, name: str, manager: authorization_v2.MXSessionManager):
+        self.name = name
+        self.manager = manager
+        self.state = UNHEALTHY
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.cooldown = COOLDOWN
+        self.retry_at = 0.0
+        self.latency = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"session": self.name, "state": self.state, "outstanding": self.outstanding,
+                "requests": self.requests, "failures": self.failures, "latency": round(self.latency, 4)}
+
+
+class SessionPool:
+    """
+    The sessions of one MX.  send() is called by mx_client for every request to the MX.
+    """
+
+    def __init__(self, host: str, port: Any, accounts: Sequence[str], sessions_per_account: int = 1,
+                 debug: bool = False):
+        """
+        :param host: The MX host
+        :param port: The MX port
+        :param accounts: The Basic Authorization header values of the accounts
+        :param sessions_per_account: The number of sessions logged in with each account
+        :param debug: Whether to enable debug mode or not.
+        """
+        self.host = str(host)
+        self.port = str(port)
+        self.sessions: List[PooledSession] = []
+        for account_number, account in enumerate(accounts, start=1):
+            for session_number in range(1, max(1, int(sessions_per_account)) + 1):
+                name = f"account-{account_number}-session-{session_number}"
+                manager = authorization_v2.MXSessionManager(self.host, self.port, account, debug=debug,
+                                                            session_name=f"pool-{session_number}")
+                self.sessions.append(PooledSession(name, manager))
+        self._lock = threading.Lock()
+        # Notified whenever a request completes, for drain().
+        self._completed = threading.Condition(self._lock)
+        self._stop = threading.Event()
+        self._maintenance_thread: Optional[threading.Thread] = None
+        # Serializes the maintenance of sessions, so only one at a time is out of rotation for it.
+        self._maintenance_lock = threading.Lock()
+        self._next = 0
+
+    def start(self) -> int:
+        """
+        Logs in every session, LOGIN_CONCURRENCY at a time, and starts the maintenance thread.
+
+        :return: The number of sessions logged in
+        """
+        def login(session):
+            cookie = session.manager.get_cookie()
+            with self._lock:
+                if cookie is None:
+                    self._failed(session)
+                else:
+                    session.state = ACTIVE
+
+        with ThreadPoolExecutor(max_workers=LOGIN_CONCURRENCY, thread_name_prefix="session-pool-login") as executor:
+            list(executor.map(login, self.sessions))
+        active = sum(session.state == ACTIVE for session in self.sessions)
+        logger.info("Session pool of %s:%s: %d of %d sessions logged in", self.host, self.port, active,
+                    len(self.sessions), extra={"mx": f"{self.host}:{self.port}"})
+        if active:
+            mx_client.ensure_pool_size(len(self.sessions))
+            self._stop.clear()
+            self._maintenance_thread = threading.Thread(target=self._maintain, daemon=True,
+                                                        name=f"session-pool-{self.host}:{self.port}")
+            self._maintenance_thread.start()
+        return active
+
+    def close(self, logout: bool = False) -> None:
+        """
+        Stops the maintenance thread.
+
+        :param logout: Also end the sessions on the MX
+        :return: None
+        """
+        self._stop.set()
+        if self._maintenance_thread is not None:
+            self._maintenance_thread.join()
+            self._maintenance_thread = None
+        if logout:
+            for session in self.sessions:
+                session.manager.logout()
+
+    def acquire(self) -> PooledSession:
+        """
+        Picks the active session with the fewest outstanding requests (then the fewest requests so far), or the least
+        failing one if none is active, and counts a request on it.  Pair with release().
+
+        :return: The session
+        """
+        with self._lock:
+            candidates = [session for session in self.sessions if session.state == ACTIVE and session.manager.cookie]
+            if not candidates:
+                candidates = [session for session in self.sessions if session.manager.cookie] or self.sessions
+                candidates = [min(candidates, key=lambda session: session.consecutive_failures)]
+            # Rotating the starting point spreads ties evenly.
+            self._next = (self._next + 1) % len(self.sessions)
+            order = {id(session): (index - self._next) % len(self.sessions)
+                     for index, session in enumerate(self.sessions)}
+            session = min(candidates, key=lambda s: (s.outstanding, s.requests, order[id(s)]))
+            session.outstanding += 1
+            session.requests += 1
+            return session
+
+    def release(self, session: PooledSession, ok: bool, latency: float) -> None:
+        """
+        Ends a request on a session, and updates its health.
+
+        :param session: The session returned by acquire()
+        :param ok: Whether the request succeeded, as far as the session is concerned
+        :param latency: The time the request took, in seconds
+        :return: None
+        """
+        with self._lock:
+            session.outstanding -= 1
+            session.latency = latency if not session.latency else 0.8 * session.latency + 0.2 * latency
+            if ok:
+                session.consecutive_failures = 0
+                session.cooldown = COOLDOWN
+            else:
+                self._failed(session)
+            self._completed.notify_all()
+
+    def _failed(self, session: PooledSession) -> None:
+        session.failures += 1
+        session.consecutive_failures += 1
+        if session.state == ACTIVE and session.consecutive_failures >= UNHEALTHY_AFTER or session.manager.cookie is None:
+            if session.state == ACTIVE:
+                logger.warning("Session %s to %s:%s taken out of rotation after %d failures", session.name,
+                               self.host, self.port, session.consecutive_failures)
+            session.state = UNHEALTHY
+            session.retry_at = time.monotonic() + session.cooldown
+            session.cooldown = min(MAX_COOLDOWN, session.cooldown * 2)
+
+    def send(self, attempt: Callable[[Optional[str]], Any]) -> Any:
+        """
+        Sends a request with the cookie of the least busy session, logging that session in again once on 401.
+
+        :param attempt: Function sending the request with a cookie and returning the requests.Response
+        :return: The response
+        """
+        session = self.acquire()
+        start = time.perf_counter()
+        ok = False
+        try:
+            cookie = session.manager.cookie
+            response = attempt(cookie)
+            if response.status_code == 401:
+                cookie = session.manager.refresh(cookie)
+                if cookie is not None:
+                    response = attempt(cookie)
+            ok = response.status_code < 500 and response.status_code not in (401, 429)
+            return response
+        finally:
+            self.release(session, ok, time.perf_counter() - start)
+
+    def drain(self, session: PooledSession, timeout: float = DRAIN_TIMEOUT) -> bool:
+        """
+        Takes a session out of rotation and waits for its outstanding requests.  Put it back with undrain().
+
+        :return: True if it has no outstanding requests left, False if the timeout ran out first
+        """
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            if session.state == ACTIVE:
+                session.state = DRAINING
+            while session.outstanding > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._completed.wait(remaining)
+            return True
+
+    def undrain(self, session: PooledSession, healthy: bool) -> None:
+        with self._lock:
+            if healthy:
+                session.state = ACTIVE
+                session.consecutive_failures = 0
+            else:
+                self._failed(session)
+                session.state = UNHEALTHY
+
+    def rolling_relogin(self) -> int:
+        """
+        Logs every session in again, one at a time, each after it finished its outstanding requests.
+
+        :return: The number of sessions logged in
+        """
+        logged_in = 0
+        for session in list(self.sessions):
+            if self._stop.is_set():
+                break
+            with self._maintenance_lock:
+                if not self.drain(session):
+                    logger.warning("Session %s still had requests after %.0fs; logging it in again anyway",
+                                   session.name, DRAIN_TIMEOUT)
+                stale = session.manager.cookie
+                cookie = session.manager.login()
+                if cookie is not None and stale is not None and stale != cookie:
+                    self._logout_cookie(stale)
+                self.undrain(session, cookie is not None)
+                logged_in += cookie is not None
+        return logged_in
+
+    def _logout_cookie(self, cookie: str) -> None:
+        url = f"https://{self.host}:{self.port}/SecureSphere/api/v1/auth/session"
+        try:
+            mx_client.request("DELETE", url, reauth=False, headers={"Cookie": cookie})
+        except Exception as e:
+            logger.debug("Logout of a replaced session from %s:%s failed: %s", self.host, self.port, e)
+
+    def _maintain(self) -> None:
+        while not self._stop.wait(MAINTENANCE_INTERVAL):
+            for session in list(self.sessions):
+                if self._stop.is_set():
+                    return
+                with self._lock:
+                    state, retry_at = session.state, session.retry_at
+                expiring = session.manager.expires_at - time.time() <= authorization_v2.SESSION_REFRESH_MARGIN
+                if state == UNHEALTHY and time.monotonic() >= retry_at:
+                    # Out of rotation already: a login decides whether it goes back.
+                    with self._maintenance_lock:
+                        self.drain(session, 0)
+                        stale = session.manager.cookie
+                        cookie = session.manager.login()
+                        if cookie is not None and stale is not None and stale != cookie:
+                            self._logout_cookie(stale)
+                        self.undrain(session, cookie is not None)
+                    logger.info("Session %s to %s:%s is %s", session.name, self.host, self.port,
+                                "back in rotation" if cookie is not None else "still failing to log in")
+                elif state == ACTIVE and expiring:
+                    with self._maintenance_lock:
+                        if not self.drain(session):
+                            logger.warning("Session %s still had requests after %.0fs", session.name, DRAIN_TIMEOUT)
+                        # A keepalive GET extends the session, and logs in again if the MX no longer accepts it.
+                        session.manager.keepalive()
+                        self.undrain(session, session.manager.cookie is not None)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        The state, outstanding requests, request and failure counts and average latency of every session.
+
+        :return: A list of dictionaries, one per session
+        """
+        with self._lock:
+            return [session.to_dict() for session in self.sessions]
+
+
+def read_accounts(path: str) -> List[str]:
+    """
+    Reads an accounts file: one account per line, as a Basic Authorization header value or as user:password.  Empty
+    lines and lines starting with # are ignored.
+
+    :param path: The accounts file
+    :return: The Basic Authorization header values
+    """
+    if os.stat(path).st_mode & (stat.S_IRWXG | stat.S_IRWXO):
+        logger.warning("%s is readable by other users; chmod 600 it", path)
+    accounts = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if not line.startswith("Basic "):
+                line = "Basic " + base64.b64encode(line.encode("utf-8")).decode("ascii")
+            accounts.append(line)
+    return accounts
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Adds the --sessions and --accounts options to a script.
+
+    :param parser: The script's argument parser
+    :return: None
+    """
+    parser.add_argument("--sessions", type=int, default=1,
+                        help="MX sessions logged in per account; requests go to the least busy one")
+    parser.add_argument("--accounts", metavar="FILE",
+                        help="file of service accounts to log in with, one per line (user:password or Basic value)")
+
+
+_pools: Dict[str, SessionPool] = {}
+
+
+def configure(accounts_file: Optional[str] = None, sessions_per_account: int = 1,
+              basic_authorization: Optional[str] = None, debug: bool = False) -> bool:
+    """
+    Turns on session pools: from now on, the first request to an MX starts its pool.  Does nothing for a single session
+    of a single account.
+
+    :param accounts_file: Optional accounts file (default: basic_authorization only)
+    :param sessions_per_account: The number of sessions logged in with each account
+    :param basic_authorization: The account used without an accounts file (default: authorization_v2's)
+    :param debug: Whether to enable debug mode or not.
+    :return: True if pooling was turned on
+    """
+    accounts = read_accounts(accounts_file) if accounts_file else \
+        [basic_authorization or authorization_v2.BASIC_AUTHORIZATION]
+    if not accounts:
+        raise ValueError(f"{accounts_file} has no accounts")
+    if len(accounts) * max(1, int(sessions_per_account)) <= 1:
+        return False
+
+    def build(host, port):
+        pool = SessionPool(host, port, accounts, sessions_per_account, debug)
+        if not pool.start():
+            logger.error("No session of the pool of %s:%s could log in; using its single session", host, port)
+            return None
+        _pools[f"{host}:{port}"] = pool
+        return pool
+
+    mx_client.set_session_pool_factory(build)
+    return True
+
+
+def pools() -> Dict[str, SessionPool]:
+    """
+    The pools started so far.
+
+    :return: A dictionary of "host:port" to SessionPool
+    """
+    return dict(_pools)
@@ -0,0 +1,593 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Iterable, List, NamedTuple, Optional, Tuple
+
+import authorization_v2
+import bulk_executor
+
+"""
+Description:
+This Python script provides the sharded mode of the bulk provisioning scripts, for runs too large for one process.
+
+The rows of the input CSV file are split by a stable key, by default their MX, site and server group
+(bulk_executor.server_group_key), into shards stored in a SQLite database on a volume every worker can reach.  Any
+number of worker processes, on any number of hosts, run the same script with the same --shard-queue file:
+- the first worker loads the shards (the others see them loaded and skip reading the CSV into the queue);
+- each worker claims a shard with a lease of --lease seconds and runs it against its own MX session, renewing the
+  lease every lease/3 seconds and recording the results of the rows done so far every RECORD_INTERVAL seconds;
+- a shard whose lease ran out (its worker died or hung) is claimed again by the next worker that asks, which skips
+  the rows already recorded as succeeded;
+- a worker exits when every shard is done, and prints the merged results of all the workers.
+A shard keeps its rows' numbers in the CSV file, so the merged results read like those of a single run.  Rows of the
+same server group are never in two shards, so --ordered still holds.  The queue records the digest of the input file
+it was loaded from: a worker given a file with other content (another or an edited CSV) refuses the queue, rather than
+running and reporting the shards of the old file.
+
+The shards are built before the database is locked, so the other workers only wait for the inserts.  Secret columns
+(SECRET_COLUMNS, e.g. the db connection password) are not stored in the shared database: each worker puts them back
+from its own copy of the input file, matching the rows by the digest of their other columns.
+
+The database uses SQLite's default rollback journal rather than WAL, which needs shared memory and does not work on
+network file systems, and every claim is a BEGIN IMMEDIATE transaction, so two workers never get the same shard.  The
+rows a dead worker sent after its last recording are sent again (a create then fails with 409, which --retry-failed or a
+--reconcile run clears up), and a worker that outlives its lease (e.g. after a long pause) may finish a shard while
+another worker runs it again: keep --lease well above the time of a slow request.  Only the worker holding the live
+lease of a shard marks it done; a worker that lost it leaves the shard to its new holder.
+
+Usage:
+    queue = shard_queue.ShardQueue("run.shards.db", "protected_ip", source="input.csv")
+    results = shard_queue.run_sharded(queue, rows, task, concurrency, on_result=journal.record)
+$ python shard_queue.py status run.shards.db
+
+Developer note: This is code from my personal lab for my professional development. This should be considered example
+code only.
+
+Revision History:
+-----------------
+2026-10-18:
+    Initial creation of the script.
+2026-10-18:
+    load() builds the shards outside the transaction; secret columns are kept out of the database; a shard is only
+    marked done under a live lease.
+2026-10-18:
+    Added load_numbered() and run_sharded_numbered(), for rows that keep their numbers in the file after --resume or
+    --retry-failed.
+2026-10-18:
+    A queue records the digest of the input file it was loaded from (ShardQueue source), and refuses to run the
+    shards of another file.
+"""
+
+logger = logging.getLogger(__name__)
+
+# Global variables
+# Seconds a claimed shard stays leased without a renewal.
+LEASE_SECONDS = 120.0
+# Seconds between two recordings of the results of a running shard.
+RECORD_INTERVAL = 1.0
+# Seconds between checks for a claimable shard while the other workers' shards are still leased.
+POLL_INTERVAL = 5.0
+# Columns never written to the shared database; each worker reads them from its own input file.
+SECRET_COLUMNS = ("password",)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS shards (
+    operation     TEXT    NOT NULL,
+    shard_id      INTEGER NOT NULL,
+    shard_key     TEXT    NOT NULL,
+    row_count     INTEGER NOT NULL,
+    rows          TEXT    NOT NULL,
+    status        TEXT    NOT NULL DEFAULT 'pending',
+    worker        TEXT,
+    lease_expires REAL,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    secret_columns TEXT,
+    updated_at    REAL    NOT NULL,
+    PRIMARY KEY (operation, shard_id)
+);
+CREATE TABLE IF NOT EXISTS shard_results (
+    operation   TEXT    NOT NULL,
+    rownum      INTEGER NOT NULL,
+    shard_id    INTEGER NOT NULL,
+    ok          INTEGER NOT NULL,
+    status_code INTEGER,
+    message     TEXT,
+    elapsed     REAL,
+    worker      TEXT,
+    PRIMARY KEY (operation, rownum)
+);
+CREATE TABLE IF NOT EXISTS loaded (
+    operation     TEXT PRIMARY KEY,
+    loaded_at     REAL NOT NULL,
+    source        TEXT,
+    source_digest TEXT
+);
+"""
+
+
+class Shard(NamedTuple):
+    """
+    A claimed shard: its rows, as (rownum, row) tuples, without their secret_columns.
+    """
+    shard_id: int
+    key: str
+    rows: List[Tuple[int, Dict[str, Any]]]
+    attempts: int
+    secret_columns: Tuple[str, ...] = ()
+
+
+def row_digest(row: Dict[str, Any], secret_columns: Iterable[str] = SECRET_COLUMNS) -> str:
+    """
+    The identity of a row without its secret columns, to match a stored row with the row of a worker's input file.
+
+    :param row: A dictionary representing one row of the input CSV file
+    :param secret_columns: The columns left out
+    :return: A hex digest
+    """
+    public = {column: str(value) for column, value in row.items() if column not in secret_columns}
+    return hashlib.sha256(json.dumps(public, sort_keys=True).encode()).hexdigest()
+
+
+def file_digest(path: str) -> str:
+    """
+    The identity of an input file's content, whatever its path on the worker's host.
+
+    :param path: The input CSV file
+    :return: A hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def default_worker_id() -> str:
+    """
+    The name a worker is recorded under: host name and process id.
+
+    :return: e.g. "worker-3:41200"
+    """
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Adds the --shard-queue, --lease and --worker-id options.
+
+    :param parser: The script's argument parser
+    :return: None
+    """
+    parser.add_argument("--shard-queue", metavar="DB",
+                        help="run as one of several workers sharing the shard queue DB (a SQLite file on a shared "
+                             "volume); the first worker loads the input file into it")
+    parser.add_argument("--lease", type=float, default=LEASE_SECONDS,
+                        help=f"with --shard-queue, seconds a claimed shard is held without renewal "
+                             f"(default: {LEASE_SECONDS:g})")
+    parser.add_argument("--worker-id", help="with --shard-queue, the name this worker is recorded under "
+                                            "(default: host:pid)")
+
+
+def _parts(key: Hashable) -> Tuple:
+    return key if isinstance(key, tuple) else (key,)
+
+
+class ShardQueue:
+    """
+    The shards of one operation (e.g. "protected_ip") in a shared SQLite database.
+    """
+
+    def __init__(self, path: str, operation: str, worker_id: Optional[str] = None, lease: float = LEASE_SECONDS,
+                 source: Optional[str] = None):
+        """
+        :param path: The SQLite database file
+        :param operation: The operation the shards belong to
+        :param worker_id: The name of this worker (default: host:pid)
+        :param lease: Seconds a claimed shard is held without renewal
+        :param source: The input CSV file of the run.  A queue whose shards were loaded from a file with other content
+                       is refused with a ValueError, rather than reporting that file's results.
+        """
+        self.path = path
+        self.operation = operation
+        self.worker_id = worker_id or default_worker_id()
+        self.lease = lease
+        self.source = source
+        self.source_digest = file_digest(source) if source else None
+        connection = self._connect()
+        try:
+            connection.executescript(_SCHEMA)
+            columns = {column for (_, column, *_) in connection.execute("PRAGMA table_info(shards)")}
+            if "secret_columns" not in columns:
+                connection.execute("ALTER TABLE shards ADD COLUMN secret_columns TEXT")
+            columns = {column for (_, column, *_) in connection.execute("PRAGMA table_info(loaded)")}
+            for column in ("source", "source_digest"):
+                if column not in columns:
+                    connection.execute(f"ALTER TABLE loaded ADD COLUMN {column} TEXT")
+            self._check_source(connection)
+        finally:
+            connection.close()
+
+    def _check_source(self, connection: sqlite3.Connection) -> bool:
+        """
+        Whether the shards are loaded, refusing them if they were loaded from another input file.
+        """
+        found = connection.execute("SELECT source, source_digest FROM loaded WHERE operation = ?",
+                                   (self.operation,)).fetchone()
+        if found is None:
+            return False
+        source, source_digest = found
+        # Queues loaded before the source was recorded can't be checked.
+        if self.source_digest and source_digest and source_digest != self.source_digest:
+            raise ValueError(f"{self.path} holds the {self.operation} shards of another input file (loaded from "
+                             f"{source}, digest {source_digest[:12]}); {self.source} has other content (digest "
+                             f"{self.source_digest[:12]}). Use a new shard queue file for this input.")
+        return True
+
+    def _connect(self) -> sqlite3.Connection:
+        # Transactions are explicit (BEGIN IMMEDIATE), so every statement outside one commits on its own.
+        return sqlite3.connect(self.path, timeout=60, isolation_level=None)
+
+    def load(self, rows: Iterable[Dict[str, Any]],
+             shard_key: Callable[[Dict[str, Any]], Hashable] = bulk_executor.server_group_key) -> int:
+        """
+        Splits the rows into shards, unless another worker already did.  See load_numbered().
+
+        :param rows: The rows of the input CSV file
+        :param shard_key: Function returning the shard of a row; the rows of a shard run against one MX
+        :return: The number of shards loaded, 0 if they already were
+        """
+        return self.load_numbered(enumerate(rows, start=1), shard_key)
+
+    def load_numbered(self, numbered_rows: Iterable[Tuple[int, Dict[str, Any]]],
+                      shard_key: Callable[[Dict[str, Any]], Hashable] = bulk_executor.server_group_key) -> int:
+        """
+        Splits the numbered rows into shards, unless another worker already did.  The rows are only read when they are
+        loaded, and the shards are built before the database is locked.
+
+        :param numbered_rows: An iterable of (rownum, row) tuples, rownum being the row's number in the file
+        :param shard_key: Function returning the shard of a row; the rows of a shard run against one MX
+        :return: The number of shards loaded, 0 if they already were
+        """
+        if self._loaded():
+            return 0
+        shards: Dict[Hashable, List[Tuple[int, Dict[str, Any]]]] = {}
+        secret_columns: Dict[str, None] = {}
+        for rownum, row in numbered_rows:
+            stored = {column: value for column, value in row.items() if column not in SECRET_COLUMNS}
+            secret_columns.update(dict.fromkeys(column for column in SECRET_COLUMNS if column in row))
+            # A shard never spans two MXs, whatever shard_key returns.
+            shards.setdefault((bulk_executor.mx_key(row), shard_key(row)), []).append((rownum, stored))
+        now = time.time()
+        records = [(self.operation, shard_id, "|".join(str(part) for part in _parts(key[1])), len(shard_rows),
+                    json.dumps(shard_rows, separators=(",", ":")), json.dumps(list(secret_columns)), now)
+                   for shard_id, (key, shard_rows) in enumerate(shards.items(), start=1)]
+        connection = self._connect()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            if self._check_source(connection):
+                # Another worker loaded the same file meanwhile.
+                connection.execute("ROLLBACK")
+                return 0
+            connection.executemany(
+                "INSERT INTO shards (operation, shard_id, shard_key, row_count, rows, secret_columns, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", records)
+            connection.execute("INSERT INTO loaded (operation, loaded_at, source, source_digest) VALUES (?, ?, ?, ?)",
+                               (self.operation, now, self.source, self.source_digest))
+            connection.execute("COMMIT")
+            return len(shards)
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
+
+    def _loaded(self) -> bool:
+        connection = self._connect()
+        try:
+            return self._check_source(connection)
+        finally:
+            connection.close()
+
+    def claim(self) -> Optional[Shard]:
+        """
+        Leases the first shard that is pending, or whose lease ran out.
+
+        :return: The Shard, or None if every shard is done or leased
+        """
+        connection = self._connect()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            found = connection.execute(
+                "SELECT shard_id, shard_key, rows, attempts, worker, secret_columns FROM shards "
+                "WHERE operation = ? AND (status = 'pending' OR (status = 'leased' AND lease_expires < ?)) "
+                "ORDER BY shard_id LIMIT 1",
+                (self.operation, now)).fetchone()
+            if found is None:
+                connection.execute("COMMIT")
+                return None
+            shard_id, key, rows, attempts, previous_worker, secret_columns = found
+            connection.execute(
+                "UPDATE shards SET status = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE operation = ? AND shard_id = ?",
+                (self.worker_id, now + self.lease, now, self.operation, shard_id))
+            succeeded = {rownum for (rownum,) in connection.execute(
+                "SELECT rownum FROM shard_results WHERE operation = ? AND shard_id = ? AND ok = 1",
+                (self.operation, shard_id))}
+            connection.execute("COMMIT")
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
+        if previous_worker is not None:
+            logger.warning("Reclaimed shard %d (%s) from %s, whose lease ran out; %d of its rows already succeeded",
+                           shard_id, key, previous_worker, len(succeeded),
+                           extra={"shard": shard_id, "worker": previous_worker})
+        return Shard(shard_id, key, [(rownum, row) for rownum, row in json.loads(rows) if rownum not in succeeded],
+                     attempts + 1, tuple(json.loads(secret_columns or "[]")))
+
+    def renew(self, shard_id: int) -> bool:
+        """
+        Extends the lease of a shard this worker holds.
+
+        :param shard_id: The shard
+        :return: False if the shard is no longer leased to this worker
+        """
+        connection = self._connect()
+        try:
+            cursor = connection.execute(
+                "UPDATE shards SET lease_expires = ?, updated_at = ? WHERE operation = ? AND shard_id = ? AND "
+                "status = 'leased' AND worker = ?",
+                (time.time() + self.lease, time.time(), self.operation, shard_id, self.worker_id))
+            return cursor.rowcount == 1
+        finally:
+            connection.close()
+
+    def record(self, shard_id: int, results: Iterable[bulk_executor.RowResult], done: bool = False) -> bool:
+        """
+        Records results of a shard, so a worker that takes the shard over does not send its succeeded rows again.
+
+        :param shard_id: The shard
+        :param results: RowResults of rows of the shard
+        :param done: Also mark the shard done, if this worker still holds its lease
+        :return: False if done was asked but the lease was lost (ran out, or another worker holds it)
+        """
+        connection = self._connect()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.executemany(
+                "INSERT OR REPLACE INTO shard_results (operation, rownum, shard_id, ok, status_code, message, "
+                "elapsed, worker) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                ((self.operation, r.rownum, shard_id, int(r.ok), r.status_code, (r.message or "")[:2000], r.elapsed,
+                  self.worker_id) for r in results))
+            marked = True
+            if done:
+                now = time.time()
+                marked = connection.execute(
+                    "UPDATE shards SET status = 'done', lease_expires = NULL, updated_at = ? WHERE operation = ? AND "
+                    "shard_id = ? AND status = 'leased' AND worker = ? AND lease_expires > ?",
+                    (now, self.operation, shard_id, self.worker_id, now)).rowcount == 1
+            connection.execute("COMMIT")
+            return marked
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
+
+    def progress(self) -> Dict[str, int]:
+        """
+        The number of shards per status.
+
+        :return: {"pending": n, "leased": n, "done": n}
+        """
+        connection = self._connect()
+        try:
+            counts = dict(connection.execute("SELECT status, COUNT(*) FROM shards WHERE operation = ? GROUP BY status",
+                                             (self.operation,)))
+        finally:
+            connection.close()
+        return {status: counts.get(status, 0) for status in ("pending", "leased", "done")}
+
+    def results(self) -> List[bulk_executor.RowResult]:
+        """
+        The merged results of every worker.
+
+        :return: A list of RowResult, sorted by rownum
+        """
+        connection = self._connect()
+        try:
+            cursor = connection.execute("SELECT rownum, ok, status_code, message, elapsed FROM shard_results "
+                                        "WHERE operation = ? ORDER BY rownum", (self.operation,))
+            return [bulk_executor.RowResult(rownum, bool(ok), status_code, message or "", elapsed or 0.0)
+                    for rownum, ok, status_code, message, elapsed in cursor]
+        finally:
+            connection.close()
+
+
+def run_shard(shard: Shard, task: Callable[[int, Dict[str, Any]], Any],
+              concurrency: int = bulk_executor.DEFAULT_CONCURRENCY,
+              order_key: Optional[Callable[[Dict[str, Any]], Hashable]] = None,
+              debug: bool = False,
+              on_result: Optional[Callable[[Dict[str, Any], bulk_executor.RowResult], None]] = None
+              ) -> List[bulk_executor.RowResult]:
+    """
+    Runs the rows of a shard against their MX, logging in to it if this worker has no session yet.
+
+    :return: A list of RowResult, one per row of the shard
+    """
+    if not shard.rows:
+        return []
+    key = bulk_executor.mx_key(shard.rows[0][1])
+    manager = authorization_v2.get_session_manager(*key, debug=debug)
+    if manager.get_cookie() is None:
+        results = [bulk_executor.RowResult(rownum, False, manager.status_code, f"Login to MX {key[0]}:{key[1]} failed",
+                                           0.0) for rownum, _ in shard.rows]
+        if on_result is not None:
+            for (_, row), result in zip(shard.rows, results):
+                on_result(row, result)
+        return results
+    manager.start_keepalive()
+    return bulk_executor.run_numbered(shard.rows, task, concurrency, order_key, on_result)
+
+
+def run_sharded(shard_queue: ShardQueue, rows: Iterable[Dict[str, Any]], task: Callable[[int, Dict[str, Any]], Any],
+                concurrency: int = bulk_executor.DEFAULT_CONCURRENCY,
+                order_key: Optional[Callable[[Dict[str, Any]], Hashable]] = None,
+                debug: bool = False,
+                on_result: Optional[Callable[[Dict[str, Any], bulk_executor.RowResult], None]] = None,
+                shard_key: Callable[[Dict[str, Any]], Hashable] = bulk_executor.server_group_key,
+                poll_interval: float = POLL_INTERVAL) -> List[bulk_executor.RowResult]:
+    """
+    Works as one worker of a sharded run.  See run_sharded_numbered().
+
+    :param shard_queue: The ShardQueue shared by the workers
+    :param rows: The rows of the input CSV file; only read if this worker loads the shards
+    :param task: The per-row function, as for bulk_executor.run_per_mx()
+    :param concurrency: The maximum number of rows in flight at once in this worker
+    :param order_key: Optional function; rows with equal keys are run sequentially, in input order
+    :param debug: Whether to enable debug mode or not.
+    :param on_result: Optional function called with (row, RowResult) as each of this worker's rows completes
+    :param shard_key: Function returning the shard of a row (within its MX)
+    :param poll_interval: Seconds between checks while the remaining shards are leased by other workers
+    :return: The merged results of every worker, sorted by rownum
+    """
+    return run_sharded_numbered(shard_queue, enumerate(rows, start=1), task, concurrency, order_key, debug, on_result,
+                                shard_key, poll_interval)
+
+
+def run_sharded_numbered(shard_queue: ShardQueue, numbered_rows: Iterable[Tuple[int, Dict[str, Any]]],
+                         task: Callable[[int, Dict[str, Any]], Any],
+                         concurrency: int = bulk_executor.DEFAULT_CONCURRENCY,
+                         order_key: Optional[Callable[[Dict[str, Any]], Hashable]] = None,
+                         debug: bool = False,
+                         on_result: Optional[Callable[[Dict[str, Any], bulk_executor.RowResult], None]] = None,
+                         shard_key: Callable[[Dict[str, Any]], Hashable] = bulk_executor.server_group_key,
+                         poll_interval: float = POLL_INTERVAL) -> List[bulk_executor.RowResult]:
+    """
+    Works as one worker of a sharded run: loads the shards if no worker has, then claims and runs shards until every
+    shard is done.  The rows keep the rownum they come with, e.g. from RunJournal.filter_numbered().
+
+    :param shard_queue: The ShardQueue shared by the workers
+    :param numbered_rows: An iterable of (rownum, row) tuples; only read if this worker loads the shards
+    :param task: The per-row function, as for bulk_executor.run_per_mx()
+    :param concurrency: The maximum number of rows in flight at once in this worker
+    :param order_key: Optional function; rows with equal keys are run sequentially, in input order
+    :param debug: Whether to enable debug mode or not.
+    :param on_result: Optional function called with (row, RowResult) as each of this worker's rows completes
+    :param shard_key: Function returning the shard of a row (within its MX)
+    :param poll_interval: Seconds between checks while the remaining shards are leased by other workers
+    :return: The merged results of every worker, sorted by rownum
+    """
+    # The secret columns of the rows of this worker's input file, by row_digest(); read while loading, or on the first
+    # shard that needs them if another worker loaded the queue.
+    secrets: Dict[str, Dict[str, Any]] = {}
+    rows_read = False
+
+    def remember_secrets(rows_to_read):
+        nonlocal rows_read
+        rows_read = True
+        for rownum, row in rows_to_read:
+            values = {column: row[column] for column in SECRET_COLUMNS if column in row}
+            if values:
+                secrets.setdefault(row_digest(row), values)
+            yield rownum, row
+
+    def with_secrets(shard):
+        if not shard.secret_columns:
+            return shard
+        if not rows_read:
+            for _ in remember_secrets(numbered_rows):
+                pass
+        restored, unmatched = [], 0
+        for rownum, row in shard.rows:
+            values = secrets.get(row_digest(row))
+            unmatched += values is None
+            restored.append((rownum, dict(row, **(values or {}))))
+        if unmatched:
+            logger.warning("%d rows of shard %d are not in this worker's input file; they are sent without their %s",
+                           unmatched, shard.shard_id, ", ".join(shard.secret_columns))
+        return shard._replace(rows=restored)
+
+    loaded = shard_queue.load_numbered(remember_secrets(numbered_rows), shard_key)
+    if loaded:
+        logger.info("Loaded %d shards into %s", loaded, shard_queue.path, extra={"shards": loaded})
+    while True:
+        shard = shard_queue.claim()
+        if shard is None:
+            progress = shard_queue.progress()
+            if not progress["pending"] and not progress["leased"]:
+                break
+            # The last shards are running elsewhere; stay around to take them over if their worker dies.
+            time.sleep(poll_interval)
+            continue
+        shard = with_secrets(shard)
+        logger.info("Running shard %d (%s): %d rows", shard.shard_id, shard.key, len(shard.rows),
+                    extra={"shard": shard.shard_id, "rows": len(shard.rows), "attempt": shard.attempts})
+        stop_renewing = threading.Event()
+        # Results not recorded in the queue yet; recorded every RECORD_INTERVAL seconds.
+        unrecorded: List[bulk_executor.RowResult] = []
+        unrecorded_lock = threading.Lock()
+
+        def take_unrecorded():
+            with unrecorded_lock:
+                taken = unrecorded[:]
+                del unrecorded[:]
+            return taken
+
+        def record(row, result):
+            with unrecorded_lock:
+                unrecorded.append(result)
+            if on_result is not None:
+                on_result(row, result)
+
+        def renew(shard_id=shard.shard_id, stop=stop_renewing):
+            renew_at = time.monotonic() + shard_queue.lease / 3
+            while not stop.wait(min(RECORD_INTERVAL, shard_queue.lease / 3)):
+                shard_queue.record(shard_id, take_unrecorded())
+                if time.monotonic() < renew_at:
+                    continue
+                renew_at = time.monotonic() + shard_queue.lease / 3
+                if not shard_queue.renew(shard_id):
+                    logger.warning("Lost the lease of shard %d; another worker may run it again", shard_id)
+                    return
+
+        renewer = threading.Thread(target=renew, name=f"shard-lease-{shard.shard_id}", daemon=True)
+        renewer.start()
+        try:
+            run_shard(shard, task, concurrency, order_key, debug, record)
+        finally:
+            stop_renewing.set()
+            renewer.join()
+        if not shard_queue.record(shard.shard_id, take_unrecorded(), done=True):
+            logger.warning("Lost the lease of shard %d before it was done; leaving it to its current holder",
+                           shard.shard_id, extra={"shard": shard.shard_id})
+    return shard_queue.results()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Show the progress of the sharded runs in a shard queue.")
+    parser.add_argument("command", choices=("status",))
+    parser.add_argument("path", help="the shard queue database")
+    args = parser.parse_args()
+    connection = sqlite3.connect(args.path)
+    try:
+        operations = [operation for (operation,) in connection.execute("SELECT operation FROM loaded")]
+    finally:
+        connection.close()
+    for operation in operations:
+        shard_queue = ShardQueue(args.path, operation)
+        results = shard_queue.results()
+        failed = sum(1 for r in results if not r.ok)
+        shards = ", ".join(f"{status}: {count}" for status, count in shard_queue.progress().items())
+        print(f"{operation}: shards {shards}; rows {len(results)} done, {failed} failed")
@@ -0,0 +1,241 @@
+import argparse
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Optional, Set, Tuple
+
+import bulk_executor
+import create_db_connection_v2
+import create_protected__ip_list_v2
+import csv_reader
+import metrics
+import mx_logging
+import run_journal
+import session_pool
+
+"""
+Description:
+This Python script removes what the provisioning scripts created from the input CSV file, e.g. to clean up a staging
+MX before it is rebuilt.
+
+The objects of the file are deleted in reverse dependency order, one level at a time (LEVELS):
+    db_connection  deletes the db connection (alias)
+    protected_ip   deletes the protected IP, and with it its server group IP
+Each level runs through bulk_executor.run_per_mx(), --concurrency deletes at a time per MX, and starts once the level
+before it is finished.  A protected IP is skipped when one of its db connections could not be deleted.  An object named
+by several rows (the sample input.csv has 192.168.1.24 on both SQL-124 and SQL-125) is deleted once, by its first row;
+its other rows are reported as duplicates.  An object the MX does not have (404) counts as already deleted, so a
+teardown can simply be run again.
+
+With --created-only, only the objects the result journal records as created by a provisioning run are deleted, and
+the objects that were already on the MX before the run are left alone.  An object counts as created when any attempt
+succeeded, even if a later row with the same key failed (e.g. 409 on the second 192.168.1.24 row).  Every delete resets
+the object in the journal (run_journal.RunJournal.reset(), "deleted by teardown"), so that a provisioning run with
+--resume creates the object again.  Deleting a protected IP also resets the journal of its server group IP's OS-type update.
+
+Usage:
+$ python teardown.py [--concurrency N] [--journal FILE] [--created-only] [--dry-run] [--sessions N [--accounts FILE]]
+
+Developer note: This is code from my personal lab for my professional development. This should be considered example
+code only.
+
+Revision History:
+-----------------
+2026-10-18:
+    Initial creation of the script.
+2026-10-18:
+    Added --sessions and --accounts: the deletes are spread over a pool of MX sessions (session_pool).
+2026-10-18:
+    --created-only deletes every object a run ever created, not only those whose last attempt succeeded.
+"""
+
+logger = logging.getLogger(__name__)
+
+# Important filename variable
+input_csv_filename = "input.csv"
+# The journal message of an object deleted by a teardown.
+DELETED_MESSAGE = "deleted by teardown"
+
+
+def _delete_db_connection(row: Dict[str, Any], headers: Dict[str, str]):
+    return create_db_connection_v2.delete_db_connection(
+        row['MX-IP'], row['MX-port'], row['site'], row['server_group_name'], row['service_name'],
+        row['connection_name'], headers)
+
+
+def _delete_protected_ip(row: Dict[str, Any], headers: Dict[str, str]):
+    return create_protected__ip_list_v2.delete_protected_ip(
+        row['MX-IP'], row['MX-port'], row['site'], row['server_group_name'], row['ip-address'],
+        row['gateway_group_name'], headers)
+
+
+class Level(NamedTuple):
+    """
+    One kind of object removed by a teardown.  name is the journal operation of the script that creates it.
+    """
+    name: str
+    title: str
+    csv_columns: Tuple[str, ...]
+    journal_key_columns: Tuple[str, ...]
+    delete: Callable[[Dict[str, Any], Dict[str, str]], Any]
+    # The journal operations of the objects the delete removes too, keyed by the same columns.
+    cascades: Tuple[str, ...] = ()
+
+    def key(self, row: Dict[str, Any]) -> Hashable:
+        """The identity of the object a row names: its journal key columns, as a tuple."""
+        return tuple(str(row.get(column)) for column in self.journal_key_columns)
+
+
+# In reverse dependency order: every object is deleted before the objects it depends on.
+LEVELS: Tuple[Level, ...] = (
+    Level("db_connection", "db connections (aliases) deleted",
+          create_db_connection_v2.journal_key_columns + ('ip-address',),
+          create_db_connection_v2.journal_key_columns, _delete_db_connection),
+    Level("protected_ip", "Protected IP's deleted",
+          create_protected__ip_list_v2.journal_key_columns + ('gateway_group_name',),
+          create_protected__ip_list_v2.journal_key_columns, _delete_protected_ip, ("server_os",)),
+)
+# The columns of the CSV file the levels use
+csv_columns = tuple(dict.fromkeys(column for level in LEVELS for column in level.csv_columns))
+
+
+def read_csv(debug: bool):
+    """
+    Lazily reads the rows of the input CSV file, keeping only the columns the levels use.
+
+    :param debug: A boolean flag indicating whether to enable debugging
+    :return: An iterator of dictionaries, one per row of the input CSV file
+    """
+    if debug:
+        logger.debug("Reading %s columns: %s", input_csv_filename, csv_columns)
+    return csv_reader.iter_rows(input_csv_filename, columns=csv_columns)
+
+
+def run_teardown(headers: Dict[str, str], concurrency: int = bulk_executor.DEFAULT_CONCURRENCY, debug: bool = False,
+                 journal_path: Optional[str] = None, created_only: bool = False, dry_run: bool = False,
+                 level_counts: Optional[Counter] = None) -> Dict[str, List[bulk_executor.RowResult]]:
+    """
+    Deletes the objects of the input CSV file, level by level.
+
+    :param headers: The headers of the API calls
+    :param concurrency: The maximum number of deletes in flight at once, per MX
+    :param debug: Whether to enable debug mode or not.
+    :param journal_path: The result journal (default: run_journal.default_path() of the input CSV file)
+    :param created_only: Only delete the objects the journal records as created by any attempt
+    :param dry_run: Only count what would be deleted; nothing is sent and the MXs are not logged in to
+    :param level_counts: Optional Counter, incremented with (level name, "deleted"/"absent"/"failed"/"skipped"/
+                         "duplicate"/"would delete")
+    :return: Level name to a list of RowResult, one per row, sorted by rownum
+    """
+    journal_path = journal_path or run_journal.default_path(input_csv_filename)
+    counts = level_counts if level_counts is not None else Counter()
+    counts_lock = threading.Lock()
+    # Level name to the keys of the objects not to delete, because an object depending on them is still there.
+    blocked: Dict[str, Set[Hashable]] = {level.name: set() for level in LEVELS}
+    results: Dict[str, List[bulk_executor.RowResult]] = {}
+    for index, level in enumerate(LEVELS):
+        with ExitStack() as stack:
+            journal = stack.enter_context(run_journal.RunJournal(journal_path, level.name, level.journal_key_columns))
+            journals = [journal] + [stack.enter_context(run_journal.RunJournal(journal_path, operation,
+                                                                               level.journal_key_columns))
+                                    for operation in level.cascades]
+            rows = read_csv(debug)
+            if created_only:
+                created = journal.keys(ok=True)
+                rows = (row for row in rows if journal.key(row) in created)
+            seen: Set[Hashable] = set()
+
+            def count(outcome, level=level):
+                with counts_lock:
+                    counts[(level.name, outcome)] += 1
+
+            def delete_row(rownum, row, level=level, journals=journals, seen=seen, count=count):
+                key = level.key(row)
+                # Rows naming the same object share an order_key lane, so the first one is done when the next starts.
+                if key in seen:
+                    count("duplicate")
+                    return True
+                seen.add(key)
+                if key in blocked[level.name]:
+                    count("skipped")
+                    return "skipped: an object that depends on it could not be deleted"
+                if dry_run:
+                    count("would delete")
+                    logger.info("Would delete %s %s", level.name, "/".join(key[2:]))
+                    return True
+                start = time.perf_counter()
+                response = level.delete(row, headers)
+                if response.status_code not in (200, 404):
+                    count("failed")
+                    return response
+                count("deleted" if response.status_code == 200 else "absent")
+                deleted = bulk_executor.RowResult(rownum, False, response.status_code, DELETED_MESSAGE,
+                                                  time.perf_counter() - start)
+                for journal in journals:
+                    journal.reset(row, deleted)
+                return True
+
+            def on_result(row, result, index=index):
+                if not result.ok:
+                    for later in LEVELS[index + 1:]:
+                        blocked[later.name].add(later.key(row))
+
+            start = time.perf_counter()
+            if dry_run:
+                level_results = bulk_executor.run_bulk(rows, delete_row, concurrency, level.key, on_result)
+            else:
+                level_results = bulk_executor.run_per_mx(rows, delete_row, concurrency, level.key, debug, on_result)
+            logger.info("%s: %d rows in %.2fs", level.title, len(level_results), time.perf_counter() - start)
+            results[level.name] = level_results
+    return results
+
+
+def print_level_summary(level_counts: Counter) -> None:
+    """
+    Prints how many objects each level deleted, found absent, failed to delete or skipped.
+
+    :param level_counts: The Counter filled by run_teardown()
+    :return: None
+    """
+    for level in LEVELS:
+        outcomes = ("would delete", "skipped", "duplicate") if level_counts[(level.name, "would delete")] else \
+            ("deleted", "absent", "failed", "skipped", "duplicate")
+        print(f"  {level.name:<14} " + ", ".join(f"{outcome}: {level_counts[(level.name, outcome)]}"
+                                                for outcome in outcomes))
+
+
+if __name__ == '__main__':
+    """Delete the db connections and protected IP's of the input CSV file.
+
+    Usage:
+    $ python teardown.py [--concurrency N] [--journal FILE] [--created-only] [--dry-run] [--sessions N [--accounts FILE]]
+    """
+    parser = argparse.ArgumentParser(description="Delete the db connections, then the protected IP's (and their "
+                                                 "server group IP's) of the input CSV file.")
+    parser.add_argument("--concurrency", type=int, default=bulk_executor.DEFAULT_CONCURRENCY,
+                        help="number of deletes sent to each MX at the same time")
+    parser.add_argument("--journal", help="result journal file (default: <input csv>.journal.db)")
+    parser.add_argument("--created-only", action="store_true",
+                        help="only delete the objects the journal records as created by a provisioning run")
+    parser.add_argument("--dry-run", action="store_true", help="only count what would be deleted")
+    session_pool.add_arguments(parser)
+    mx_logging.add_arguments(parser)
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    mx_logging.configure(args.log_level, args.log_format)
+    metrics.write_at_exit(args.metrics_json, args.metrics_prom)
+    debug = False
+    session_pool.configure(args.accounts, args.sessions, debug=debug)
+    headers: Dict[str, str] = {"Content-Type": "application/json", "Authorization": "Basic Y="}
+    print("\nWe will now begin deleting the db connections, then the Protected IP's and Server Group IP's")
+    level_counts: Counter = Counter()
+    start = time.perf_counter()
+    results = run_teardown(headers, args.concurrency, debug, args.journal, args.created_only, args.dry_run,
+                           level_counts)
+    for level in LEVELS:
+        bulk_executor.print_summary(results[level.name], level.title)
+    print(f"\nElapsed: {time.perf_counter() - start:.2f}s")
+    print_level_summary(level_counts)
+    raise SystemExit(0 if all(r.ok for level_results in results.values() for r in level_results) else 1)
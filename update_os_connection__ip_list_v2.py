@@ -1,8 +1,20 @@
-from typing import Dict
-import requests
-import authorization_v2
-import pandas as pd
-import json
+import argparse
+import logging
+import time
+from typing import Dict, Iterator
+import metrics
+import mx_client
+import mx_logging
+import preflight
+import batch_writes
+import bulk_executor
+import csv_reader
+import inventory
+import reconcile
+import run_journal
+import session_pool
+import shard_queue
+from requests import Response
 
 """
 This script updates the OS of the list of IP's in the Server's tab.
@@ -23,15 +35,36 @@ Revision History:
 -----------------
 2023-02-23:
     Initial creation of the script.    
-
+2026-10-17:
+    read_csv() streams the rows with csv_reader instead of the pandas/JSON round trip.
+2026-10-17:
+    Messages go through logging (--log-level, --log-format) and API metrics can be written at exit.
+2026-10-17:
+    Added --preflight and --preflight-only: the file is validated and deduplicated before anything is sent.
+2026-10-17:
+    Added --batch: the rows of each server group are written with collection requests.
+2026-10-18:
+    Added --shard-queue: several workers, on any number of hosts, share the rows of a run through shard_queue.
+2026-10-18:
+    Added --inventory: rows whose server group the inventory mirror knows to be missing are not sent.
+2026-10-18:
+    Added --sessions and --accounts: the requests are spread over a pool of MX sessions (session_pool).
+2026-10-18:
+    --reconcile plans from every row of the file, whatever --resume/--retry-failed would skip.
 """
 
+logger = logging.getLogger(__name__)
+
 # Important filename variable
 input_csv_filename = "input.csv"
+# The columns of the CSV file this script uses
+csv_columns = ('MX-IP', 'MX-port', 'site', 'server_group_name', 'ip-address', 'OS-type')
+# The columns that identify a row in the result journal
+journal_key_columns = ('MX-IP', 'MX-port', 'site', 'server_group_name', 'ip-address')
 
 
 def update_server_group_iplist(host: str, port: str, site_name: str, server_group_name: str, ip_address: str,
-                               body: Dict[str, str], headers: Dict[str, str]) -> None:
+                               body: Dict[str, str], headers: Dict[str, str]) -> Response:
     """
     Updates the OS of a server group IP address.
 
@@ -44,59 +77,41 @@ def update_server_group_iplist(host: str, port: str, site_name: str, server_grou
     - body (Dict[str, str]): the request body containing the updated OS type
     - headers (Dict[str, str]): the request headers
 
-    Returns: None
+    Returns: the requests.Response of the API call
     """
     # https://docs.imperva.com/bundle/v14.7-dam-api-reference-guide/page/61821.htm
     # URL must match https://{host:port}/SecureSphere/api/v1/conf/serverGroups/{siteName}/{serverGroupName}/servers/{ip}
     url: str = f"https://{host}:{port}/SecureSphere/api/v1/conf/serverGroups/{site_name}/{server_group_name}/servers/{ip_address}"
 
-    response = requests.put(url, json=body, headers=headers, verify=False)
+    response = mx_client.put(url, json=body, headers=headers)
 
+    fields = {"ip_address": ip_address, "status_code": response.status_code}
     if response.status_code == 200:
-        print(f"Successfully updated OS for IP address: {ip_address}")
+        logger.info("Successfully updated OS for IP address: %s", ip_address, extra=fields)
     else:
-        print("Error Code:  " + str(response.status_code))
-        print(f"Failed to update OS for IP address : {ip_address}\nHere is the error message: {response.text}")
+        logger.error("Failed to update OS for IP address: %s (Error Code: %d)\nHere is the error message: %s",
+                     ip_address, response.status_code, response.text, extra=fields)
+    return response
 
 
-def read_csv(debug: bool) -> Dict:
+def read_csv(debug: bool) -> Iterator[Dict]:
     """
-    Reads a CSV file and returns a dictionary containing the file data.
+    Lazily reads the rows of the input CSV file, keeping only the columns this script uses.
     Args:
     - debug (bool): if True, print additional debug information
 
     Returns:
-    - data (Dict): a dictionary containing the file data
+    - data (Iterator[Dict]): an iterator of dictionaries, one per row of the file
     """
-    # Read CSV file
-    data = pd.read_csv(input_csv_filename)
-
-    # Convert DataFrame to JSON string
-    json_string = data.to_json(orient='records')
-    # Convert data to dictionary
-    data = json.loads(json_string)
     if debug:
-        print(type(data))
-        assert isinstance(data, object)
-        print(data)
-        # Print JSON string
-        print("This is json_string")
-        print(json_string)
-        print("This is data")
-        print(type(data))
-        print("This is data[0]")
-        print(data[0])
-        print(type(data[0]))
-    # body=data[0]
-    # comment = {"comment": "Some comment"}
-    # body = comment
-    return data
+        logger.debug("Reading %s columns: %s", input_csv_filename, csv_columns)
+    return csv_reader.iter_rows(input_csv_filename, columns=csv_columns)
 
 
 '''
 This script reads data from a CSV file and uses it to update the OS of the protected IP lists in SecureSphere.
-It first logs in to SecureSphere using the `authorization` module and gets an authorization cookie, 
-then uses this cookie to make API requests to update the OS.
+It logs in once to each MX named in the MX-IP/MX-port columns using the `authorization_v2` module, 
+then uses that MX's session cookie to make API requests to update the OS.
 
 Steps
 Updates the OS of the list of IP's in the Server's tab by:
@@ -110,44 +125,81 @@ Returns: None
 Raises: None
 
 Usage:
-$ python update_os_connection_ip_list_v2.py
+$ python update_os_connection_ip_list_v2.py [--concurrency N] [--ordered] [--resume | --retry-failed] [--preflight | --preflight-only] [--inventory DB] [--shard-queue DB [--lease SECONDS] [--worker-id ID] | --batch [--batch-size N] | --reconcile [--dry-run]] [--sessions N [--accounts FILE]]
 '''
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Update the OS of the server group IP's from the input CSV file.")
+    bulk_executor.add_arguments(parser)
+    batch_writes.add_arguments(parser)
+    reconcile.add_arguments(parser)
+    preflight.add_arguments(parser)
+    shard_queue.add_arguments(parser)
+    inventory.add_arguments(parser)
+    session_pool.add_arguments(parser)
+    mx_logging.add_arguments(parser)
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    # The modes are exclusive: each sends the rows its own way.
+    if (args.reconcile or args.dry_run) and (args.batch or args.shard_queue):
+        parser.error("--reconcile/--dry-run can't be combined with --batch or --shard-queue")
+    if args.batch and args.shard_queue:
+        parser.error("--batch can't be combined with --shard-queue")
+    mx_logging.configure(args.log_level, args.log_format)
+    metrics.write_at_exit(args.metrics_json, args.metrics_prom)
     debug = False
+    session_pool.configure(args.accounts, args.sessions, debug=debug)
     data = read_csv(debug)
-    # Get the session_id via get_cookie()
-    my_response = authorization.authorization()
-    my_cookies = authorization.get_cookie(my_response, debug)
-    headers: Dict[str, str] = {"Content-Type": "application/json", "Authorization": "Basic YtW4",
-                               'Cookie': my_cookies}
-    if my_response.status_code == 200:
-        # The request was successful
-        print("\nThe initial login request was successful\nWe will now begin updating the OS Server Group"
-              " IP's")
-        # Iterate through the dictionary
-        assert isinstance(data, object)
-        count = len(data)
-        print(count)
-        rownum = 1
-        for row in data:
-            print(f"\nUpdating row {str(rownum)}:  {row['ip-address']}")
-            if debug:
-                print(f"This is the row {row}")
-            host: str = row['MX-IP']
-            port: str = row['MX-port']
-            site_name: str = row['site']
-            server_group_name: str = row['server_group_name']
-            service_name: str = row['service_name']
-            connection_name: str = row['connection_name']
-            ip_address: str = row['ip-address']
-            gateway_group_name: str = row['gateway_group_name']
-            os_type = row['OS-type']
-            assert isinstance(os_type, object)
-            body = {'OS-type': os_type}
-            print(body)
-            update_server_group_iplist(host, port, site_name, server_group_name, ip_address, body, headers)
-            rownum = rownum + 1
-
-    else:
-        # The request was not successful
-        print(f'Request failed with status code {my_response.status_code}')
+    if args.preflight or args.preflight_only:
+        preflight_plan = preflight.run(input_csv_filename,
+                                       [preflight.Operation("server_os", csv_columns, journal_key_columns)])
+        preflight.print_report(preflight_plan)
+        if args.preflight_only:
+            raise SystemExit(0 if preflight_plan.ok else 1)
+        data = preflight_plan.records()
+    headers: Dict[str, str] = {"Content-Type": "application/json", "Authorization": "Basic YtW4"}
+    # Rows are grouped by their MX-IP/MX-port; each MX is logged in to once, reusing a cached session if it has one
+    print("\nWe will now begin updating the OS Server Group"
+          " IP's")
+
+    def update_row(rownum, row):
+        logger.debug("Updating row %d:  %s", rownum, row['ip-address'])
+        host: str = row['MX-IP']
+        port: str = row['MX-port']
+        site_name: str = row['site']
+        server_group_name: str = row['server_group_name']
+        ip_address: str = row['ip-address']
+        os_type = row['OS-type']
+        body = {'OS-type': os_type}
+        return update_server_group_iplist(host, port, site_name, server_group_name, ip_address, body, headers)
+
+    if args.inventory:
+        mirror = inventory.Inventory(args.inventory)
+        update_row = inventory.guard(mirror, update_row, "server_groups", ('site', 'server_group_name'))
+
+    order_key = bulk_executor.server_group_key if args.ordered else None
+    journal_path = args.journal or run_journal.default_path(input_csv_filename)
+    with run_journal.RunJournal(journal_path, "server_os", journal_key_columns) as journal:
+        # Numbered before filtering, so the results keep the rows' numbers in the file.
+        pending = journal.filter_numbered(enumerate(data, start=1), args.resume, args.retry_failed)
+        start = time.perf_counter()
+        if args.reconcile or args.dry_run:
+            # Planned from every row of the file, not only the ones --resume/--retry-failed would send: the rows
+            # already in place are planned as identical.
+            plan = reconcile.plan_server_os(list(data), debug)
+            reconcile.print_plan(plan, "Server Group IP OS updates", verbose=args.dry_run)
+            if args.dry_run:
+                raise SystemExit(0)
+            handlers = {'update': update_row}
+            results = reconcile.run_plan(plan, handlers, args.concurrency, order_key, debug, journal.record)
+        elif args.batch:
+            results = batch_writes.run_batched_numbered(pending, batch_writes.SERVER_OS, update_row, headers,
+                                                        args.concurrency, debug, journal.record, args.batch_size)
+        elif args.shard_queue:
+            shards = shard_queue.ShardQueue(args.shard_queue, "server_os", args.worker_id, args.lease,
+                                            input_csv_filename)
+            results = shard_queue.run_sharded_numbered(shards, pending, update_row, args.concurrency, order_key,
+                                                       debug, journal.record)
+        else:
+            results = bulk_executor.run_per_mx_numbered(pending, update_row, args.concurrency, order_key, debug,
+                                                        journal.record)
+    bulk_executor.print_summary(results, "Server Group IP OS updates", time.perf_counter() - start)